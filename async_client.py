@@ -0,0 +1,67 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import config
+from supabase_client import SupabaseClient
+
+class AsyncSupabaseClient:
+    """Variante asyncio de SupabaseClient
+
+    Expone los mismos métodos que SupabaseClient como corutinas. Las llamadas
+    se ejecutan sobre el pool keep-alive del cliente síncrono en un executor
+    del mismo tamaño, así N consultas concurrentes comparten N conexiones
+    sin bloquear el event loop.
+    """
+    def __init__(self, client=None, max_concurrency=None):
+        self.max_concurrency = max_concurrency or config.ASYNC_MAX_CONCURRENCY
+        self.client = client or SupabaseClient(pool_size=self.max_concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                           thread_name_prefix="supabase-async")
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(attr, *args, **kwargs))
+
+        return call
+
+    async def gather(self, *calls, limit=None, **named_calls):
+        """Ejecutar varias consultas a la vez con un límite de concurrencia
+
+        Recibe corutinas de este cliente, por ejemplo
+        `await client.gather(client.get_sales_fact(), client.get_top_products(5))`.
+        Con argumentos por nombre devuelve un dict con los mismos nombres;
+        mezclar ambas formas es un TypeError.
+        """
+        if calls and named_calls:
+            # Cerrar las corutinas recibidas: nunca se van a esperar
+            for call in (*calls, *named_calls.values()):
+                call.close()
+            raise TypeError("gather() recibe consultas por posición o por nombre, no ambas")
+        semaphore = asyncio.Semaphore(limit or self.max_concurrency)
+
+        async def bounded(call):
+            async with semaphore:
+                return await call
+
+        if named_calls:
+            names = list(named_calls)
+            results = await asyncio.gather(*(bounded(named_calls[name]) for name in names))
+            return dict(zip(names, results))
+        return list(await asyncio.gather(*(bounded(call) for call in calls)))
+
+    def close(self):
+        """Liberar el executor y las conexiones del pool"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
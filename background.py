@@ -0,0 +1,95 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+class BackgroundRunner:
+    """Ejecutar llamadas al cliente fuera del hilo de Tk
+
+    Los resultados se entregan en el hilo principal mediante `root.after`.
+    Cada llamada pertenece a un canal (por ejemplo, un panel de resultados);
+    una llamada nueva en el mismo canal reemplaza a la anterior: si aún no
+    empezó se cancela y, si ya estaba en curso, su resultado se descarta.
+    """
+    def __init__(self, root, max_workers=4, poll_ms=50, on_busy_change=None):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.on_busy_change = on_busy_change
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="supabase")
+        self.results = queue.Queue()
+        self.tokens = {}
+        self.futures = {}
+        self.in_flight = 0
+        self.superseded = 0
+        self._polling = False
+
+    def submit(self, channel, func, callback, *args, **kwargs):
+        """Ejecutar func(*args, **kwargs) en segundo plano y llamar callback con su resultado"""
+        token = self.tokens.get(channel, 0) + 1
+        self.tokens[channel] = token
+
+        previous = self.futures.get(channel)
+        if previous is not None:
+            previous.cancel()
+
+        future = self.executor.submit(func, *args, **kwargs)
+        self.futures[channel] = future
+        future.add_done_callback(lambda f: self.results.put((channel, token, f, callback)))
+
+        self._set_in_flight(self.in_flight + 1)
+        self._schedule_poll()
+        return future
+
+    def cancel(self, channel):
+        """Descartar la llamada pendiente de un canal"""
+        self.tokens[channel] = self.tokens.get(channel, 0) + 1
+        future = self.futures.pop(channel, None)
+        if future is not None:
+            future.cancel()
+
+    def cancel_all(self):
+        """Descartar todas las llamadas pendientes (por ejemplo, al cerrar sesión)"""
+        for channel in list(self.tokens):
+            self.cancel(channel)
+
+    def shutdown(self):
+        """Detener el executor sin esperar llamadas en curso"""
+        self.cancel_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def is_busy(self, channel=None):
+        """Indicar si hay llamadas en curso (en total o en un canal)"""
+        if channel is None:
+            return self.in_flight > 0
+        future = self.futures.get(channel)
+        return future is not None and not future.done()
+
+    def poll(self):
+        """Entregar los resultados terminados (se ejecuta en el hilo de Tk)"""
+        self._polling = False
+        while True:
+            try:
+                channel, token, future, callback = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self._set_in_flight(self.in_flight - 1)
+            if self.futures.get(channel) is future:
+                del self.futures[channel]
+            if future.cancelled() or token != self.tokens.get(channel):
+                self.superseded += 1
+                continue
+
+            error = future.exception()
+            if error is not None:
+                callback({"success": False, "error": str(error)})
+            else:
+                callback(future.result())
+        self._schedule_poll()
+
+    def _schedule_poll(self):
+        if self.in_flight > 0 and not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self.poll)
+
+    def _set_in_flight(self, count):
+        self.in_flight = count
+        if self.on_busy_change:
+            self.on_busy_change(count)
@@ -0,0 +1,82 @@
+import random
+from datetime import date, timedelta
+
+COUNTRIES = [
+    ("CR", "Costa Rica"), ("US", "Estados Unidos"), ("MX", "México"),
+    ("ES", "España"), ("CO", "Colombia"), ("PA", "Panamá")
+]
+
+CATEGORIES = ["Laptops", "Monitores", "Teclados", "Audio", "Redes", "Almacenamiento",
+              "Impresoras", "Accesorios"]
+
+FIRST_NAMES = ["María", "José", "Ana", "Luis", "Carmen", "Jorge", "Lucía", "Andrés", "Sofía", "Diego"]
+LAST_NAMES = ["Ramírez", "Fernández", "Vargas", "Mora", "Rojas", "Jiménez", "Castro", "Solís"]
+
+# Fecha final fija: los datos son reproducibles y "este mes" es diciembre 2024
+END_DATE = date(2024, 12, 31)
+DAYS = 365
+
+# Columnas de los hechos de venta (mismo orden que v_sales_fact)
+FACT_COLUMNS = ("line_id", "invoice_id", "invoice_date", "customer_id", "customer_name", "country_code",
+                "product_id", "product_name", "category_id", "category_name", "quantity", "unit_price",
+                "line_total")
+
+class Dataset:
+    """Datos sintéticos con la forma del esquema de ventas
+
+    Las tablas grandes se guardan como tuplas (no dicts) para que 1M líneas
+    quepan en memoria; `fact` tiene una tupla por línea con las columnas de
+    FACT_COLUMNS.
+    """
+    def __init__(self, lines, seed=42):
+        rng = random.Random(seed)
+        self.size = lines
+        self.seed = seed
+        self.countries = [{"code": code, "name": name} for code, name in COUNTRIES]
+        self.categories = [{"id": i, "name": name} for i, name in enumerate(CATEGORIES, start=1)]
+
+        product_count = min(max(50, lines // 2000), 2000)
+        self.products = []
+        for product_id in range(1, product_count + 1):
+            category_id = rng.randint(1, len(CATEGORIES))
+            price = round(rng.uniform(5, 2500), 2)
+            self.products.append((product_id, f"{CATEGORIES[category_id - 1]} modelo {product_id}",
+                                  category_id, price, "2024-01-01T00:00:00+00:00"))
+
+        customer_count = max(100, lines // 200)
+        self.customers = []
+        for customer_id in range(1, customer_count + 1):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {customer_id}"
+            self.customers.append((customer_id, name, f"cliente{customer_id}@ejemplo.com",
+                                   rng.choice(COUNTRIES)[0], "2024-01-01T00:00:00+00:00"))
+
+        self.invoices = []
+        self.fact = []
+        line_id = 0
+        invoice_id = 0
+        while line_id < lines:
+            invoice_id += 1
+            customer = rng.choice(self.customers)
+            invoice_date = (END_DATE - timedelta(days=rng.randrange(DAYS))).isoformat()
+            total = 0.0
+            for _ in range(min(rng.randint(1, 7), lines - line_id)):
+                line_id += 1
+                product = rng.choice(self.products)
+                quantity = rng.randint(1, 10)
+                line_total = round(quantity * product[3], 2)
+                total += line_total
+                self.fact.append((line_id, invoice_id, invoice_date, customer[0], customer[1], customer[3],
+                                  product[0], product[1], product[2], CATEGORIES[product[2] - 1],
+                                  quantity, product[3], line_total))
+            self.invoices.append((invoice_id, customer[0], invoice_date, round(total, 2),
+                                  f"{invoice_date}T12:00:00+00:00", customer[3]))
+
+def parse_size(text):
+    """Convertir '10k', '100k' o '1m' en número de líneas"""
+    text = str(text).strip().lower()
+    factor = 1
+    if text.endswith("k"):
+        factor, text = 1000, text[:-1]
+    elif text.endswith("m"):
+        factor, text = 1000000, text[:-1]
+    return int(float(text) * factor)
@@ -0,0 +1,122 @@
+"""Micro-benchmark de decodificación JSON con cuerpos sintéticos de v_sales_fact
+
+Uso:
+    python -m benchmarks.decode --sizes 10k,100k --repeat 5 --output decode.json
+
+Compara, sobre el mismo cuerpo (JSON compacto como el de PostgREST):
+
+- decodificar: response.json() de requests (lo que se usaba antes),
+  decoding.loads con cada backend disponible y la lectura en streaming
+  (ArrayStream, bloques de JSON_STREAM_CHUNK) con y sin `keep_raw`.
+- codificar: NDJSON de exportación (json.dumps por fila contra el JSON
+  original de RawRow) y el texto indentado de la GUI (json.dumps contra
+  decoding.dumps).
+- exportar: leer en streaming y escribir NDJSON, con y sin `keep_raw`, por backend.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+import config
+import decoding
+from benchmarks.datasets import Dataset, FACT_COLUMNS, parse_size
+
+def fact_payload(lines, seed=42):
+    """Cuerpo JSON de v_sales_fact con `lines` filas"""
+    rows = [dict(zip(FACT_COLUMNS, row)) for row in Dataset(lines, seed).fact]
+    return json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def chunked(body, size):
+    return (body[start:start + size] for start in range(0, len(body), size))
+
+def requests_json(body):
+    response = requests.Response()
+    response._content = body
+    response.status_code = 200
+    return response.json()
+
+def measure(func, repeat):
+    """Mediana en ms de `repeat` ejecuciones (más una de calentamiento)"""
+    func()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(times), 2)
+
+def with_backend(name, func):
+    def run():
+        previous = decoding.backend()
+        decoding.set_backend(name)
+        try:
+            return func()
+        finally:
+            decoding.set_backend(previous)
+    return run
+
+def run_size(label, lines, repeat, chunk):
+    body = fact_payload(lines)
+    raw_rows = list(decoding.ArrayStream(chunked(body, chunk), keep_raw=True))
+    rows = json.loads(body)
+    cases = [("decode", "response.json()", lambda: requests_json(body))]
+    for name in decoding.BACKENDS:
+        cases.append(("decode", f"loads ({name})", with_backend(name, lambda: decoding.loads(body))))
+    cases += [
+        ("decode", f"stream ({decoding.backend()})", lambda: list(decoding.ArrayStream(chunked(body, chunk)))),
+        ("decode", f"stream + raw ({decoding.backend()})", lambda: list(decoding.ArrayStream(chunked(body, chunk), keep_raw=True))),
+        ("ndjson", "json.dumps por fila", lambda: "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)),
+        ("ndjson", "RawRow.raw", lambda: "".join(decoding.raw_json(row) + "\n" for row in raw_rows))
+    ]
+    for name in decoding.BACKENDS:
+        for keep_raw in (False, True):
+            cases.append(("export", f"stream{' + raw' if keep_raw else ''} ({name})",
+                          with_backend(name, lambda keep_raw=keep_raw: "".join(
+                              decoding.raw_json(row) + "\n"
+                              for row in decoding.ArrayStream(chunked(body, chunk), keep_raw)))))
+    cases.append(("texto", "json.dumps indent", lambda: json.dumps(rows, indent=2, ensure_ascii=False)))
+    for name in decoding.BACKENDS:
+        cases.append(("texto", f"dumps indent ({name})",
+                      with_backend(name, lambda: decoding.dumps(rows, indent=True))))
+
+    megabytes = len(body) / 1e6
+    print(f"\n== {label}: {lines} filas, {megabytes:.1f} MB ==")
+    print(f"{'Grupo':<8} {'Caso':<24} {'ms':>10} {'MB/s':>8} {'vs base':>8}")
+    results = []
+    baselines = {}
+    for group, name, func in cases:
+        ms = measure(func, repeat)
+        baseline = baselines.setdefault(group, ms)
+        results.append({"group": group, "case": name, "ms": ms,
+                        "mb_per_s": round(megabytes / (ms / 1000), 1) if ms else None,
+                        "speedup": round(baseline / ms, 2) if ms else None})
+        row = results[-1]
+        print(f"{group:<8} {name:<24} {ms:>10.2f} {row['mb_per_s']:>8} {row['speedup']:>7}x")
+    return {"lines": lines, "bytes": len(body), "cases": results}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark de decodificación JSON")
+    parser.add_argument("--sizes", default="10k,100k", help="filas separadas por coma (10k,100k,1m)")
+    parser.add_argument("--repeat", type=int, default=5, help="ejecuciones medidas por caso")
+    parser.add_argument("--chunk", type=int, default=config.JSON_STREAM_CHUNK, help="bytes por bloque en streaming")
+    parser.add_argument("--output", help="guardar los resultados en este JSON")
+    args = parser.parse_args(argv)
+
+    print(f"Backends disponibles: {', '.join(decoding.BACKENDS)}")
+    report = {"backends": list(decoding.BACKENDS), "chunk": args.chunk, "results": {}}
+    for label in [size.strip() for size in args.sizes.split(",") if size.strip()]:
+        report["results"][label] = run_size(label, parse_size(label), args.repeat, args.chunk)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
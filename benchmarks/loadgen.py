@@ -0,0 +1,401 @@
+"""Generador de carga multiusuario con verificación de RLS
+
+Uso:
+    python -m benchmarks.loadgen --size 10k --users-per-profile 4 --duration 30 --mix mixto
+    python -m benchmarks.loadgen --url https://xxxx.supabase.co --users-per-profile 2 --iterations 50
+
+Automatiza las pruebas de "Test con 2 usuarios diferentes" y de la carpeta
+RLS de la colección de Postman. Cada perfil es un usuario de config.USERS
+con sus países y categorías permitidos. Por perfil corren
+`--users-per-profile` usuarios virtuales, cada uno en su hilo con su propio
+SupabaseClient (sesión propia, sin caché de respuestas). Cada usuario elige
+llamadas al azar según el `--mix`, incluso de países que no tiene
+permitidos. Cada respuesta se compara con los permisos del perfil: una
+fila de otro país o categoría cuenta como violación de RLS.
+
+Sin `--url` se levanta el servidor simulado en otro proceso y los permisos
+esperados son DEFAULT_GRANTS. Con `--url` se leen de user_allowed_* al
+empezar. Se reporta por perfil throughput, percentiles de latencia, tasa de
+errores y violaciones. El código de salida es 1 si hubo alguna violación.
+Solo hace lecturas: las pruebas de escritura de Postman no se repiten bajo carga.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from supabase_client import SupabaseClient
+from benchmarks.datasets import COUNTRIES, parse_size
+from benchmarks.run import summarize, git_commit
+from benchmarks import mock_server
+
+# Todos los países, no solo los permitidos: pedir uno ajeno debe devolver vacío
+COUNTRY_CODES = tuple(code for code, _ in COUNTRIES)
+SEARCH_TEXTS = ("mar", "ana", "jos", "lu", "car", "a")
+MAX_SAMPLES = 20
+
+class Grants:
+    """Permisos esperados de un perfil: países, ids de categoría y sus nombres"""
+    def __init__(self, countries, categories, names=None):
+        self.countries = set(countries)
+        self.categories = {int(category) for category in categories}
+        self.category_names = {(names or {}).get(category) for category in self.categories} - {None}
+
+    def check(self, rows, country=None, category=None, category_name=None):
+        """Describir las filas fuera del alcance; `country`/`category` son rutas como "invoices.customers.country_code" """
+        problems = []
+        for row in rows:
+            code = _path(row, country) if country else None
+            if code is not None and code not in self.countries:
+                problems.append(f"país {code} no permitido ({country})")
+            category_id = _path(row, category) if category else None
+            if category_id is not None and int(category_id) not in self.categories:
+                problems.append(f"categoría {category_id} no permitida ({category})")
+            name = _path(row, category_name) if category_name else None
+            if name is not None and self.category_names and name not in self.category_names:
+                problems.append(f"categoría '{name}' no permitida ({category_name})")
+        return problems
+
+    def check_equal(self, actual, expected, label):
+        """Las tablas user_allowed_* deben devolver exactamente los permisos propios"""
+        if actual != expected:
+            return [f"{label}: se esperaba {sorted(expected)}, se recibió {sorted(actual)}"]
+        return []
+
+    def info(self):
+        return {"countries": sorted(self.countries), "categories": sorted(self.categories)}
+
+def _path(row, path):
+    value = row
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+def _first_page(client, resource, select, page_size):
+    """Primera página de una vista grande (lo que muestra la GUI al abrirla)"""
+    rows = client.iter_rows(resource, [("select", select)], page_size=page_size)
+    return {"success": True, "data": rows.next_page()}
+
+# Operación: (llamada(cliente, rng), verificación(permisos, filas) -> problemas)
+OPERATIONS = {
+    "get_sales_by_category": (
+        lambda c, rng: c.get_sales_by_category(),
+        lambda g, rows: g.check(rows, category="category_id")),
+    "get_sales_by_country": (
+        lambda c, rng: c.get_sales_by_country(rng.choice(COUNTRY_CODES)),
+        lambda g, rows: g.check(rows, country="country_code")),
+    "get_top_products": (
+        lambda c, rng: c.get_top_products(10),
+        lambda g, rows: g.check(rows, category_name="category_name")),
+    "get_sales_fact": (
+        lambda c, rng: _first_page(c, "v_sales_fact", "line_id,country_code,category_id,line_total", 200),
+        lambda g, rows: g.check(rows, country="country_code", category="category_id")),
+    "get_sales_summary_category": (
+        lambda c, rng: c.get_sales_summary("category"),
+        lambda g, rows: g.check(rows, category="group_key")),
+    "get_sales_summary_country": (
+        lambda c, rng: c.get_sales_summary("country"),
+        lambda g, rows: g.check(rows, country="group_key")),
+    "get_products_by_price_range": (
+        lambda c, rng: c.get_products_by_price_range(
+            rng.choice((0, 50, 100)), rng.choice((500, 1000, 5000)),
+            columns=("id", "name", "unit_price", "category_id")),
+        lambda g, rows: g.check(rows, category="category_id")),
+    "search_customers": (
+        lambda c, rng: c.search_customers(rng.choice(SEARCH_TEXTS), columns=("id", "name", "country_code")),
+        lambda g, rows: g.check(rows, country="country_code")),
+    "suggest_customers": (
+        lambda c, rng: c.suggest_customers(rng.choice(SEARCH_TEXTS)),
+        lambda g, rows: g.check(rows, country="country_code")),
+    "get_invoices_this_month": (
+        lambda c, rng: c.get_invoices_this_month(),
+        lambda g, rows: g.check(rows, country="customers.country_code")),
+    "get_high_value_invoice_lines": (
+        lambda c, rng: c.get_high_value_invoice_lines(
+            rng.choice((1000, 2000)),
+            columns=("id", "line_total", {"products": ("category_id",)},
+                     {"invoices": ({"customers": ("country_code",)},)})),
+        lambda g, rows: g.check(rows, country="invoices.customers.country_code",
+                                category="products.category_id")),
+    "get_my_allowed_countries": (
+        lambda c, rng: c.get_my_allowed_countries(),
+        lambda g, rows: g.check_equal({row["country_code"] for row in rows}, g.countries,
+                                      "user_allowed_country")),
+    "get_my_allowed_categories": (
+        lambda c, rng: c.get_my_allowed_categories(),
+        lambda g, rows: g.check_equal({int(row["category_id"]) for row in rows}, g.categories,
+                                      "user_allowed_category"))
+}
+
+# Pesos por operación: "reportes" imita la pestaña de reportes, "consultas"
+# las búsquedas y "mixto" una sesión típica con ambas
+MIXES = {
+    "reportes": {"get_sales_by_category": 3, "get_sales_by_country": 3, "get_top_products": 2,
+                 "get_sales_summary_category": 2, "get_sales_summary_country": 2, "get_sales_fact": 1},
+    "consultas": {"search_customers": 3, "suggest_customers": 3, "get_products_by_price_range": 2,
+                  "get_invoices_this_month": 1, "get_high_value_invoice_lines": 1,
+                  "get_my_allowed_countries": 1, "get_my_allowed_categories": 1},
+    "mixto": {"get_sales_by_category": 3, "get_sales_by_country": 3, "get_top_products": 2,
+              "get_sales_summary_category": 1, "get_sales_summary_country": 1, "get_sales_fact": 1,
+              "search_customers": 2, "suggest_customers": 2, "get_products_by_price_range": 2,
+              "get_invoices_this_month": 1, "get_high_value_invoice_lines": 1,
+              "get_my_allowed_countries": 1, "get_my_allowed_categories": 1}
+}
+
+def new_client(base_url, email, password):
+    """Cliente de un usuario virtual: sesión propia y sin caché de respuestas"""
+    client = SupabaseClient(pool_size=1)
+    if base_url:
+        client.base_url = base_url
+    client.cache.ttls = {}
+    client.cache.default_ttl = 0
+    result = client.login(email, password)
+    if not result["success"]:
+        raise RuntimeError(f"{email}: {result['message']}")
+    return client
+
+def load_grants(client, names):
+    """Permisos de un usuario según sus filas de user_allowed_* (endpoint real)"""
+    countries = client.get_my_allowed_countries()
+    categories = client.get_my_allowed_categories()
+    for result in (countries, categories):
+        if not result["success"]:
+            raise RuntimeError(f"No se pudieron leer los permisos: {result.get('error')}")
+    return Grants([row["country_code"] for row in countries["data"]],
+                  [row["category_id"] for row in categories["data"]], names)
+
+def category_names(base_url, profile):
+    client = new_client(base_url, profile["email"], profile["password"])
+    try:
+        result = client.get_categories(columns=("id", "name"))
+        if not result["success"]:
+            raise RuntimeError(f"No se pudo leer el catálogo de categorías: {result.get('error')}")
+        return {int(row["id"]): row["name"] for row in result["data"]}
+    finally:
+        client.close()
+
+def build_profiles(base_url, grants=None):
+    """Un perfil por usuario de config.USERS con sus permisos esperados
+
+    `grants` es la lista de (países, categorías) en el orden de config.USERS;
+    si es None se leen de user_allowed_* con la sesión de cada usuario.
+    """
+    profiles = [{"name": name, "email": user["email"], "password": user["password"]}
+                for name, user in config.USERS.items()]
+    names = category_names(base_url, profiles[0])
+    for index, profile in enumerate(profiles):
+        if grants is not None:
+            profile["grants"] = Grants(*grants[index], names=names)
+            continue
+        client = new_client(base_url, profile["email"], profile["password"])
+        try:
+            profile["grants"] = load_grants(client, names)
+        finally:
+            client.close()
+    return profiles
+
+class ProfileStats:
+    """Resultados acumulados de los usuarios virtuales de un perfil"""
+    def __init__(self, profile):
+        self.profile = profile
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.errors = 0
+        self.rows = 0
+        self.violations = 0
+        self.samples = []
+        self.methods = {}
+
+    def record(self, method, latency, ok, rows, problems, error=None):
+        with self.lock:
+            self.latencies.append(latency)
+            entry = self.methods.setdefault(method, {"latencies": [], "errors": 0, "violations": 0})
+            entry["latencies"].append(latency)
+            if not ok:
+                self.errors += 1
+                entry["errors"] += 1
+                if error and len(self.samples) < MAX_SAMPLES:
+                    self.samples.append({"method": method, "error": error})
+            self.rows += rows
+            if problems:
+                self.violations += len(problems)
+                entry["violations"] += len(problems)
+                for problem in problems[:MAX_SAMPLES - len(self.samples)]:
+                    self.samples.append({"method": method, "violation": problem})
+
+    def report(self, elapsed):
+        calls = len(self.latencies)
+        result = {
+            "email": self.profile["email"],
+            "grants": self.profile["grants"].info(),
+            "calls": calls,
+            "errors": self.errors,
+            "error_rate": round(self.errors / calls, 4) if calls else 0.0,
+            "calls_per_s": round(calls / elapsed, 2) if elapsed else None,
+            "rows": self.rows,
+            "violations": self.violations,
+            "samples": self.samples,
+            "methods": {}
+        }
+        if calls:
+            result.update(summarize(self.latencies))
+        for method, entry in sorted(self.methods.items()):
+            stats = summarize(entry["latencies"])
+            stats.update({"calls": len(entry["latencies"]), "errors": entry["errors"],
+                          "violations": entry["violations"]})
+            result["methods"][method] = stats
+        return result
+
+def virtual_user(client, profile, stats, mix, rng, deadline, iterations, think):
+    """Bucle de un usuario virtual hasta el plazo o el número de iteraciones"""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    done = 0
+    while (iterations is None or done < iterations) and (deadline is None or time.perf_counter() < deadline):
+        method = rng.choices(names, weights)[0]
+        call, check = OPERATIONS[method]
+        started = time.perf_counter()
+        try:
+            result = call(client, rng)
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        latency = time.perf_counter() - started
+        data = result.get("data") if result["success"] else None
+        rows = data if isinstance(data, list) else []
+        problems = check(profile["grants"], rows) if result["success"] else []
+        stats.record(method, latency, result["success"], len(rows), problems,
+                     None if result["success"] else result.get("error") or result.get("message"))
+        done += 1
+        if think:
+            time.sleep(rng.uniform(0, 2 * think))
+
+def run(base_url, profiles, users_per_profile=2, duration=None, iterations=None, mix="mixto",
+        think=0.0, seed=42):
+    """Correr la carga y devolver el reporte por perfil
+
+    `duration` en segundos o `iterations` llamadas por usuario virtual (si
+    están ambos, termina con el primero que se cumpla). `think` es la pausa
+    media entre llamadas en segundos.
+    """
+    if mix not in MIXES:
+        raise ValueError(f"Mix desconocido: {mix} (opciones: {', '.join(MIXES)})")
+    if duration is None and iterations is None:
+        raise ValueError("Se necesita duration o iterations")
+    stats = {profile["name"]: ProfileStats(profile) for profile in profiles}
+    users = []
+    login_started = time.perf_counter()
+    for profile in profiles:
+        for index in range(users_per_profile):
+            client = new_client(base_url, profile["email"], profile["password"])
+            users.append((client, profile, random.Random(f"{seed}-{profile['email']}-{index}"), index))
+    login_seconds = time.perf_counter() - login_started
+
+    # El plazo empieza después de los logins: no cuentan en la duración
+    started = time.perf_counter()
+    deadline = started + duration if duration is not None else None
+    threads = [threading.Thread(target=virtual_user, name=f"vu-{profile['email']}-{index}",
+                                args=(client, profile, stats[profile["name"]], MIXES[mix], rng,
+                                      deadline, iterations, think), daemon=True)
+               for client, profile, rng, index in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    for client, _, _, _ in users:
+        client.close()
+
+    report = {name: profile_stats.report(elapsed) for name, profile_stats in stats.items()}
+    calls = sum(entry["calls"] for entry in report.values())
+    errors = sum(entry["errors"] for entry in report.values())
+    return {
+        "success": not any(entry["violations"] for entry in report.values()),
+        "data": {
+            "mix": mix,
+            "virtual_users": len(threads),
+            "elapsed": round(elapsed, 3),
+            "login_seconds": round(login_seconds, 3),
+            "calls": calls,
+            "calls_per_s": round(calls / elapsed, 2) if elapsed else None,
+            "errors": errors,
+            "error_rate": round(errors / calls, 4) if calls else 0.0,
+            "violations": sum(entry["violations"] for entry in report.values()),
+            "profiles": report
+        }
+    }
+
+def print_report(data):
+    print(f"\n{'Perfil':<44} {'Llamadas':>8} {'/s':>8} {'Err %':>6} {'p50 ms':>8} {'p90 ms':>8} "
+          f"{'p99 ms':>8} {'RLS':>5}")
+    for name, entry in data["profiles"].items():
+        print(f"{name[:44]:<44} {entry['calls']:>8} {entry['calls_per_s']:>8} "
+              f"{entry['error_rate'] * 100:>6.1f} {entry.get('p50_ms', 0):>8.2f} "
+              f"{entry.get('p90_ms', 0):>8.2f} {entry.get('p99_ms', 0):>8.2f} {entry['violations']:>5}")
+        for sample in entry["samples"][:5]:
+            detail = sample.get("violation") or f"error: {sample.get('error')}"
+            print(f"    {sample['method']}: {detail}")
+    print(f"\nUsuarios virtuales: {data['virtual_users']} | Mix: {data['mix']} | "
+          f"Duración: {data['elapsed']:.1f}s | Total: {data['calls_per_s']} llamadas/s | "
+          f"Errores: {data['errors']} | Violaciones RLS: {data['violations']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Carga multiusuario con verificación de RLS")
+    parser.add_argument("--url", help="endpoint real de Supabase (por defecto, servidor simulado)")
+    parser.add_argument("--key", help="API key anon para --url (por defecto config.SUPABASE_KEY)")
+    parser.add_argument("--size", default="10k", help="líneas del dataset simulado (10k, 100k, 1m)")
+    parser.add_argument("--latency", type=float, default=0.0, help="latencia simulada por petición en ms")
+    parser.add_argument("--users-per-profile", type=int, default=2, help="usuarios virtuales por perfil")
+    parser.add_argument("--duration", type=float, default=None, help="segundos de carga (por defecto 10)")
+    parser.add_argument("--iterations", type=int, default=None, help="llamadas por usuario virtual")
+    parser.add_argument("--mix", default="mixto", choices=sorted(MIXES), help="mezcla de llamadas")
+    parser.add_argument("--think", type=float, default=0.0, help="pausa media entre llamadas en ms")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="guardar el reporte en este JSON")
+    args = parser.parse_args(argv)
+    if args.duration is None and args.iterations is None:
+        args.duration = 10.0
+
+    process = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+        if args.key:
+            config.SUPABASE_KEY = args.key
+        grants = None
+    else:
+        process, base_url = mock_server.start_process(parse_size(args.size), args.latency / 1000,
+                                                      seed=args.seed)
+        grants = mock_server.DEFAULT_GRANTS
+        print(f"Servidor simulado en {base_url}")
+    try:
+        profiles = build_profiles(base_url, grants)
+        for profile in profiles:
+            info = profile["grants"].info()
+            print(f"{profile['name']}: países {','.join(info['countries'])} | categorías "
+                  f"{','.join(str(category) for category in info['categories'])}")
+        result = run(base_url, profiles, args.users_per_profile, args.duration, args.iterations,
+                     args.mix, args.think / 1000, args.seed)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join()
+
+    report = result["data"]
+    report["meta"] = {"commit": git_commit(), "url": args.url or "mock", "size": None if args.url else args.size,
+                      "latency_ms": args.latency, "seed": args.seed}
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2, ensure_ascii=False)
+        print(f"\nReporte guardado en {args.output}")
+    return 0 if result["success"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,667 @@
+import bisect
+import hashlib
+import json
+import re
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+import config
+from benchmarks.datasets import Dataset, END_DATE, FACT_COLUMNS
+
+# Permisos de los usuarios de config.USERS, en el mismo orden (países, categorías)
+DEFAULT_GRANTS = [
+    (("CR", "US"), (1, 2, 3, 4)),
+    (("MX", "ES"), (3, 4, 5, 6)),
+    (("CR", "MX", "CO", "PA"), (1, 5, 7, 8))
+]
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+class MockUser:
+    """Usuario del servidor simulado con sus permisos de país y categoría"""
+    def __init__(self, email, password, countries=(), categories=()):
+        self.id = str(uuid.uuid5(uuid.NAMESPACE_URL, email))
+        self.email = email
+        self.password = password
+        self.countries = set(countries)
+        self.categories = set(categories)
+
+    @property
+    def key(self):
+        return self.id
+
+    def info(self):
+        return {"id": self.id, "email": self.email, "role": "authenticated"}
+
+class ServiceRole:
+    """Principal del service role: no aplica RLS"""
+    key = "service"
+
+class Anonymous:
+    """Principal sin JWT: las políticas no le dejan ver filas protegidas"""
+    key = "anon"
+    countries = frozenset()
+    categories = frozenset()
+    id = None
+
+class Resource:
+    """Tabla o vista expuesta en /rest/v1 sobre filas guardadas como tuplas
+
+    `public` asocia cada columna visible con su posición en la tupla; `scope`
+    emula la política RLS (recibe la fila y el principal). Las vistas
+    agregadas usan `compute`, que recibe las filas de hechos ya filtradas.
+    """
+    def __init__(self, rows, public, scope=None, compute=None, embeds=None, key=None):
+        self.rows = rows
+        self.public = OrderedDict((name, index) for index, name in enumerate(public)) \
+            if not isinstance(public, dict) else OrderedDict(public)
+        self.scope = scope
+        self.compute = compute
+        self.embeds = embeds or {}
+        self.key = key
+        self._index = None
+
+    def lookup(self, value):
+        """Fila por su llave (para embeber recursos relacionados)"""
+        if self._index is None:
+            position = self.public[self.key]
+            self._index = {row[position]: row for row in self.rows}
+        return self._index.get(value)
+
+class MockSupabase:
+    """Servidor local que imita los endpoints de Supabase usados por SupabaseClient
+
+    Implementa el subconjunto de PostgREST que usa el cliente (select con
+    recursos embebidos, filtros eq/neq/gt/gte/lt/lte/like/ilike/in/is,
+    order, limit/offset, Range, Prefer: count, ETag/If-None-Match y
+    /rpc/sales_summary) y de GoTrue (login por password y refresh token,
+    admin/users). Las filas visibles dependen de los permisos del usuario del
+    JWT, igual que las políticas RLS del esquema. `latency` (segundos por
+    petición) y `bandwidth` (bytes por segundo) simulan la red.
+    """
+    def __init__(self, dataset=None, latency=0.0, bandwidth=None, users=None, max_rows=None,
+                 service_key=None, token_ttl=3600):
+        self.dataset = dataset or Dataset(10000)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.max_rows = max_rows
+        self.service_key = service_key or config.SERVICE_ROLE_KEY
+        self.token_ttl = token_ttl
+        self.users = {}
+        self.tokens = {}
+        self.refresh_tokens = {}
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.bytes_sent = 0
+        self.refreshed_at = datetime.now(timezone.utc)
+        self._cache = OrderedDict()
+        self._server = None
+
+        if users is None:
+            users = [(user["email"], user["password"], countries, categories)
+                     for user, (countries, categories) in zip(config.USERS.values(), DEFAULT_GRANTS)]
+        for email, password, countries, categories in users:
+            self.add_user(email, password, countries, categories)
+        self.resources = self._build_resources()
+
+    # Ciclo de vida
+    def start(self, port=0):
+        """Levantar el servidor (por defecto en un puerto libre) y devolver la URL base"""
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="mock-supabase", daemon=True).start()
+        return self.base_url
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # Usuarios y permisos
+    def add_user(self, email, password, countries=(), categories=()):
+        user = MockUser(email, password, countries, categories)
+        with self.lock:
+            self.users[email] = user
+            self._cache.clear()
+        return user
+
+    def set_grants(self, email, countries=None, categories=None):
+        """Cambiar los permisos de un usuario (equivale a editar user_allowed_*)"""
+        user = self.users[email]
+        with self.lock:
+            if countries is not None:
+                user.countries = set(countries)
+            if categories is not None:
+                user.categories = set(categories)
+            self._cache.clear()
+
+    def is_visible(self, email, country_code=None, category_id=None):
+        """Indicar si la política RLS deja ver una fila con ese país/categoría"""
+        user = self.users[email]
+        if country_code is not None and country_code not in user.countries:
+            return False
+        if category_id is not None and int(category_id) not in user.categories:
+            return False
+        return True
+
+    def _issue_tokens(self, user):
+        access = f"mock-access-{uuid.uuid4().hex}"
+        refresh = f"mock-refresh-{uuid.uuid4().hex}"
+        expires_at = time.time() + self.token_ttl
+        with self.lock:
+            self.tokens[access] = (user, expires_at)
+            self.refresh_tokens[refresh] = user
+        return {"access_token": access, "token_type": "bearer", "expires_in": self.token_ttl,
+                "expires_at": int(expires_at), "refresh_token": refresh, "user": user.info()}
+
+    def principal(self, headers):
+        token = _bearer(headers)
+        if token and token == self.service_key:
+            return ServiceRole()
+        entry = self.tokens.get(token)
+        if entry is None or entry[1] <= time.time():
+            return Anonymous()
+        return entry[0]
+
+    def token_expired(self, headers):
+        """Indicar si la petición trae un access token emitido pero ya vencido"""
+        entry = self.tokens.get(_bearer(headers))
+        return entry is not None and entry[1] <= time.time()
+
+    # Recursos de /rest/v1
+    def _build_resources(self):
+        data = self.dataset
+        fact_public = FACT_COLUMNS
+        line_public = {"id": 0, "invoice_id": 1, "product_id": 6, "quantity": 10,
+                       "unit_price": 11, "line_total": 12}
+
+        def by_country(position):
+            return lambda row, user: row[position] in user.countries
+
+        def by_grants(row, user):
+            return row[5] in user.countries and row[8] in user.categories
+
+        def own_rows(row, user):
+            return row[0] == user.id
+
+        countries = Resource([(c["code"], c["name"]) for c in data.countries], ("code", "name"), key="code")
+        categories = Resource([(c["id"], c["name"]) for c in data.categories], ("id", "name"), key="id")
+        products = Resource(data.products, ("id", "name", "category_id", "unit_price", "created_at"),
+                            scope=lambda row, user: row[2] in user.categories, key="id",
+                            embeds={"categories": ("category_id", "categories")})
+        customers = Resource(data.customers, ("id", "name", "email", "country_code", "created_at"),
+                             scope=by_country(3), key="id",
+                             embeds={"countries": ("country_code", "countries")})
+        invoices = Resource(data.invoices, ("id", "customer_id", "invoice_date", "total_amount", "created_at"),
+                            scope=by_country(5), key="id",
+                            embeds={"customers": ("customer_id", "customers")})
+        lines = Resource(data.fact, line_public, scope=by_grants, key="id",
+                         embeds={"products": ("product_id", "products"), "invoices": ("invoice_id", "invoices")})
+
+        def allowed_countries():
+            return [(user.id, code) for user in self.users.values() for code in sorted(user.countries)]
+
+        def allowed_categories():
+            return [(user.id, cat) for user in self.users.values() for cat in sorted(user.categories)]
+
+        def refresh_state():
+            stamp = self.refreshed_at.isoformat()
+            return [(name, stamp, False) for name in ("mv_sales_fact", "mv_sales_daily", "mv_product_sales_daily")]
+
+        return {
+            "countries": countries,
+            "categories": categories,
+            "products": products,
+            "customers": customers,
+            "invoices": invoices,
+            "invoice_lines": lines,
+            "v_sales_fact": Resource(data.fact, fact_public, scope=by_grants, key="line_id"),
+            "v_sales_by_category": Resource(
+                None, ("category_id", "category_name", "invoices", "total_quantity", "total_sales"),
+                compute=lambda fact: self._aggregate(fact, (8, 9), ("invoices",))),
+            "v_sales_by_country": Resource(
+                None, ("country_code", "line_count", "total_quantity", "total_sales"),
+                compute=lambda fact: self._aggregate(fact, (5,), ("line_count",))),
+            "v_top_products_30d": Resource(
+                None, ("product_id", "product_name", "category_name", "total_quantity", "total_sales"),
+                compute=self._top_products_30d),
+            "user_allowed_country": Resource(allowed_countries, ("user_id", "country_code"), scope=own_rows,
+                                             embeds={"countries": ("country_code", "countries")}),
+            "user_allowed_category": Resource(allowed_categories, ("user_id", "category_id"), scope=own_rows,
+                                              embeds={"categories": ("category_id", "categories")}),
+            "report_refresh_state": Resource(refresh_state, ("view_name", "refreshed_at", "dirty"))
+        }
+
+    @staticmethod
+    def _aggregate(fact, keys, extra):
+        groups = {}
+        for row in fact:
+            key = tuple(row[k] for k in keys)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = [set(), 0, 0, 0.0]
+            group[0].add(row[1])
+            group[1] += 1
+            group[2] += row[10]
+            group[3] += row[12]
+        result = []
+        for key, (invoice_ids, count, quantity, sales) in groups.items():
+            value = len(invoice_ids) if extra == ("invoices",) else count
+            result.append(key + (value, quantity, round(sales, 2)))
+        result.sort(key=lambda row: row[-1], reverse=True)
+        return result
+
+    @staticmethod
+    def _top_products_30d(fact):
+        since = (END_DATE - timedelta(days=30)).isoformat()
+        groups = {}
+        for row in fact:
+            if row[2] < since:
+                continue
+            group = groups.setdefault((row[6], row[7], row[9]), [0, 0.0])
+            group[0] += row[10]
+            group[1] += row[12]
+        result = [key + (quantity, round(sales, 2)) for key, (quantity, sales) in groups.items()]
+        result.sort(key=lambda row: row[-1], reverse=True)
+        return result
+
+    def _cached(self, key, build):
+        with self.lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        value = build()
+        with self.lock:
+            self._cache[key] = value
+            while len(self._cache) > 32:
+                self._cache.popitem(last=False)
+        return value
+
+    def _scoped_rows(self, name, principal):
+        """Filas visibles de un recurso para el principal (equivalente a RLS)"""
+        resource = self.resources[name]
+
+        def build():
+            if resource.compute is not None:
+                return resource.compute(self._scoped_rows("v_sales_fact", principal))
+            rows = resource.rows() if callable(resource.rows) else resource.rows
+            if resource.scope is None or isinstance(principal, ServiceRole):
+                return rows
+            return [row for row in rows if resource.scope(row, principal)]
+
+        return self._cached((name, principal.key), build)
+
+    def query(self, name, params, principal, range_header=None):
+        """Resolver un GET de PostgREST; devuelve (status, filas, total)"""
+        resource = self.resources[name]
+        filters = [(k, v) for k, v in params if k not in RESERVED_PARAMS]
+        order = dict(params).get("order")
+        # Paginación por keyset (`id=gt.N` + `order=id.asc`): la lista ordenada se
+        # cachea sin ese filtro y cada página se ubica con búsqueda binaria
+        keyset = None
+        if order and "," not in order and order.endswith(".asc"):
+            column = order[:-4]
+            for item in filters:
+                if item[0] == column and item[1].startswith("gt."):
+                    keyset = (resource.public[column], item[1][3:])
+                    filters.remove(item)
+                    break
+        key = (name, principal.key, tuple(filters), order)
+
+        def build():
+            rows = self._scoped_rows(name, principal)
+            predicates = [self._predicate(resource, column, expr, rows) for column, expr in filters]
+            if predicates:
+                rows = [row for row in rows if all(p(row) for p in predicates)]
+            if order:
+                rows = list(rows)
+                for part in reversed(order.split(",")):
+                    column, _, direction = part.partition(".")
+                    position = resource.public[column]
+                    rows.sort(key=lambda row: (row[position] is None, row[position]),
+                              reverse=direction.startswith("desc"))
+            return rows
+
+        rows = self._cached(key, build) if (filters or order) else self._scoped_rows(name, principal)
+        base = 0
+        if keyset and rows:
+            position, raw = keyset
+            after = type(rows[0][position])(raw) if isinstance(rows[0][position], (int, float)) else raw
+            base = bisect.bisect_right(rows, after, key=lambda row: row[position])
+        total = len(rows) - base
+        values = dict(params)
+        start = int(values.get("offset", 0))
+        end = total
+        if "limit" in values:
+            end = start + int(values["limit"])
+        if range_header:
+            first, _, last = range_header.partition("-")
+            start = int(first)
+            end = int(last) + 1 if last else total
+            if start >= total and total > 0 or (start > 0 and total == 0):
+                return 416, [], total
+        if self.max_rows:
+            end = min(end, start + self.max_rows)
+        page = rows[base + start:base + end]
+        select = values.get("select", "*")
+        return 200, [self._project(resource, row, _parse_select(select), principal) for row in page], total
+
+    def _project(self, resource, row, items, principal):
+        result = {}
+        for name, children in items:
+            if children is None:
+                if name == "*":
+                    for column, position in resource.public.items():
+                        result[column] = row[position]
+                else:
+                    result[name] = row[resource.public[name]]
+                continue
+            local, target_name = resource.embeds[name]
+            target = self.resources[target_name]
+            related = target.lookup(row[resource.public[local]])
+            if related is not None and target.scope is not None and not isinstance(principal, ServiceRole):
+                if not target.scope(related, principal):
+                    related = None
+            result[name] = None if related is None else self._project(target, related, children, principal)
+        return result
+
+    @staticmethod
+    def _predicate(resource, column, expr, rows):
+        position = resource.public[column]
+        negate = expr.startswith("not.")
+        if negate:
+            expr = expr[4:]
+        op, _, raw = expr.partition(".")
+        sample = rows[0][position] if rows else None
+
+        def cast(value):
+            if isinstance(sample, bool):
+                return value == "true"
+            if isinstance(sample, int):
+                return int(float(value))
+            if isinstance(sample, float):
+                return float(value)
+            return value
+
+        if op in ("like", "ilike"):
+            regex = _like_regex(raw.replace("*", "%"), op == "ilike")
+            test = lambda value: value is not None and regex.fullmatch(str(value)) is not None
+        elif op == "in":
+            options = {cast(item.strip('"')) for item in raw.strip("()").split(",") if item}
+            test = lambda value: value in options
+        elif op == "is":
+            expected = {"null": None, "true": True, "false": False}[raw]
+            test = lambda value: value is expected
+        else:
+            target = cast(raw)
+            compare = {
+                "eq": lambda value: value == target,
+                "neq": lambda value: value != target,
+                "gt": lambda value: value is not None and value > target,
+                "gte": lambda value: value is not None and value >= target,
+                "lt": lambda value: value is not None and value < target,
+                "lte": lambda value: value is not None and value <= target
+            }
+            test = compare[op]
+        if negate:
+            return lambda row: not test(row[position])
+        return lambda row: test(row[position])
+
+    def sales_summary(self, payload, principal):
+        """Emulación de public.sales_summary (migrations/001_report_rpcs.sql)"""
+        key = ("rpc/sales_summary", principal.key, json.dumps(payload, sort_keys=True))
+        return self._cached(key, lambda: self._sales_summary(payload, principal))
+
+    def _sales_summary(self, payload, principal):
+        fact = self._scoped_rows("v_sales_fact", principal)
+        group_by = payload.get("p_group_by", "category")
+        key_index = {"category": (8, 9), "country": (5, 5), "product": (6, 7)}.get(group_by)
+        if key_index is None:
+            return 400, {"message": f"p_group_by inválido: {group_by}"}
+        date_from = payload.get("p_date_from")
+        date_to = payload.get("p_date_to")
+        countries = set(payload.get("p_countries") or ())
+        categories = set(payload.get("p_categories") or ())
+        groups = {}
+        for row in fact:
+            if date_from and row[2] < date_from or date_to and row[2] > date_to:
+                continue
+            if countries and row[5] not in countries or categories and row[8] not in categories:
+                continue
+            group = groups.setdefault((str(row[key_index[0]]), row[key_index[1]]), [set(), 0, 0.0])
+            group[0].add(row[1])
+            group[1] += row[10]
+            group[2] += row[12]
+        result = [{"group_key": key, "group_label": label, "invoices": len(ids),
+                   "total_quantity": quantity, "total_sales": round(sales, 2)}
+                  for (key, label), (ids, quantity, sales) in groups.items()]
+        result.sort(key=lambda row: row["total_sales"], reverse=True)
+        if payload.get("p_limit"):
+            result = result[:int(payload["p_limit"])]
+        return 200, result
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Sin Nagle: los encabezados y el cuerpo van en escrituras separadas
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_GET(self):
+                self.started = time.perf_counter()
+                mock._count()
+                if mock.token_expired(self.headers):
+                    return self._json(401, {"code": "PGRST301", "message": "JWT expired"})
+                url = urlparse(self.path)
+                params = parse_qsl(url.query, keep_blank_values=True)
+                principal = mock.principal(self.headers)
+                if url.path.startswith("/rest/v1/"):
+                    name = url.path[len("/rest/v1/"):]
+                    if name not in mock.resources:
+                        return self._json(404, {"message": f"relation \"public.{name}\" does not exist"})
+                    try:
+                        status, rows, total = mock.query(name, params, principal, self.headers.get("Range"))
+                    except (KeyError, ValueError) as e:
+                        return self._json(400, {"message": f"Consulta no soportada: {e}"})
+                    if status == 416:
+                        return self._json(416, {"message": "Requested range not satisfiable"},
+                                          {"Content-Range": f"*/{total}"})
+                    prefer = self.headers.get("Prefer", "")
+                    shown = str(total) if "count=" in prefer else "*"
+                    first = int((self.headers.get("Range") or "0-").split("-")[0] or 0)
+                    extra = {"Content-Range": f"{first}-{first + len(rows) - 1}/{shown}" if rows else f"*/{shown}"}
+                    partial = self.headers.get("Range") and len(rows) < total
+                    return self._json(206 if partial else 200, rows, extra, etag=True)
+                if url.path == "/auth/v1/admin/users":
+                    if not isinstance(principal, ServiceRole):
+                        return self._json(403, {"msg": "User not allowed"})
+                    return self._json(200, {"users": [user.info() for user in mock.users.values()]})
+                if url.path == "/auth/v1/user":
+                    if isinstance(principal, MockUser):
+                        return self._json(200, principal.info())
+                    return self._json(401, {"msg": "invalid JWT"})
+                self._json(404, {"message": "not found"})
+
+            def do_POST(self):
+                self.started = time.perf_counter()
+                mock._count()
+                if mock.token_expired(self.headers):
+                    return self._json(401, {"code": "PGRST301", "message": "JWT expired"})
+                url = urlparse(self.path)
+                params = dict(parse_qsl(url.query))
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"null")
+                principal = mock.principal(self.headers)
+                if url.path == "/auth/v1/token":
+                    if params.get("grant_type") == "refresh_token":
+                        with mock.lock:
+                            user = mock.refresh_tokens.pop(payload.get("refresh_token"), None)
+                    else:
+                        user = mock.users.get(payload.get("email"))
+                        if user is not None and user.password != payload.get("password"):
+                            user = None
+                    if user is None:
+                        return self._json(400, {"error": "invalid_grant",
+                                                "error_description": "Invalid login credentials"})
+                    return self._json(200, mock._issue_tokens(user))
+                if url.path == "/auth/v1/admin/users":
+                    if not isinstance(principal, ServiceRole):
+                        return self._json(403, {"msg": "User not allowed"})
+                    if payload.get("email") in mock.users:
+                        return self._json(422, {"msg": "User already registered"})
+                    user = mock.add_user(payload.get("email"), payload.get("password"))
+                    return self._json(200, user.info())
+                if url.path == "/rest/v1/rpc/sales_summary":
+                    status, body = mock.sales_summary(payload or {}, principal)
+                    return self._json(status, body)
+                self._json(405, {"message": "Escritura no soportada por el servidor simulado"})
+
+            def _json(self, status, body, extra_headers=None, etag=False):
+                data = json.dumps(body, ensure_ascii=False).encode()
+                headers = dict(extra_headers or {})
+                # Tiempo de procesamiento del servidor, sin la latencia simulada
+                headers["Server-Timing"] = f"app;dur={(time.perf_counter() - self.started) * 1000:.3f}"
+                if etag:
+                    tag = '"' + hashlib.md5(data).hexdigest() + '"'
+                    headers["ETag"] = tag
+                    if self.headers.get("If-None-Match") == tag:
+                        status, data = 304, b""
+                if mock.latency:
+                    time.sleep(mock.latency)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self._write(data)
+                mock._sent(len(data))
+
+            def _write(self, data):
+                if not mock.bandwidth:
+                    self.wfile.write(data)
+                    return
+                chunk = 64 * 1024
+                for offset in range(0, len(data), chunk):
+                    piece = data[offset:offset + chunk]
+                    self.wfile.write(piece)
+                    time.sleep(len(piece) / mock.bandwidth)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def _count(self):
+        with self.lock:
+            self.request_count += 1
+
+    def _sent(self, size):
+        with self.lock:
+            self.bytes_sent += size
+
+def _bearer(headers):
+    auth = headers.get("Authorization", "")
+    return auth[7:] if auth.startswith("Bearer ") else ""
+
+def _like_regex(pattern, ignore_case):
+    """Patrón LIKE (`%`, `_` y escapes con `\\`) -> expresión regular"""
+    parts = []
+    chars = iter(pattern)
+    for char in chars:
+        if char == "\\":
+            parts.append(re.escape(next(chars, "\\")))
+        elif char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return re.compile("".join(parts), re.DOTALL | (re.IGNORECASE if ignore_case else 0))
+
+def _parse_select(select):
+    """Separar un select de PostgREST: '*,products(*),invoices(customers(*))'"""
+    items = []
+    depth = 0
+    current = ""
+    for char in select + ",":
+        if char == "," and depth == 0:
+            if current:
+                items.append(current)
+            current = ""
+            continue
+        depth += char == "("
+        depth -= char == ")"
+        current += char
+    parsed = []
+    for item in items:
+        item = item.split(":")[-1].strip()
+        if "(" in item:
+            name, _, inner = item.partition("(")
+            parsed.append((name.split("!")[0], _parse_select(inner[:-1])))
+        else:
+            parsed.append((item, None))
+    return parsed
+
+def serve(lines, latency=0.0, bandwidth=None, seed=42, port_queue=None, extra_users=(), port=0):
+    """Generar el dataset y atender peticiones hasta que se termine el proceso
+
+    Pensado para correr en un proceso aparte (multiprocessing), así la
+    memoria y el CPU del servidor no se mezclan con las mediciones del cliente.
+    """
+    mock = MockSupabase(Dataset(lines, seed=seed), latency=latency, bandwidth=bandwidth)
+    for email, password, countries, categories in extra_users:
+        mock.add_user(email, password, countries, categories)
+    url = mock.start(port)
+    if port_queue is not None:
+        port_queue.put(url)
+    else:
+        print(f"Servidor simulado en {url} ({lines} líneas)")
+    threading.Event().wait()
+
+def start_process(lines, latency=0.0, bandwidth=None, seed=42, extra_users=(), timeout=600):
+    """Levantar el servidor simulado en otro proceso; devuelve (proceso, base_url)"""
+    import multiprocessing
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=serve, args=(lines, latency, bandwidth, seed, queue, list(extra_users)),
+                              daemon=True)
+    process.start()
+    return process, queue.get(timeout=timeout)
+
+def main():
+    import argparse
+    from benchmarks.datasets import parse_size
+    parser = argparse.ArgumentParser(description="Servidor local que imita /rest/v1 y /auth/v1 de Supabase")
+    parser.add_argument("--size", default="10k", help="líneas de factura (10k, 100k, 1m)")
+    parser.add_argument("--latency", type=float, default=0.0, help="latencia por petición en ms")
+    parser.add_argument("--bandwidth", type=float, default=None, help="ancho de banda en Mbit/s")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--port", type=int, default=54321)
+    args = parser.parse_args()
+    bandwidth = args.bandwidth * 125000 if args.bandwidth else None
+    serve(parse_size(args.size), args.latency / 1000, bandwidth, args.seed, port=args.port)
+
+if __name__ == "__main__":
+    main()
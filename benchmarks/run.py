@@ -0,0 +1,258 @@
+"""Benchmarks de SupabaseClient contra el servidor simulado (benchmarks/mock_server.py)
+
+Uso:
+    python -m benchmarks.run --sizes 10k,100k --latency 20 --bandwidth 100 --output resultados.json
+    python -m benchmarks.run --sizes 10k --compare base.json --output actual.json
+
+Cada tamaño levanta el servidor en un proceso aparte con un dataset
+sintético reproducible (misma semilla), mide cada método del cliente y
+escribe un JSON con la versión (commit) para comparar entre commits.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from supabase_client import SupabaseClient
+from benchmarks.datasets import COUNTRIES, CATEGORIES, parse_size
+from benchmarks import mock_server
+
+# Usuario con todos los permisos: mide el volumen completo de cada dataset
+BENCH_USER = ("benchmark@example.com", "benchmark",
+              tuple(code for code, _ in COUNTRIES), tuple(range(1, len(CATEGORIES) + 1)))
+
+METHODS = [
+    ("get_countries", lambda c: c.get_countries()),
+    ("get_sales_fact", lambda c: c.get_sales_fact()),
+    ("get_sales_fact_columnar", lambda c: c.get_sales_fact(columnar=True)),
+    ("get_sales_by_category", lambda c: c.get_sales_by_category()),
+    ("get_sales_by_country", lambda c: c.get_sales_by_country("CR")),
+    ("get_top_products", lambda c: c.get_top_products(10)),
+    ("get_products_by_price_range", lambda c: c.get_products_by_price_range(100, 1000)),
+    ("search_customers", lambda c: c.search_customers("mar")),
+    ("get_invoices_this_month", lambda c: c.get_invoices_this_month("2024-12-01")),
+    ("get_high_value_invoice_lines", lambda c: c.get_high_value_invoice_lines(1000)),
+    ("get_sales_summary", lambda c: c.get_sales_summary("category"))
+]
+
+# Métodos livianos que se repiten bajo concurrencia para medir throughput
+THROUGHPUT_METHODS = ("get_sales_by_category", "get_top_products", "search_customers", "get_sales_summary")
+
+def percentile(values, pct):
+    """Percentil por rango más cercano (values no vacío)"""
+    ordered = sorted(values)
+    index = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+def summarize(latencies):
+    ms = [value * 1000 for value in latencies]
+    return {
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p90_ms": round(percentile(ms, 90), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "min_ms": round(min(ms), 3),
+        "max_ms": round(max(ms), 3)
+    }
+
+def new_client(base_url, cache, pool_size=None):
+    client = SupabaseClient(pool_size=pool_size)
+    client.base_url = base_url
+    if not cache:
+        client.cache.ttls = {}
+        client.cache.default_ttl = 0
+    result = client.login(BENCH_USER[0], BENCH_USER[1])
+    if not result["success"]:
+        raise RuntimeError(result["message"])
+    return client
+
+def measure_method(client, func, repeat):
+    """Latencias, filas, bytes, peticiones, memoria pico y tiempo de decodificación"""
+    bodies = []
+
+    def capture(response, *args, **kwargs):
+        bodies.append(response.content)
+
+    func(client)  # Calentamiento (también llena las cachés del servidor)
+    latencies = []
+    errors = 0
+    requests_before = client.request_count
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(client)
+        latencies.append(time.perf_counter() - started)
+        errors += not result["success"]
+    requests_per_call = (client.request_count - requests_before) / repeat
+
+    client.session.hooks["response"].append(capture)
+    try:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        func(client)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        client.session.hooks["response"].remove(capture)
+
+    started = time.perf_counter()
+    for body in bodies:
+        if body:
+            json.loads(body)
+    decode = time.perf_counter() - started
+
+    data = result.get("data") if result else None
+    stats = summarize(latencies)
+    stats.update({
+        "calls": repeat,
+        "errors": errors,
+        "rows": len(data) if hasattr(data, "__len__") else None,
+        "requests_per_call": requests_per_call,
+        "bytes": sum(len(body) for body in bodies),
+        "peak_memory_bytes": peak,
+        "decode_ms": round(decode * 1000, 3)
+    })
+    return stats
+
+def measure_throughput(client, func, concurrency, calls):
+    """Ejecutar `calls` llamadas con `concurrency` hilos sobre el mismo cliente"""
+    def timed(_):
+        started = time.perf_counter()
+        try:
+            ok = func(client)["success"]
+        except Exception:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(timed, range(calls)))
+    elapsed = time.perf_counter() - started
+    stats = summarize([latency for latency, _ in outcomes])
+    stats.update({
+        "calls": calls,
+        "errors": sum(not ok for _, ok in outcomes),
+        "requests_per_s": round(calls / elapsed, 2)
+    })
+    return stats
+
+def run_size(label, lines, args):
+    print(f"\n== Dataset {label} ({lines} líneas) ==")
+    bandwidth = args.bandwidth * 125000 if args.bandwidth else None
+    started = time.perf_counter()
+    process, base_url = mock_server.start_process(lines, args.latency / 1000, bandwidth, args.seed,
+                                                  extra_users=[BENCH_USER])
+    print(f"Servidor listo en {time.perf_counter() - started:.1f}s ({base_url})")
+    try:
+        client = new_client(base_url, args.cache, max(args.concurrency + [config.HTTP_POOL_SIZE]))
+        methods = {}
+        for name, func in METHODS:
+            if args.methods and name not in args.methods:
+                continue
+            methods[name] = measure_method(client, func, args.repeat)
+            stats = methods[name]
+            print(f"  {name:32} p50 {stats['p50_ms']:>10.2f} ms  p99 {stats['p99_ms']:>10.2f} ms  "
+                  f"{stats['rows']} filas  {stats['peak_memory_bytes'] / 1e6:.1f} MB pico")
+
+        throughput = {}
+        for name, func in METHODS:
+            if name not in THROUGHPUT_METHODS or (args.methods and name not in args.methods):
+                continue
+            throughput[name] = {}
+            for concurrency in args.concurrency:
+                stats = measure_throughput(client, func, concurrency, args.throughput_calls)
+                throughput[name][str(concurrency)] = stats
+                print(f"  {name:32} x{concurrency:<3} {stats['requests_per_s']:>8.1f} req/s  "
+                      f"p99 {stats['p99_ms']:.2f} ms  errores {stats['errors']}")
+        client.close()
+        return {"lines": lines, "methods": methods, "throughput": throughput}
+    finally:
+        process.terminate()
+        process.join()
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def compare(baseline, current, threshold):
+    """Imprimir la variación de p50 por método; devuelve la lista de regresiones"""
+    regressions = []
+    print(f"\n== Comparación con {baseline['meta'].get('commit')} ==")
+    for size, result in current["results"].items():
+        previous = baseline["results"].get(size)
+        if not previous:
+            continue
+        for name, stats in result["methods"].items():
+            before = previous["methods"].get(name)
+            if not before or not before["p50_ms"]:
+                continue
+            change = (stats["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+            flag = ""
+            if change > threshold:
+                flag = "  <-- regresión"
+                regressions.append((size, name, round(change, 1)))
+            print(f"  {size:6} {name:32} {before['p50_ms']:>10.2f} -> {stats['p50_ms']:>10.2f} ms "
+                  f"({change:+.1f}%){flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de SupabaseClient contra un servidor simulado")
+    parser.add_argument("--sizes", default="10k", help="tamaños separados por coma (10k,100k,1m)")
+    parser.add_argument("--latency", type=float, default=0.0, help="latencia simulada por petición en ms")
+    parser.add_argument("--bandwidth", type=float, default=None, help="ancho de banda simulado en Mbit/s")
+    parser.add_argument("--repeat", type=int, default=5, help="llamadas medidas por método")
+    parser.add_argument("--concurrency", default="1,4,8", help="niveles de concurrencia para throughput")
+    parser.add_argument("--throughput-calls", type=int, default=50, help="llamadas por nivel de concurrencia")
+    parser.add_argument("--methods", default="", help="limitar a estos métodos (separados por coma)")
+    parser.add_argument("--cache", action="store_true", help="mantener la caché de respuestas del cliente")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=10.0, help="% de aumento de p50 que cuenta como regresión")
+    args = parser.parse_args(argv)
+    args.concurrency = [int(value) for value in args.concurrency.split(",") if value]
+    args.methods = {value.strip() for value in args.methods.split(",") if value.strip()}
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency_ms": args.latency,
+            "bandwidth_mbit": args.bandwidth,
+            "repeat": args.repeat,
+            "cache": args.cache,
+            "seed": args.seed
+        },
+        "results": {}
+    }
+    for label in [size.strip() for size in args.sizes.split(",") if size.strip()]:
+        report["results"][label] = run_size(label, parse_size(label), args)
+
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            regressions = compare(json.load(handle), report, args.threshold)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
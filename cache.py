@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+
+class CacheEntry:
+    """Respuesta guardada en caché con su expiración, tamaño y validadores HTTP"""
+    __slots__ = ("result", "size", "expires_at", "validators")
+
+    def __init__(self, result, size, expires_at, validators=None):
+        self.result = result
+        self.size = size
+        self.expires_at = expires_at
+        self.validators = validators
+
+class ResponseCache:
+    """Caché TTL + LRU de respuestas de la API, acotada por bytes
+
+    Las claves incluyen el usuario y el rol, así los resultados filtrados
+    por RLS de un usuario nunca se sirven a otro. Las entradas expiradas que
+    tienen validadores (ETag/Last-Modified) se conservan para revalidarlas
+    con un GET condicional en lugar de volver a descargarlas.
+    """
+    def __init__(self, max_bytes, default_ttl, ttls=None):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.revalidations = 0
+        self.bytes_saved = 0
+
+    @staticmethod
+    def make_key(user_id, url, params, role, mode="page"):
+        """Clave normalizada: (usuario, URL, parámetros ordenados, rol, modo)
+
+        `mode` separa una sola página ("page") de la lectura de todas las
+        páginas ("all"): con los mismos parámetros devuelven datos distintos.
+        """
+        items = params.items() if isinstance(params, dict) else (params or [])
+        normalized = tuple(sorted((str(k), str(v)) for k, v in items))
+        return (user_id, url, normalized, role, mode)
+
+    def ttl_for(self, endpoint):
+        """TTL en segundos para un endpoint (0 = no cachear)"""
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def get(self, key):
+        """Devolver el resultado guardado o None si no existe o expiró"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                if entry.validators is None:
+                    self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry.result
+
+    def get_stale(self, key):
+        """Devolver la entrada aunque haya expirado, para enviar un GET condicional"""
+        with self.lock:
+            return self.entries.get(key)
+
+    def put(self, key, result, size, ttl, validators=None):
+        """Guardar un resultado y desalojar los menos usados si se excede el límite"""
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        self._store(key, CacheEntry(result, size, time.monotonic() + ttl, validators))
+
+    def revalidate(self, key, entry, ttl):
+        """Renovar una entrada confirmada por el servidor con 304 Not Modified"""
+        entry.expires_at = time.monotonic() + ttl
+        self._store(key, entry)
+        self.record_saved(entry.size)
+
+    def record_saved(self, size):
+        """Contabilizar bytes que no se descargaron gracias a un 304"""
+        with self.lock:
+            self.revalidations += 1
+            self.bytes_saved += size
+
+    def _store(self, key, entry):
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = entry
+            self.current_bytes += entry.size
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, user_id=None):
+        """Eliminar todas las entradas, o solo las de un usuario"""
+        with self.lock:
+            if user_id is None:
+                self.entries.clear()
+                self.current_bytes = 0
+                return
+            for key in [k for k in self.entries if k[0] == user_id]:
+                self._remove(key)
+
+    def stats(self):
+        """Contadores de aciertos, fallos y desalojos"""
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "revalidations": self.revalidations,
+                "bytes_saved": self.bytes_saved,
+                "entries": len(self.entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.current_bytes -= entry.size
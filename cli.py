@@ -0,0 +1,204 @@
+"""Ejecución de reportes por lotes desde la línea de comandos (sin GUI)
+
+Uso:
+    python cli.py trabajos.json --workers 4 --summary resumen.json
+
+El archivo de trabajos es un JSON:
+
+    {
+      "users": {"ventas@example.com": "contraseña"},
+      "jobs": [
+        {"user": "brianramirez0farias@gmail.com", "report": "get_sales_by_country",
+         "params": {"country_code": "CR"}, "output": "salidas/cr.csv"},
+        {"user": "ventas@example.com", "report": "export",
+         "params": {"source": "v_sales_fact"}, "output": "salidas/ventas.csv.gz"}
+      ]
+    }
+
+Las contraseñas que no estén en `users` se buscan en config.USERS. Cada
+usuario inicia sesión una sola vez y todos sus trabajos usan esa sesión.
+La salida se elige por extensión: .json (respuesta completa), .csv o
+.ndjson (opcionalmente .gz/.bz2/.xz). `report: "export"` escribe por
+páginas con SupabaseClient.export.
+
+Este módulo no importa tkinter ni main.py: sirve en servidores sin pantalla.
+"""
+import time
+
+_STARTED = time.perf_counter()
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import config
+import decoding
+from supabase_client import SupabaseClient
+
+IMPORT_SECONDS = time.perf_counter() - _STARTED
+
+# Métodos de SupabaseClient que se pueden pedir en un trabajo (solo lectura)
+REPORTS = (
+    "get_countries", "get_categories", "get_sales_fact", "get_sales_by_category",
+    "get_sales_by_country", "get_top_products", "get_reports_refreshed_at",
+    "get_my_allowed_countries", "get_my_allowed_categories", "get_products_by_price_range",
+    "get_invoices_this_month", "search_customers", "get_high_value_invoice_lines",
+    "get_sales_summary", "get_top_products_range", "export"
+)
+
+def load_jobs(path):
+    """Leer y validar el archivo de trabajos; devuelve (usuarios, trabajos)"""
+    with open(path, encoding="utf-8") as handle:
+        spec = json.load(handle)
+    if isinstance(spec, list):
+        spec = {"jobs": spec}
+    jobs = spec.get("jobs") or []
+    if not jobs:
+        raise ValueError("El archivo no tiene trabajos")
+    for index, job in enumerate(jobs, start=1):
+        job.setdefault("name", f"{index}-{job.get('report')}")
+        if not job.get("user"):
+            raise ValueError(f"Trabajo {job['name']}: falta 'user'")
+        if job.get("report") not in REPORTS:
+            raise ValueError(f"Trabajo {job['name']}: reporte no soportado '{job.get('report')}'")
+        if job["report"] == "export" and not job.get("output"):
+            raise ValueError(f"Trabajo {job['name']}: 'export' requiere 'output'")
+    return spec.get("users") or {}, jobs
+
+def resolve_users(jobs, passwords):
+    """{email: {"email", "password"}} de los usuarios que aparecen en los trabajos"""
+    known = {user["email"]: user["password"] for user in config.USERS.values()}
+    known.update(passwords)
+    users = {}
+    for email in dict.fromkeys(job["user"] for job in jobs):
+        if email not in known:
+            raise ValueError(f"No hay contraseña para {email} (agregarla en 'users' o en config.USERS)")
+        users[email] = {"email": email, "password": known[email]}
+    return users
+
+def write_output(result, path):
+    """Guardar la respuesta de un reporte; devuelve las filas escritas"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    data = result.get("data")
+    if path.lower().endswith(".json"):
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(decoding.dumps(data, indent=True, default=str))
+        return len(data) if isinstance(data, list) else None
+
+    # CSV/NDJSON con compresión opcional: el mismo escritor de la exportación
+    from export import _TextWriter, detect_format
+    fmt, compression = detect_format(path)
+    if fmt == "parquet":
+        raise ValueError("Parquet solo está disponible con report 'export'")
+    rows = data if isinstance(data, list) else [data]
+    writer = _TextWriter(path, fmt, compression, 0, None)
+    try:
+        if rows:
+            writer.write(rows)
+        writer.close()
+    except Exception:
+        writer.abort()
+        raise
+    return len(rows)
+
+def run_job(client, job):
+    """Ejecutar un trabajo con el cliente de su usuario y medir el tiempo"""
+    started = time.perf_counter()
+    summary = {"name": job["name"], "user": job["user"], "report": job["report"],
+               "output": job.get("output"), "rows": None}
+    try:
+        if client is None:
+            raise RuntimeError("El usuario no pudo iniciar sesión")
+        params = job.get("params") or {}
+        if job["report"] == "export":
+            result = client.export(path=job["output"], **params)
+        else:
+            result = getattr(client, job["report"])(**params)
+        if result["success"] and job["report"] == "export":
+            summary["rows"] = result["data"]["rows"]
+        elif result["success"]:
+            data = result.get("data")
+            summary["rows"] = len(data) if isinstance(data, list) else None
+            if job.get("output"):
+                summary["rows"] = write_output(result, job["output"])
+        summary["success"] = result["success"]
+        if not result["success"]:
+            summary["error"] = result.get("error") or result.get("message")
+    except Exception as e:
+        summary["success"] = False
+        summary["error"] = str(e)
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    return summary
+
+def run(jobs, users, workers=None, client=None):
+    """Iniciar sesión una vez por usuario y ejecutar los trabajos en paralelo"""
+    started = time.perf_counter()
+    client = client or SupabaseClient(pool_size=max(workers or 1, config.HTTP_POOL_SIZE))
+    login_started = time.perf_counter()
+    login = client.login_all(users)
+    login_seconds = time.perf_counter() - login_started
+    views = {email: client.for_user(email) for email in users}
+
+    with ThreadPoolExecutor(max_workers=workers or min(len(jobs), config.HTTP_POOL_SIZE)) as executor:
+        results = list(executor.map(lambda job: run_job(views[job["user"]], job), jobs))
+    for summary in results:
+        if summary["user"] in login["data"]["failed"]:
+            summary["error"] = f"Login fallido: {login['data']['failed'][summary['user']]}"
+
+    client.close()
+    return {
+        "success": all(summary["success"] for summary in results),
+        "data": {
+            "jobs": results,
+            "failed": sum(not summary["success"] for summary in results),
+            "import_seconds": round(IMPORT_SECONDS, 3),
+            "login_seconds": round(login_seconds, 3),
+            "total_seconds": round(time.perf_counter() - started, 3),
+            # Cada vista de usuario lleva su propio contador de peticiones
+            "requests": client.request_count + sum(view.request_count for view in views.values() if view)
+        }
+    }
+
+def print_summary(data):
+    print(f"{'Trabajo':<28} {'Usuario':<32} {'Filas':>8} {'Seg.':>8}  Estado")
+    for job in data["jobs"]:
+        rows = "-" if job["rows"] is None else job["rows"]
+        status = "ok" if job["success"] else f"ERROR: {job['error']}"
+        print(f"{job['name'][:28]:<28} {job['user'][:32]:<32} {rows:>8} {job['seconds']:>8.3f}  {status}")
+    print(f"\nImportación: {data['import_seconds']:.3f}s | Login: {data['login_seconds']:.3f}s | "
+          f"Total: {data['total_seconds']:.3f}s | Peticiones: {data['requests']} | Fallidos: {data['failed']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ejecutar reportes de Supabase por lotes sin GUI")
+    parser.add_argument("jobs", help="archivo JSON con los trabajos")
+    parser.add_argument("--workers", type=int, default=None, help="trabajos en paralelo")
+    parser.add_argument("--summary", help="guardar el resumen de tiempos en este JSON")
+    parser.add_argument("--url", help="URL de Supabase (por defecto config.SUPABASE_URL)")
+    parser.add_argument("--key", help="API key anon (por defecto config.SUPABASE_KEY)")
+    parser.add_argument("--quiet", action="store_true", help="no imprimir el resumen")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        config.SUPABASE_URL = args.url
+    if args.key:
+        config.SUPABASE_KEY = args.key
+    try:
+        passwords, jobs = load_jobs(args.jobs)
+        users = resolve_users(jobs, passwords)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    result = run(jobs, users, args.workers)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as handle:
+            json.dump(result["data"], handle, indent=2, ensure_ascii=False)
+    if not args.quiet:
+        print_summary(result["data"])
+    return 0 if result["success"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import threading
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """Compartir una sola ejecución entre llamadas idénticas concurrentes
+
+    La primera llamada con una clave ejecuta la función; las que llegan con
+    la misma clave mientras está en curso esperan y reciben el mismo
+    resultado (o la misma excepción). Al terminar, la clave se libera: una
+    llamada posterior vuelve a ejecutar.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key, func, *args, **kwargs):
+        """Devolver (resultado, compartido) de func(*args, **kwargs) para `key`"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+                self.executed += 1
+            else:
+                call.waiters += 1
+                self.shared += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                self.calls.pop(key, None)
+            call.event.set()
+
+    def stats(self):
+        with self.lock:
+            return {"executed": self.executed, "shared": self.shared, "in_flight": len(self.calls)}
+
+class MicroBatcher:
+    """Juntar búsquedas puntuales que llegan en una ventana corta en una sola consulta
+
+    `fetch(key, values)` recibe todos los valores pedidos para `key` durante
+    la ventana y devuelve {valor: resultado}. La primera llamada de cada
+    clave espera `window` segundos (o hasta juntar `max_size` valores) y
+    ejecuta el lote; las demás esperan su parte del resultado.
+    """
+    def __init__(self, fetch, window=0.005, max_size=100):
+        self.fetch = fetch
+        self.window = window
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.batches = 0
+        self.lookups = 0
+
+    def submit(self, key, value):
+        """Resultado de `value` dentro del lote de `key` (bloquea hasta tenerlo)"""
+        with self.lock:
+            self.lookups += 1
+            batch = self.pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = self.pending[key] = {"values": [], "full": threading.Event(),
+                                             "done": threading.Event(), "results": None, "error": None}
+            if value not in batch["values"]:
+                batch["values"].append(value)
+            if len(batch["values"]) >= self.max_size:
+                # Lote lleno: las siguientes llamadas abren uno nuevo
+                self.pending.pop(key, None)
+                batch["full"].set()
+
+        if leader:
+            batch["full"].wait(self.window)
+            with self.lock:
+                if self.pending.get(key) is batch:
+                    del self.pending[key]
+                self.batches += 1
+            try:
+                batch["results"] = self.fetch(key, list(batch["values"]))
+            except Exception as e:
+                batch["error"] = e
+            batch["done"].set()
+        else:
+            batch["done"].wait()
+
+        if batch["error"] is not None:
+            raise batch["error"]
+        return batch["results"].get(value)
+
+    def stats(self):
+        with self.lock:
+            return {"batches": self.batches, "lookups": self.lookups}
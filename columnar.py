@@ -0,0 +1,267 @@
+import heapq
+import math
+from array import array
+from collections import Counter
+
+# Columnas numéricas conocidas de las vistas de reporte
+NUMERIC_COLUMNS = ("quantity", "unit_price", "line_total", "total_amount")
+
+class DictColumn:
+    """Columna de texto codificada por diccionario (códigos enteros + valores únicos)"""
+    __slots__ = ("codes", "values", "lookup")
+
+    def __init__(self):
+        self.codes = array("I")
+        self.values = []
+        self.lookup = {}
+
+    def append(self, value):
+        code = self.lookup.get(value)
+        if code is None:
+            code = len(self.values)
+            self.lookup[value] = code
+            self.values.append(value)
+        self.codes.append(code)
+
+    def __getitem__(self, index):
+        return self.values[self.codes[index]]
+
+    def __len__(self):
+        return len(self.codes)
+
+class RowView:
+    """Vista de solo lectura de una fila de un ColumnarResult"""
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    def __getitem__(self, column):
+        return self._store.value(column, self._index)
+
+    def __getattr__(self, column):
+        try:
+            return self._store.value(column, self._index)
+        except KeyError:
+            raise AttributeError(column) from None
+
+    def get(self, column, default=None):
+        if column not in self._store.columns:
+            return default
+        return self._store.value(column, self._index)
+
+    def to_dict(self):
+        return {column: self._store.value(column, self._index) for column in self._store.columns}
+
+    def __repr__(self):
+        return f"RowView({self.to_dict()!r})"
+
+class ColumnarResult:
+    """Contenedor columnar compacto para resultados de SupabaseClient
+
+    Las columnas numéricas se guardan en `array('d')` (nulos como NaN), las
+    enteras en `array('q')` (nulos anotados en `nulls`), las de texto
+    codificadas por diccionario y el resto como listas. El tipo se revisa con
+    cada valor: un entero seguido de un decimal pasa a `array('d')` y un valor
+    que no encaja convierte la columna en lista. Las agregaciones recorren
+    arrays contiguos en lugar de listas de dicts.
+    """
+    def __init__(self):
+        self.columns = {}
+        self.nulls = {}
+        self.length = 0
+
+    @classmethod
+    def from_rows(cls, rows, numeric=NUMERIC_COLUMNS):
+        """Construir a partir de un iterable de dicts (por ejemplo, un PagedRows)
+
+        Las filas se consumen una a una, así una lectura paginada nunca
+        materializa la lista completa de dicts.
+        """
+        store = cls()
+        numeric = set(numeric)
+        for row in rows:
+            if not store.columns:
+                for column, value in row.items():
+                    store.columns[column] = store._new_column(column, value, numeric)
+            for column in store.columns:
+                store._append(column, row.get(column), numeric)
+            store.length += 1
+        return store
+
+    @staticmethod
+    def _new_column(column, value, numeric):
+        if column in numeric or isinstance(value, float):
+            return array("d")
+        if isinstance(value, int) and not isinstance(value, bool):
+            return array("q")
+        if isinstance(value, str) or value is None:
+            return DictColumn()
+        return []
+
+    def _append(self, column, value, numeric):
+        """Agregar un valor ajustando el tipo de la columna si no encaja"""
+        data = self.columns[column]
+        try:
+            if isinstance(data, DictColumn):
+                if value is None or isinstance(value, str):
+                    data.append(value)
+                    return
+                if data.values != [None]:
+                    raise TypeError(column)
+                # Solo nulos hasta ahora: el primer valor define el tipo
+                typed = self._new_column(column, value, numeric)
+                for _ in range(len(data)):
+                    self._append_value(column, typed, None)
+                self.columns[column] = data = typed
+            if isinstance(data, array):
+                if data.typecode == "q" and isinstance(value, float):
+                    data = self._promote(column)
+                self._append_value(column, data, value)
+            else:
+                data.append(value)
+        except (TypeError, ValueError, OverflowError):
+            # Tipo mezclado: la columna pasa a ser una lista de valores decodificados
+            self.columns[column] = self.column(column) + [value]
+            self.nulls.pop(column, None)
+
+    def _append_value(self, column, data, value):
+        if value is None:
+            if data.typecode == "q":
+                self.nulls.setdefault(column, set()).add(len(data))
+                data.append(0)
+            else:
+                data.append(math.nan)
+        elif isinstance(value, bool) or (data.typecode == "q" and not isinstance(value, int)):
+            raise TypeError(column)
+        else:
+            data.append(float(value) if data.typecode == "d" else value)
+
+    def _promote(self, column):
+        """Pasar una columna entera a array('d') cuando aparece un decimal"""
+        nulls = self.nulls.pop(column, ())
+        data = self.columns[column]
+        promoted = array("d", (math.nan if i in nulls else value for i, value in enumerate(data)))
+        self.columns[column] = promoted
+        return promoted
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        return (RowView(self, i) for i in range(self.length))
+
+    def row(self, index):
+        return RowView(self, index)
+
+    def value(self, column, index):
+        if index in self.nulls.get(column, ()):
+            return None
+        value = self.columns[column][index]
+        if isinstance(value, float) and math.isnan(value):
+            return None
+        return value
+
+    def column(self, name):
+        """Valores decodificados de una columna"""
+        data = self.columns[name]
+        if isinstance(data, DictColumn):
+            return [data.values[code] for code in data.codes]
+        if name in self.nulls:
+            return [self.value(name, i) for i in range(len(data))]
+        return list(data)
+
+    def to_rows(self):
+        return [row.to_dict() for row in self]
+
+    def nbytes(self):
+        """Tamaño aproximado de los buffers de las columnas"""
+        total = 0
+        for data in self.columns.values():
+            if isinstance(data, array):
+                total += data.itemsize * len(data)
+            elif isinstance(data, DictColumn):
+                total += data.codes.itemsize * len(data.codes)
+                total += sum(len(str(value)) for value in data.values)
+            else:
+                total += 8 * len(data)
+        return total
+
+    def sum(self, column):
+        """Suma de una columna numérica (ignora nulos)"""
+        data = self._numeric(column)
+        return math.fsum(v for v in data if v == v)
+
+    def group_by(self, keys, sums=NUMERIC_COLUMNS):
+        """Agrupar por una o varias columnas de texto y sumar columnas numéricas
+
+        Devuelve una lista de dicts con las claves, `count` y una suma por columna.
+        """
+        if isinstance(keys, str):
+            keys = (keys,)
+        sums = [column for column in sums if column in self.columns]
+        group_codes, group_keys = self._group_codes(keys)
+
+        counts = Counter(group_codes)
+        totals = {}
+        for column in sums:
+            acc = [0.0] * len(group_keys)
+            for code, value in zip(group_codes, self._numeric(column)):
+                if value == value:
+                    acc[code] += value
+            totals[column] = acc
+
+        groups = []
+        for code, key_values in enumerate(group_keys):
+            group = dict(zip(keys, key_values))
+            group["count"] = counts[code]
+            for column in sums:
+                group[column] = round(totals[column][code], 2)
+            groups.append(group)
+        return groups
+
+    def top_n(self, column, n=10, keys=None):
+        """Las n filas (o grupos, si se indican `keys`) con mayor valor en `column`"""
+        if keys is not None:
+            groups = self.group_by(keys, sums=(column,))
+            return heapq.nlargest(n, groups, key=lambda group: group[column])
+        data = self._numeric(column)
+        nulls = self.nulls.get(column, ())
+        best = heapq.nlargest(n, (i for i in range(self.length) if data[i] == data[i] and i not in nulls),
+                              key=data.__getitem__)
+        return [RowView(self, i) for i in best]
+
+    def _numeric(self, column):
+        data = self.columns[column]
+        if not isinstance(data, array):
+            raise TypeError(f"La columna '{column}' no es numérica")
+        return data
+
+    def _group_codes(self, keys):
+        """Códigos de grupo por fila y la tupla de valores de cada grupo"""
+        encoded = []
+        for key in keys:
+            data = self.columns[key]
+            if not isinstance(data, DictColumn):
+                recoded = DictColumn()
+                for value in self.column(key):
+                    recoded.append(value)
+                data = recoded
+            encoded.append(data)
+
+        if len(encoded) == 1:
+            data = encoded[0]
+            return data.codes, [(value,) for value in data.values]
+
+        lookup = {}
+        group_keys = []
+        group_codes = array("I")
+        for combo in zip(*(data.codes for data in encoded)):
+            code = lookup.get(combo)
+            if code is None:
+                code = len(group_keys)
+                lookup[combo] = code
+                group_keys.append(tuple(data.values[c] for data, c in zip(encoded, combo)))
+            group_codes.append(code)
+        return group_codes, group_keys
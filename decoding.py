@@ -0,0 +1,211 @@
+import codecs
+import json
+import re
+import time
+import config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKENDS = ("orjson", "json") if orjson is not None else ("json",)
+
+_scanner = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+# Límite entre objetos con espacios ("}, {"): el corte por "},{" no lo ve
+_LOOSE_BOUNDARY = re.compile(r"\}\s+,|\},\s+\{")
+_backend = None
+
+def set_backend(name=None):
+    """Elegir el backend JSON: "orjson", "json" o "auto" (orjson si está instalado)"""
+    global _backend
+    name = name or config.JSON_BACKEND
+    if name == "auto":
+        name = BACKENDS[0]
+    if name not in BACKENDS:
+        raise ValueError(f"Backend JSON no disponible: {name}")
+    _backend = name
+    return name
+
+def backend():
+    return _backend or set_backend()
+
+def loads(data):
+    """Decodificar bytes o texto JSON con el backend activo"""
+    if backend() == "orjson":
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson rechaza enteros de más de 64 bits; json los acepta
+            return json.loads(data)
+    return json.loads(data)
+
+def dumps(obj, indent=False, default=None):
+    """Codificar a texto JSON (UTF-8 sin escapar) con el backend activo"""
+    if backend() == "orjson":
+        option = orjson.OPT_INDENT_2 if indent else 0
+        try:
+            return orjson.dumps(obj, default=default, option=option).decode("utf-8")
+        except TypeError:
+            # Claves no str o enteros enormes: el formato de json es más permisivo
+            pass
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None, default=default)
+
+class RawRow(dict):
+    """Fila decodificada que conserva su JSON original en `raw` (texto de una línea)
+
+    Exportar a NDJSON o mostrar el texto puede usar `raw` sin volver a codificar.
+    """
+    __slots__ = ("raw",)
+
+def raw_json(row):
+    """JSON de una fila: el original si lo conserva, si no se codifica"""
+    raw = getattr(row, "raw", None)
+    return raw if raw is not None else dumps(row)
+
+class ArrayStream:
+    """Decodificar un arreglo JSON a medida que llegan los bytes
+
+    `chunks` es un iterable de bytes (por ejemplo response.iter_content()).
+    Los elementos completos del buffer se decodifican apenas llegan, así que
+    no hace falta tener el cuerpo entero en memoria. Con `keep_raw` los
+    objetos se entregan como RawRow con su texto original. `bytes` y
+    `decode_seconds` quedan disponibles al terminar.
+    """
+    def __init__(self, chunks, keep_raw=False):
+        self.chunks = chunks
+        self.keep_raw = keep_raw
+        self.bytes = 0
+        self.items = 0
+        self.decode_seconds = 0.0
+
+    def __iter__(self):
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        buffer = ""
+        state = "start"
+        chunks = iter(self.chunks)
+        final = False
+        while not final:
+            chunk = next(chunks, None)
+            if chunk is None:
+                final = True
+                text = decoder.decode(b"", final=True)
+            else:
+                self.bytes += len(chunk)
+                text = decoder.decode(chunk)
+            if not text and not final:
+                continue
+            started = time.perf_counter()
+            buffer += text
+            items, state, position = self._scan(buffer, state, final)
+            buffer = buffer[position:]
+            self.items += len(items)
+            self.decode_seconds += time.perf_counter() - started
+            yield from items
+        if state != "end":
+            raise ValueError("Arreglo JSON incompleto")
+        if buffer.strip(_WHITESPACE):
+            raise ValueError("Datos después del arreglo JSON")
+
+    def _scan(self, buffer, state, final):
+        """Decodificar los elementos completos del buffer; devuelve (elementos, estado, posición)"""
+        items = []
+        position = 0
+        size = len(buffer)
+        while True:
+            while position < size and buffer[position] in _WHITESPACE:
+                position += 1
+            if position >= size or state == "end":
+                return items, state, position
+            char = buffer[position]
+            if state == "start":
+                if char != "[":
+                    raise ValueError("Se esperaba un arreglo JSON")
+                position += 1
+                state = "first"
+                continue
+            if state == "separator":
+                if char not in ",]":
+                    raise ValueError(f"JSON inválido en la posición {position}: se esperaba ',' o ']'")
+                position += 1
+                state = "item" if char == "," else "end"
+                continue
+            if state == "first" and char == "]":
+                position += 1
+                state = "end"
+                continue
+
+            # Camino rápido: todos los objetos completos del buffer en una sola llamada
+            end = self._batch(buffer, position, final, items)
+            if end is not None:
+                position = end
+                state = "separator"
+                continue
+
+            # Un elemento a la vez: arreglos de no-objetos, JSON con espacios o cortes dudosos
+            try:
+                value, end = _scanner.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                # Elemento incompleto: esperar más bytes
+                return items, state, position
+            if end >= size and not final and not isinstance(value, (dict, list, str)):
+                # Un número o literal al final del buffer puede seguir en el próximo bloque
+                return items, state, position
+            if self.keep_raw and isinstance(value, dict):
+                # Fuera de los strings JSON no hay saltos de línea significativos
+                text = buffer[position:end].replace("\n", "").replace("\r", "")
+                value = self._raw_row(value, text)
+            items.append(value)
+            position = end
+            state = "separator"
+
+    def _batch(self, buffer, position, final, items):
+        """Decodificar de una vez los objetos desde `position` hasta el último corte "},{"
+
+        El corte se valida con el propio decodificador: si cae dentro de un
+        string o de un objeto anidado el trozo no es JSON válido y se vuelve
+        al camino de un elemento a la vez. Devuelve la posición siguiente
+        al último objeto decodificado, o None.
+        """
+        if final:
+            closing = buffer.rstrip(_WHITESPACE)
+            cut = len(closing) - 2 if closing.endswith("}]") else -1
+        else:
+            cut = buffer.rfind("},{", position)
+        if cut < position or buffer[position] != "{":
+            return None
+        part = buffer[position:cut + 1]
+        try:
+            values = loads(f"[{part}]")
+        except ValueError:
+            return None
+        if self.keep_raw:
+            pieces = part.split("},{")
+            # Cada corte textual debe coincidir con un límite real entre elementos:
+            # tantos trozos como objetos y ningún límite escrito con espacios
+            if (len(pieces) != len(values) or _LOOSE_BOUNDARY.search(part)
+                    or not all(isinstance(value, dict) for value in values)):
+                return None
+            if "\n" in part or "\r" in part:
+                pieces = [piece.replace("\n", "").replace("\r", "") for piece in pieces]
+            # split quita las llaves de cada lado del corte
+            last = len(pieces) - 1
+            if last:
+                pieces = [("{" if index else "") + piece + ("}" if index < last else "")
+                          for index, piece in enumerate(pieces)]
+            values = [self._raw_row(value, piece) for value, piece in zip(values, pieces)]
+        items.extend(values)
+        return cut + 1
+
+    @staticmethod
+    def _raw_row(value, text):
+        row = RawRow(value)
+        row.raw = text
+        return row
+
+def iter_array(chunks, keep_raw=False):
+    """Elementos de un arreglo JSON leído por bloques (ver ArrayStream)"""
+    return iter(ArrayStream(chunks, keep_raw))
@@ -0,0 +1,274 @@
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import os
+import time
+import config
+import decoding
+from query import render_select
+
+# Recursos exportables: (recurso, columna keyset). El keyset da un orden
+# estable para reanudar después de la última fila escrita.
+EXPORT_SOURCES = {
+    "v_sales_fact": ("v_sales_fact", "line_id"),
+    "invoices": ("invoices", "id"),
+    "invoice_lines": ("invoice_lines", "id")
+}
+
+FORMATS = ("csv", "ndjson", "parquet")
+
+# Compresión de archivos de texto: cada checkpoint cierra un miembro y abre
+# otro; gzip, bzip2 y xz leen los miembros concatenados como un solo archivo
+COMPRESSORS = {
+    "gzip": lambda raw: gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6),
+    "bz2": lambda raw: bz2.BZ2File(raw, mode="wb"),
+    "xz": lambda raw: lzma.LZMAFile(raw, mode="wb")
+}
+SUFFIXES = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+
+def detect_format(path, fmt=None, compression=None):
+    """Formato y compresión a partir de la extensión (ej. ventas.csv.gz)"""
+    base, suffix = os.path.splitext(path.lower())
+    if compression is None and suffix in SUFFIXES:
+        compression = SUFFIXES[suffix]
+        base, suffix = os.path.splitext(base)
+    if fmt is None:
+        fmt = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".parquet": "parquet"}.get(suffix, "csv")
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt}")
+    return fmt, compression
+
+def flatten(row, prefix=""):
+    """Aplanar recursos embebidos: {"products": {"name": x}} -> {"products.name": x}"""
+    flat = {}
+    for key, value in row.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+class _TextWriter:
+    """CSV o NDJSON sobre un archivo opcionalmente comprimido, reanudable por offset"""
+    def __init__(self, path, fmt, compression, offset, fieldnames):
+        if compression is not None and compression not in COMPRESSORS:
+            raise ValueError(f"Compresión no soportada: {compression}")
+        self.fmt = fmt
+        self.compression = compression
+        self.fieldnames = fieldnames
+        self.raw = open(path, "r+b" if offset else "wb")
+        # Descartar lo escrito después del último checkpoint
+        self.raw.truncate(offset)
+        self.raw.seek(offset)
+        self.stream = None
+        self.text = None
+        self.csv = None
+        self._open_member()
+
+    def _open_member(self):
+        self.stream = COMPRESSORS[self.compression](self.raw) if self.compression else self.raw
+        self.text = io.TextIOWrapper(self.stream, encoding="utf-8", newline="", write_through=True)
+        self.csv = None
+
+    def write(self, rows):
+        if self.fmt == "ndjson":
+            # Las filas leídas en streaming traen su JSON original: no se vuelve a codificar
+            self.text.write("".join(decoding.raw_json(row) + "\n" for row in rows))
+            return
+        rows = [flatten(row) for row in rows]
+        header = self.fieldnames is None
+        if header:
+            self.fieldnames = list(rows[0])
+        if self.csv is None:
+            self.csv = csv.DictWriter(self.text, fieldnames=self.fieldnames, extrasaction="ignore")
+        if header:
+            self.csv.writeheader()
+        self.csv.writerows(rows)
+
+    def _finish_member(self):
+        """Vaciar los buffers (y cerrar el miembro comprimido); devuelve el offset"""
+        self.text.flush()
+        self.text.detach()
+        if self.compression:
+            self.stream.close()
+        self.raw.flush()
+        return self.raw.tell()
+
+    def checkpoint(self):
+        """Dejar el archivo consistente y devolver el offset para reanudar"""
+        offset = self._finish_member()
+        self._open_member()
+        return offset
+
+    def close(self):
+        offset = self._finish_member()
+        self.raw.close()
+        return offset
+
+    def abort(self):
+        """Cerrar tras un error; lo escrito después del checkpoint se descarta al reanudar"""
+        try:
+            self.text.close()
+        finally:
+            self.raw.close()
+
+class _ParquetWriter:
+    """Parquet con un row group por página (requiere pyarrow, opcional)"""
+    def __init__(self, path, compression):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("Exportar a Parquet requiere el paquete pyarrow (pip install pyarrow)") from e
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.path = path
+        self.compression = compression or "snappy"
+        self.schema = None
+        self.writer = None
+        self.fieldnames = None
+
+    def write(self, rows):
+        rows = [flatten(row) for row in rows]
+        if self.writer is None:
+            schema = self.pa.Table.from_pylist(rows).schema
+            # Columnas nulas en la primera página: texto, para aceptar valores después
+            self.schema = self.pa.schema([
+                field.with_type(self.pa.string()) if self.pa.types.is_null(field.type) else field
+                for field in schema
+            ])
+            self.fieldnames = self.schema.names
+            self.writer = self.pq.ParquetWriter(self.path, self.schema, compression=self.compression)
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def checkpoint(self):
+        return None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def abort(self):
+        if self.writer is not None:
+            self.writer.close()
+
+class Exporter:
+    """Exportar tablas y vistas grandes a disco página por página
+
+    Cada página se escribe apenas llega, así la memoria no depende del total
+    de filas. Se pagina por keyset y, cada EXPORT_CHECKPOINT_ROWS filas, se
+    guarda en `<path>.checkpoint` la última clave y el tamaño del archivo;
+    `resume=True` trunca el archivo a ese punto y sigue desde esa clave.
+    Parquet no se puede reanudar: un archivo sin cerrar no tiene footer.
+    """
+    def __init__(self, client, page_size=None, checkpoint_rows=None):
+        self.client = client
+        self.page_size = page_size or config.PAGE_SIZE
+        self.checkpoint_rows = checkpoint_rows or config.EXPORT_CHECKPOINT_ROWS
+
+    def export(self, source, path, fmt=None, compression=None, columns=None, filters=None,
+               resume=False, progress=None):
+        """Exportar `source` (ver EXPORT_SOURCES) a `path`
+
+        `filters` son pares (columna, expresión PostgREST), ej. [("invoice_date", "gte.2024-12-01")].
+        `progress(filas, total)` se llama después de cada página.
+        """
+        if source not in EXPORT_SOURCES:
+            return {"success": False, "error": f"Fuente no exportable: {source}"}
+        resource, keyset = EXPORT_SOURCES[source]
+        try:
+            fmt, compression = detect_format(path, fmt, compression)
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+        checkpoint_path = path + ".checkpoint"
+        state = _read_checkpoint(checkpoint_path) if resume and fmt != "parquet" else None
+        if state is not None:
+            if (state.get("source"), state.get("fmt")) != (source, fmt):
+                return {"success": False, "error": "El checkpoint es de otra exportación"}
+            compression = state["compression"]
+
+        select = render_select(columns or "*")
+        if select != "*" and keyset not in select.split(","):
+            select = f"{keyset},{select}"
+        params = [("select", select)] + list(filters or [])
+        if state is None:
+            state = {"source": source, "fmt": fmt, "compression": compression, "rows": 0,
+                     "offset": 0, "after": None, "fieldnames": None}
+        # NDJSON reutiliza el JSON original de cada fila; con orjson volver a
+        # codificar cuesta menos que conservarlo (ver benchmarks/decode.py)
+        keep_raw = fmt == "ndjson" and decoding.backend() != "orjson"
+        rows = self.client.iter_rows(resource, params, page_size=self.page_size, keyset=keyset,
+                                     after=state["after"], stream=True, keep_raw=keep_raw)
+        try:
+            if fmt == "parquet":
+                writer = _ParquetWriter(path, compression)
+            else:
+                writer = _TextWriter(path, fmt, compression, state["offset"], state["fieldnames"])
+        except (ImportError, ValueError, OSError) as e:
+            return {"success": False, "error": str(e)}
+
+        started = time.monotonic()
+        done = state["rows"]
+        written = 0
+        since_checkpoint = 0
+        total = None
+        try:
+            while True:
+                page = rows.next_page()
+                if not page:
+                    break
+                writer.write(page)
+                written += len(page)
+                since_checkpoint += len(page)
+                if rows.total is not None:
+                    # Al reanudar, el total del servidor cuenta solo las filas restantes
+                    total = rows.total + done
+                if since_checkpoint >= self.checkpoint_rows and fmt != "parquet":
+                    state.update(rows=state["rows"] + since_checkpoint, offset=writer.checkpoint(),
+                                 after={keyset: page[-1][keyset]}, fieldnames=writer.fieldnames)
+                    _write_checkpoint(checkpoint_path, state)
+                    since_checkpoint = 0
+                if progress:
+                    progress(state["rows"] + since_checkpoint, total)
+            size = writer.close()
+        except Exception as e:
+            writer.abort()
+            result = {"success": False, "error": str(e),
+                      "data": {"rows": state["rows"], "resumable": fmt != "parquet"}}
+            if getattr(e, "status", None) is not None:
+                result["status"] = e.status
+            return result
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        elapsed = time.monotonic() - started
+        return {
+            "success": True,
+            "data": {
+                "path": path,
+                "format": fmt,
+                "compression": compression if fmt != "parquet" else writer.compression,
+                "rows": state["rows"] + since_checkpoint,
+                "rows_this_run": written,
+                "bytes": size,
+                "elapsed": round(elapsed, 3),
+                "rows_per_s": round(written / elapsed) if elapsed else None
+            }
+        }
+
+def _read_checkpoint(path):
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+    return None
+
+def _write_checkpoint(path, state):
+    """Guardar el progreso de forma atómica (archivo temporal + rename)"""
+    temp = path + ".tmp"
+    with open(temp, "w", encoding="utf-8") as handle:
+        json.dump(state, handle)
+    os.replace(temp, path)
@@ -0,0 +1,261 @@
+import csv
+import json
+import os
+import time
+from datetime import date
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from itertools import groupby
+import config
+
+CENTS = Decimal("0.01")
+
+def read_invoices(source, fmt=None):
+    """Leer facturas con sus líneas desde CSV o NDJSON, una a la vez
+
+    NDJSON: un objeto por línea con `ref`, `customer_id`, `invoice_date` y
+    `lines` (lista de `product_id`, `quantity` y opcionalmente `unit_price`).
+    CSV: una fila por línea de factura con las columnas `ref`, `customer_id`,
+    `invoice_date`, `product_id`, `quantity` y `unit_price` (opcional); las
+    filas consecutivas con el mismo `ref` forman una factura.
+    """
+    if isinstance(source, str):
+        if fmt is None:
+            fmt = "ndjson" if source.endswith((".ndjson", ".jsonl")) else "csv"
+        with open(source, newline="", encoding="utf-8-sig") as handle:
+            yield from read_invoices(handle, fmt)
+        return
+
+    if fmt == "ndjson":
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+        return
+
+    for ref, rows in groupby(csv.DictReader(source), key=lambda row: row.get("ref")):
+        rows = list(rows)
+        yield {
+            "ref": ref,
+            "customer_id": rows[0].get("customer_id"),
+            "invoice_date": rows[0].get("invoice_date"),
+            "lines": [
+                {"product_id": row.get("product_id"), "quantity": row.get("quantity"),
+                 "unit_price": row.get("unit_price") or None}
+                for row in rows
+            ]
+        }
+
+def line_total(quantity, unit_price):
+    """Total de línea redondeado igual que el trigger set_line_total"""
+    return (quantity * unit_price).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+class InvoiceIngestor:
+    """Carga masiva de facturas y líneas con validación local y reanudación
+
+    Valida cada factura contra los catálogos de productos y clientes leídos
+    una sola vez, inserta los encabezados de un lote en un solo POST (los IDs
+    generados vuelven con `return=representation` y se asocian por
+    `source_ref`) y luego todas las líneas del lote en otro POST. Antes de
+    cada lote el checkpoint se marca como pendiente y después de confirmarlo
+    se guarda el avance; al reanudar se saltan las facturas ya cargadas y,
+    si quedó un lote pendiente, se recupera. Requiere
+    migrations/004_invoice_ingestion.sql.
+    """
+    def __init__(self, client, chunk_size=None):
+        self.client = client
+        self.chunk_size = chunk_size or config.INGEST_CHUNK_SIZE
+        self.products = None
+        self.customers = None
+
+    def load_catalogs(self):
+        """Leer ids de clientes y precios de productos (con service role, sin RLS)"""
+        self.products = {
+            row["id"]: Decimal(str(row["unit_price"]))
+            for row in self.client.iter_rows("products", {"select": "id,unit_price"}, keyset="id",
+                                             count=False, use_service_role=True)
+        }
+        self.customers = {
+            row["id"]
+            for row in self.client.iter_rows("customers", {"select": "id"}, keyset="id",
+                                             count=False, use_service_role=True)
+        }
+
+    def validate(self, invoice):
+        """Normalizar una factura; devuelve (encabezado, líneas, errores)"""
+        errors = []
+        ref = str(invoice.get("ref") or "").strip()
+        if not ref:
+            errors.append("Falta ref")
+        customer_id = _to_int(invoice.get("customer_id"))
+        if customer_id not in self.customers:
+            errors.append(f"Cliente inexistente: {invoice.get('customer_id')}")
+        try:
+            invoice_date = date.fromisoformat(str(invoice.get("invoice_date"))).isoformat()
+        except ValueError:
+            invoice_date = None
+            errors.append(f"Fecha inválida: {invoice.get('invoice_date')}")
+
+        lines = []
+        total = Decimal(0)
+        for number, line in enumerate(invoice.get("lines") or [], start=1):
+            product_id = _to_int(line.get("product_id"))
+            quantity = _to_decimal(line.get("quantity"))
+            price = line.get("unit_price")
+            unit_price = self.products.get(product_id) if price in (None, "") else _to_decimal(price)
+            if product_id not in self.products:
+                errors.append(f"Línea {number}: producto inexistente {line.get('product_id')}")
+            elif quantity is None or quantity <= 0:
+                errors.append(f"Línea {number}: cantidad inválida {line.get('quantity')}")
+            elif unit_price is None or unit_price < 0:
+                errors.append(f"Línea {number}: precio inválido {price}")
+            else:
+                amount = line_total(quantity, unit_price)
+                total += amount
+                lines.append({"product_id": product_id, "quantity": str(quantity),
+                              "unit_price": str(unit_price), "line_total": str(amount)})
+        if not lines and not errors:
+            errors.append("Factura sin líneas")
+
+        header = {"source_ref": ref, "customer_id": customer_id,
+                  "invoice_date": invoice_date, "total_amount": str(total)}
+        return header, lines, errors
+
+    def run(self, source, fmt=None, checkpoint=None):
+        """Cargar todas las facturas de `source` (ruta o archivo abierto)
+
+        `checkpoint` es la ruta del archivo de progreso; por defecto, para
+        rutas, `<source>.checkpoint`. Las facturas inválidas se reportan en
+        `rejected` y no detienen la carga.
+        """
+        if checkpoint is None and isinstance(source, str):
+            checkpoint = source + ".checkpoint"
+        state = _read_checkpoint(checkpoint)
+        # Un lote pendiente pudo quedar a medias (encabezados sin líneas). Los
+        # checkpoints sin la marca son de antes de existir: se recupera igual
+        recovering = state.get("pending", state["records"] > 0)
+        committed = state["records"]
+        if self.products is None:
+            self.load_catalogs()
+
+        started = time.monotonic()
+        stats = {"invoices": 0, "lines": 0, "skipped": 0, "rejected": []}
+        batch = []
+        refs = set()
+        record = 0
+        for record, invoice in enumerate(read_invoices(source, fmt), start=1):
+            if record <= state["records"]:
+                continue
+            header, lines, errors = self.validate(invoice)
+            if header["source_ref"] in refs:
+                errors.append(f"ref duplicado en el lote: {header['source_ref']}")
+            if errors:
+                stats["rejected"].append({"record": record, "ref": header["source_ref"], "errors": errors})
+                continue
+            batch.append((header, lines))
+            refs.add(header["source_ref"])
+            if len(batch) >= self.chunk_size:
+                _write_checkpoint(checkpoint, committed, state, stats, pending=True)
+                result = self._load_batch(batch, stats, recovering)
+                if not result["success"]:
+                    return self._report(result, stats, started, record - len(batch))
+                recovering = False
+                batch = []
+                refs.clear()
+                committed = record
+                _write_checkpoint(checkpoint, committed, state, stats)
+        if batch:
+            _write_checkpoint(checkpoint, committed, state, stats, pending=True)
+            result = self._load_batch(batch, stats, recovering)
+            if not result["success"]:
+                return self._report(result, stats, started, record - len(batch))
+        _write_checkpoint(checkpoint, max(record, state["records"]), state, stats)
+        self.client.cache.invalidate()
+        return self._report({"success": True}, stats, started, record)
+
+    def _load_batch(self, batch, stats, recovering):
+        """Insertar los encabezados y luego las líneas de un lote
+
+        Normalmente los encabezados ya existentes se ignoran (y sus líneas no
+        se vuelven a enviar). En el lote que quedó pendiente se reescriben: se recuperan sus IDs y se borran sus líneas antes de
+        insertarlas de nuevo, así no quedan duplicadas.
+        """
+        base_url = f"{self.client.base_url}/rest/v1"
+        headers = self.client.get_headers(use_service_role=True)
+        resolution = "merge-duplicates" if recovering else "ignore-duplicates"
+        headers["Prefer"] = f"resolution={resolution},return=representation"
+        result = self.client._post_rows(f"{base_url}/invoices", headers,
+                                        {"on_conflict": "source_ref", "select": "id,source_ref"},
+                                        [header for header, _ in batch])
+        if not result["success"]:
+            return result
+        ids = {row["source_ref"]: row["id"] for row in result["data"] or []}
+
+        if recovering and ids:
+            response = self.client._request(
+                "DELETE", f"{base_url}/invoice_lines", headers=self.client.get_headers(use_service_role=True),
+                params={"invoice_id": f"in.({','.join(str(i) for i in ids.values())})"}
+            )
+            result = self.client._handle_response(response)
+            if not result["success"]:
+                return result
+
+        rows = []
+        for header, lines in batch:
+            invoice_id = ids.get(header["source_ref"])
+            if invoice_id is None:
+                stats["skipped"] += 1
+                continue
+            for line in lines:
+                rows.append(dict(line, invoice_id=invoice_id))
+        if rows:
+            headers = self.client.get_headers(use_service_role=True)
+            headers["Prefer"] = "return=minimal"
+            result = self.client._post_rows(f"{base_url}/invoice_lines", headers, None, rows)
+            if not result["success"]:
+                return result
+        stats["invoices"] += len(ids)
+        stats["lines"] += len(rows)
+        return {"success": True}
+
+    @staticmethod
+    def _report(result, stats, started, records):
+        elapsed = time.monotonic() - started
+        data = dict(stats, records=records, elapsed=round(elapsed, 3),
+                    lines_per_minute=round(stats["lines"] * 60 / elapsed) if elapsed else None)
+        if result["success"]:
+            return {"success": True, "data": data}
+        failed = dict(result, data=data)
+        failed["success"] = False
+        return failed
+
+def _read_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+    return {"records": 0, "invoices": 0, "lines": 0}
+
+def _write_checkpoint(path, records, state, stats, pending=False):
+    """Guardar el progreso de forma atómica (archivo temporal + rename)
+
+    `pending` marca que después de `records` hay un lote enviado sin confirmar.
+    """
+    if not path:
+        return
+    data = {"records": records, "invoices": state["invoices"] + stats["invoices"],
+            "lines": state["lines"] + stats["lines"], "pending": pending}
+    temp = path + ".tmp"
+    with open(temp, "w", encoding="utf-8") as handle:
+        json.dump(data, handle)
+    os.replace(temp, path)
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_decimal(value):
+    try:
+        number = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return None
+    return number if number.is_finite() else None
@@ -0,0 +1,265 @@
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+
+# Límites superiores (ms) de los buckets de los histogramas de latencia
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+def params_hash(params):
+    """Hash corto y estable de los parámetros de una consulta (sin exponer valores)"""
+    items = params.items() if isinstance(params, dict) else (params or [])
+    normalized = json.dumps(sorted((str(k), str(v)) for k, v in items))
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+def parse_server_timing(header):
+    """Header Server-Timing -> {métrica: ms}; ej. 'db;dur=12.5, app;dur=3'"""
+    timings = {}
+    for metric in (header or "").split(","):
+        parts = [part.strip() for part in metric.split(";")]
+        if not parts[0]:
+            continue
+        for part in parts[1:]:
+            if part.startswith("dur="):
+                try:
+                    timings[parts[0]] = timings.get(parts[0], 0.0) + float(part[4:])
+                except ValueError:
+                    pass
+    return timings
+
+class Span:
+    """Una llamada de SupabaseClient: tiempos, tamaño, filas y resultado de caché
+
+    `duration`, `ttfb` y `decode` están en segundos; `ttfb` suma el tiempo
+    hasta recibir los encabezados de cada petición HTTP (conexión, TLS,
+    servidor) y `server_timing` lo que el servidor reportó en Server-Timing.
+    """
+    __slots__ = ("name", "endpoint", "params_hash", "started_at", "duration", "status", "bytes", "rows",
+                 "requests", "retries", "ttfb", "server_timing", "decode", "cache", "error", "_start")
+
+    def __init__(self, name, endpoint, params=None):
+        self.name = name
+        self.endpoint = endpoint
+        self.params_hash = params_hash(params) if params else None
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.status = None
+        self.bytes = 0
+        self.rows = None
+        self.requests = 0
+        self.retries = 0
+        self.ttfb = 0.0
+        self.server_timing = {}
+        self.decode = 0.0
+        self.cache = None
+        self.error = None
+        self._start = time.perf_counter()
+
+    def record_response(self, response, body=True):
+        """Acumular los datos de una respuesta HTTP de la llamada
+        
+        Con `body=False` (respuesta en streaming) el cuerpo no se lee aquí;
+        quien lo consume suma los bytes después.
+        """
+        self.requests += 1
+        self.status = response.status_code
+        if body:
+            self.bytes += len(response.content)
+        self.ttfb += response.elapsed.total_seconds()
+        retries = getattr(getattr(response, "raw", None), "retries", None)
+        if retries is not None:
+            self.retries += len(retries.history)
+        for metric, value in parse_server_timing(response.headers.get("Server-Timing")).items():
+            self.server_timing[metric] = self.server_timing.get(metric, 0.0) + value
+
+    def add_rows(self, count):
+        self.rows = (self.rows or 0) + count
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "endpoint": self.endpoint,
+            "params_hash": self.params_hash,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            "bytes": self.bytes,
+            "rows": self.rows,
+            "requests": self.requests,
+            "retries": self.retries,
+            "ttfb_ms": round(self.ttfb * 1000, 3),
+            "server_timing_ms": {k: round(v, 3) for k, v in self.server_timing.items()},
+            "decode_ms": round(self.decode * 1000, 3),
+            "cache": self.cache,
+            "error": self.error
+        }
+
+class MemorySink:
+    """Últimos spans en memoria más un histograma de latencia por endpoint"""
+    def __init__(self, max_spans=500):
+        self.spans = deque(maxlen=max_spans)
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def export(self, span):
+        with self.lock:
+            self.spans.append(span)
+            histogram = self.histograms.get(span.endpoint)
+            if histogram is None:
+                histogram = self.histograms[span.endpoint] = {"count": 0, "sum_ms": 0.0, "errors": 0,
+                                                              "buckets": [0] * len(LATENCY_BUCKETS)}
+            ms = span.duration * 1000
+            histogram["count"] += 1
+            histogram["sum_ms"] += ms
+            histogram["errors"] += span.error is not None
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if ms <= bound:
+                    histogram["buckets"][index] += 1
+                    break
+
+    def slowest(self, n=20):
+        """Los n spans recientes más lentos"""
+        with self.lock:
+            spans = list(self.spans)
+        return [span.to_dict() for span in sorted(spans, key=lambda s: s.duration, reverse=True)[:n]]
+
+    def summary(self):
+        """Por endpoint: llamadas, errores, media y p50/p95 estimados con los buckets"""
+        with self.lock:
+            items = [(endpoint, dict(h, buckets=list(h["buckets"]))) for endpoint, h in self.histograms.items()]
+        rows = []
+        for endpoint, histogram in items:
+            rows.append({
+                "endpoint": endpoint,
+                "count": histogram["count"],
+                "errors": histogram["errors"],
+                "mean_ms": round(histogram["sum_ms"] / histogram["count"], 3),
+                "p50_ms_le": _bucket_percentile(histogram, 50),
+                "p95_ms_le": _bucket_percentile(histogram, 95)
+            })
+        return sorted(rows, key=lambda row: row["mean_ms"], reverse=True)
+
+    def clear(self):
+        with self.lock:
+            self.spans.clear()
+            self.histograms.clear()
+
+class JsonLinesSink:
+    """Agregar cada span como una línea JSON a un archivo"""
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False)
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
+
+class OpenTelemetrySink:
+    """Exportar spans con la API de OpenTelemetry (paquete opcional opentelemetry-api)
+
+    El SDK y el exportador (OTLP, consola, ...) se configuran aparte con el
+    TracerProvider global; sin SDK la API no registra nada.
+    """
+    def __init__(self, tracer=None):
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError("OpenTelemetrySink requiere el paquete opentelemetry-api") from e
+        self.trace = trace
+        self.tracer = tracer or trace.get_tracer("supabase_client")
+
+    def export(self, span):
+        attributes = {
+            "supabase.endpoint": span.endpoint,
+            "supabase.params_hash": span.params_hash or "",
+            "supabase.requests": span.requests,
+            "supabase.retries": span.retries,
+            "supabase.cache": span.cache or "",
+            "supabase.decode_ms": span.decode * 1000,
+            "supabase.ttfb_ms": span.ttfb * 1000,
+            "http.response.body.size": span.bytes
+        }
+        if span.status is not None:
+            attributes["http.response.status_code"] = span.status
+        if span.rows is not None:
+            attributes["supabase.rows"] = span.rows
+        for metric, value in span.server_timing.items():
+            attributes[f"supabase.server_timing.{metric}_ms"] = value
+        start = int(span.started_at * 1e9)
+        otel_span = self.tracer.start_span(span.name, start_time=start, attributes=attributes)
+        if span.error:
+            otel_span.set_status(self.trace.Status(self.trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=start + int(span.duration * 1e9))
+
+class Instrumentation:
+    """Crea spans alrededor de las llamadas del cliente y los envía a los sinks
+
+    Un sink es cualquier objeto con `export(span)`. El span activo de cada
+    hilo recibe los datos de las peticiones HTTP hechas dentro de él.
+    """
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+        self.memory = next((sink for sink in self.sinks if isinstance(sink, MemorySink)), None)
+        self._local = threading.local()
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        if self.memory is None and isinstance(sink, MemorySink):
+            self.memory = sink
+
+    def remove_sink(self, sink):
+        self.sinks.remove(sink)
+        if sink is self.memory:
+            self.memory = None
+
+    def current(self):
+        """Span activo en este hilo (o None)"""
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else None
+
+    def span(self, name, endpoint, params=None):
+        return _SpanScope(self, Span(name, endpoint, params))
+
+    def _finish(self, span):
+        for sink in list(self.sinks):
+            try:
+                sink.export(span)
+            except Exception:
+                # Un sink con problemas no debe romper la consulta
+                pass
+
+class _SpanScope:
+    __slots__ = ("instrumentation", "span")
+
+    def __init__(self, instrumentation, span):
+        self.instrumentation = instrumentation
+        self.span = span
+
+    def __enter__(self):
+        local = self.instrumentation._local
+        if not hasattr(local, "stack"):
+            local.stack = []
+        local.stack.append(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        span = self.span
+        span.duration = time.perf_counter() - span._start
+        if exc is not None and span.error is None:
+            span.error = str(exc) or exc_type.__name__
+        self.instrumentation._local.stack.pop()
+        self.instrumentation._finish(span)
+        return False
+
+def _bucket_percentile(histogram, pct):
+    """Límite superior del bucket que contiene el percentil pedido"""
+    target = histogram["count"] * pct / 100
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+        seen += count
+        if seen >= target:
+            return bound if bound != float("inf") else None
+    return None
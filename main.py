@@ -1,23 +1,89 @@
-import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+import time
+
+# Referencia para el reporte de arranque: todo se mide desde aquí
+_STARTED = time.perf_counter()
+
 import json
-import requests
+import os
+import sys
+import tkinter as tk
+from tkinter import ttk, messagebox
 import config
-from supabase_client import SupabaseClient
+from background import BackgroundRunner
+from result_grid import ResultPane
 from config import USERS
 
+# supabase_client (requests), replica (sqlite3) y filedialog se importan al
+# usarse por primera vez: no hacen falta para mostrar la ventana
+IMPORTS_DONE = time.perf_counter()
+
 class SupabaseGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Supabase API Client - Sistema de Ventas")
         self.root.geometry("1200x800")
         
-        # Cliente de Supabase
-        self.client = SupabaseClient()
+        # Tiempos de arranque (ms desde _STARTED) y de construcción de cada pestaña
+        self.startup = [("imports", IMPORTS_DONE)]
+        self.tab_build_ms = {}
+        
+        # Cliente de Supabase: se crea al primer uso (ver la propiedad client)
+        self._client = None
         self.current_user = None
+        self.replica = None
+        
+        # Paneles de las pestañas: existen solo después de construir cada pestaña
+        self.reports_pane = None
+        self.freshness_label = None
+        self.auth_pane = None
+        self.advanced_pane = None
+        self.admin_pane = None
+        self.diagnostics_pane = None
+        self.typeahead_job = None
+        
+        # Ejecutor en segundo plano para no bloquear el hilo de Tk
+        self.runner = BackgroundRunner(self.root, on_busy_change=self.update_busy_indicator)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Crear interfaz
         self.setup_ui()
+        self.mark_startup("ui")
+        
+    @property
+    def client(self):
+        """Cliente de Supabase, creado la primera vez que se usa
+        
+        Importar supabase_client (y requests) es lo más lento del arranque;
+        así la ventana aparece antes y el cliente se precarga después.
+        """
+        if self._client is None:
+            from supabase_client import SupabaseClient
+            self._client = SupabaseClient()
+        return self._client
+        
+    def mark_startup(self, phase):
+        self.startup.append((phase, time.perf_counter()))
+        
+    def startup_report(self):
+        """Duración de cada fase del arranque y de las pestañas construidas"""
+        phases = []
+        previous = _STARTED
+        for phase, at in self.startup:
+            phases.append({"phase": phase, "ms": round((at - previous) * 1000, 1),
+                           "total_ms": round((at - _STARTED) * 1000, 1)})
+            previous = at
+        return {
+            "phases": phases,
+            "total_ms": phases[-1]["total_ms"],
+            "budget_ms": config.STARTUP_BUDGET_MS,
+            "tabs_ms": dict(self.tab_build_ms)
+        }
+        
+    def on_first_paint(self, preload=True):
+        """Registrar el primer dibujado y precargar el cliente con la ventana ya visible"""
+        self.mark_startup("first_paint")
+        if preload:
+            self.root.after_idle(lambda: self.client)
         
     def setup_ui(self):
         """Configurar la interfaz de usuario"""
@@ -38,16 +104,36 @@ class SupabaseGUI:
         self.notebook = ttk.Notebook(main_frame)
         self.notebook.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(10, 0))
         
-        # Crear pestañas
-        self.setup_config_tab()
-        self.setup_reports_tab()
-        self.setup_authorization_tab()
-        self.setup_advanced_tab()
-        self.setup_admin_tab()
+        # Crear pestañas: cada una se construye la primera vez que se selecciona
+        self.tab_builders = {}
+        self.add_tab("⚙️ Configuración", self.setup_config_tab)
+        self.add_tab("Reportes", self.setup_reports_tab)
+        self.add_tab("Autorización", self.setup_authorization_tab)
+        self.add_tab("Consultas Avanzadas", self.setup_advanced_tab)
+        self.add_tab("Administración", self.setup_admin_tab)
+        self.add_tab("Diagnósticos", self.setup_diagnostics_tab)
+        self.notebook.bind("<<NotebookTabChanged>>", lambda event: self.build_selected_tab())
+        self.build_selected_tab()
         
         # Deshabilitar pestañas inicialmente (excepto configuración)
         self.toggle_tabs(False)
         
+    def add_tab(self, text, builder):
+        """Agregar una pestaña vacía; `builder(frame)` la llena al seleccionarla"""
+        frame = ttk.Frame(self.notebook)
+        self.notebook.add(frame, text=text)
+        self.tab_builders[str(frame)] = (text, frame, builder)
+        
+    def build_selected_tab(self):
+        """Construir la pestaña seleccionada si todavía está vacía"""
+        entry = self.tab_builders.pop(self.notebook.select(), None)
+        if entry is None:
+            return
+        text, frame, builder = entry
+        started = time.perf_counter()
+        builder(frame)
+        self.tab_build_ms[text] = round((time.perf_counter() - started) * 1000, 1)
+        
     def setup_login_frame(self, parent):
         """Configurar frame de login"""
         login_frame = ttk.LabelFrame(parent, text="Autenticación", padding="10")
@@ -59,6 +145,7 @@ class SupabaseGUI:
         user_combo = ttk.Combobox(login_frame, textvariable=self.user_var, values=list(USERS.keys()), state="readonly")
         user_combo.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=(0, 10))
         user_combo.set(list(USERS.keys())[0])
+        user_combo.bind("<<ComboboxSelected>>", lambda event: self.on_user_selected())
         
         # Botón login
         self.login_btn = ttk.Button(login_frame, text="Iniciar Sesión", command=self.login)
@@ -68,16 +155,28 @@ class SupabaseGUI:
         self.logout_btn = ttk.Button(login_frame, text="Cerrar Sesión", command=self.logout, state="disabled")
         self.logout_btn.grid(row=0, column=3)
         
+        # Autenticar a todos los usuarios: cambiar en el dropdown no vuelve a pedir login
+        ttk.Button(login_frame, text="Conectar Todos", command=self.login_all).grid(row=0, column=4, padx=(10, 0))
+        
         # Estado de login
         self.status_label = ttk.Label(login_frame, text="No autenticado", foreground="red")
-        self.status_label.grid(row=0, column=4, padx=(10, 0))
+        self.status_label.grid(row=0, column=5, padx=(10, 0))
+        
+        # Indicador de consultas en curso
+        self.busy_bar = ttk.Progressbar(login_frame, mode="indeterminate", length=80)
+        self.busy_bar.grid(row=0, column=6, padx=(10, 0))
+        self.busy_label = ttk.Label(login_frame, text="")
+        self.busy_label.grid(row=0, column=7, padx=(5, 0))
+        
+        # Réplica local para responder reportes sin conexión
+        self.replica_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(login_frame, text="Réplica local", variable=self.replica_var,
+                        command=self.toggle_replica).grid(row=0, column=8, padx=(10, 0))
         
         login_frame.columnconfigure(1, weight=1)
         
-    def setup_config_tab(self):
+    def setup_config_tab(self, config_frame):
         """Configurar pestaña de configuración"""
-        config_frame = ttk.Frame(self.notebook)
-        self.notebook.add(config_frame, text="⚙️ Configuración")
         
         # Frame principal con scroll
         canvas = tk.Canvas(config_frame)
@@ -189,10 +288,8 @@ class SupabaseGUI:
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
         
-    def setup_reports_tab(self):
+    def setup_reports_tab(self, reports_frame):
         """Configurar pestaña de reportes"""
-        reports_frame = ttk.Frame(self.notebook)
-        self.notebook.add(reports_frame, text="Reportes")
         
         # Frame de botones
         btn_frame = ttk.Frame(reports_frame)
@@ -202,15 +299,19 @@ class SupabaseGUI:
         ttk.Button(btn_frame, text="Sales by Category", command=self.get_sales_by_category).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(btn_frame, text="Sales by Country (CR)", command=self.get_sales_by_country).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(btn_frame, text="Top Products (30d)", command=self.get_top_products).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(btn_frame, text="Exportar Sales Fact...",
+                   command=lambda: self.export_source(self.reports_pane, "v_sales_fact")).pack(side=tk.LEFT, padx=(0, 5))
+        
+        # Antigüedad de las vistas materializadas
+        self.freshness_label = ttk.Label(btn_frame, text="", foreground="gray")
+        self.freshness_label.pack(side=tk.RIGHT)
         
         # Área de resultados
-        self.reports_text = scrolledtext.ScrolledText(reports_frame, height=35, wrap=tk.WORD)
-        self.reports_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        self.reports_pane = ResultPane(reports_frame)
+        self.reports_pane.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
         
-    def setup_authorization_tab(self):
+    def setup_authorization_tab(self, auth_frame):
         """Configurar pestaña de autorización"""
-        auth_frame = ttk.Frame(self.notebook)
-        self.notebook.add(auth_frame, text="Autorización")
         
         # Frame de botones
         btn_frame = ttk.Frame(auth_frame)
@@ -220,13 +321,11 @@ class SupabaseGUI:
         ttk.Button(btn_frame, text="Mis Categorías Permitidas", command=self.get_allowed_categories).pack(side=tk.LEFT, padx=(0, 5))
         
         # Área de resultados
-        self.auth_text = scrolledtext.ScrolledText(auth_frame, height=35, wrap=tk.WORD)
-        self.auth_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        self.auth_pane = ResultPane(auth_frame)
+        self.auth_pane.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
         
-    def setup_advanced_tab(self):
+    def setup_advanced_tab(self, advanced_frame):
         """Configurar pestaña de consultas avanzadas"""
-        advanced_frame = ttk.Frame(self.notebook)
-        self.notebook.add(advanced_frame, text="Consultas Avanzadas")
         
         # Frame de controles
         controls_frame = ttk.Frame(advanced_frame)
@@ -252,25 +351,33 @@ class SupabaseGUI:
         
         ttk.Label(customer_frame, text="Nombre:").grid(row=0, column=0, sticky=tk.W)
         self.customer_name_var = tk.StringVar(value="María")
-        ttk.Entry(customer_frame, textvariable=self.customer_name_var, width=20).grid(row=0, column=1, padx=(5, 10))
+        customer_entry = ttk.Entry(customer_frame, textvariable=self.customer_name_var, width=20)
+        customer_entry.grid(row=0, column=1, padx=(5, 10))
         
         ttk.Button(customer_frame, text="Buscar Clientes", command=self.search_customers).grid(row=0, column=2, padx=(10, 0))
         
+        # Búsqueda mientras se escribe: espera una pausa entre teclas antes de consultar
+        customer_entry.bind("<KeyRelease>", self.on_customer_key)
+        customer_entry.bind("<Return>", lambda event: self.search_customers())
+        customer_entry.bind("<Escape>", lambda event: self.clear_customer_search())
+        
         # Otras consultas
         other_frame = ttk.LabelFrame(controls_frame, text="Otras Consultas", padding="5")
         other_frame.pack(fill=tk.X)
         
         ttk.Button(other_frame, text="Facturas Este Mes", command=self.get_invoices_this_month).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(other_frame, text="Líneas Alto Valor (>1000)", command=self.get_high_value_lines).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(other_frame, text="Exportar Facturas...",
+                   command=lambda: self.export_source(self.advanced_pane, "invoices")).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(other_frame, text="Exportar Líneas...",
+                   command=lambda: self.export_source(self.advanced_pane, "invoice_lines")).pack(side=tk.LEFT, padx=(0, 5))
         
         # Área de resultados
-        self.advanced_text = scrolledtext.ScrolledText(advanced_frame, height=25, wrap=tk.WORD)
-        self.advanced_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        self.advanced_pane = ResultPane(advanced_frame)
+        self.advanced_pane.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
         
-    def setup_admin_tab(self):
+    def setup_admin_tab(self, admin_frame):
         """Configurar pestaña de administración"""
-        admin_frame = ttk.Frame(self.notebook)
-        self.notebook.add(admin_frame, text="Administración")
         
         # Frame de controles
         controls_frame = ttk.Frame(admin_frame)
@@ -281,6 +388,7 @@ class SupabaseGUI:
         user_frame.pack(fill=tk.X, pady=(0, 10))
         
         ttk.Button(user_frame, text="Ver Todos los Usuarios", command=self.admin_get_users).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(user_frame, text="Importar Archivo...", command=self.admin_import_file).pack(side=tk.LEFT, padx=(0, 5))
         
         # Crear usuario
         create_frame = ttk.LabelFrame(controls_frame, text="Crear Usuario", padding="5")
@@ -317,41 +425,144 @@ class SupabaseGUI:
         ttk.Button(perm_frame, text="Asignar Categoría", command=self.admin_assign_category).grid(row=1, column=4, padx=(5, 0), pady=(5, 0))
         
         # Área de resultados
-        self.admin_text = scrolledtext.ScrolledText(admin_frame, height=20, wrap=tk.WORD)
-        self.admin_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        self.admin_pane = ResultPane(admin_frame)
+        self.admin_pane.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        
+    def setup_diagnostics_tab(self, diagnostics_frame):
+        """Configurar pestaña de diagnósticos (llamadas lentas y latencia por endpoint)"""
+        
+        # Frame de botones
+        btn_frame = ttk.Frame(diagnostics_frame)
+        btn_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        ttk.Button(btn_frame, text="Llamadas Más Lentas", command=self.show_slowest_calls).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(btn_frame, text="Latencia por Endpoint", command=self.show_endpoint_latency).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(btn_frame, text="Tiempos de Inicio", command=self.show_startup_times).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(btn_frame, text="Limpiar", command=self.clear_diagnostics).pack(side=tk.LEFT, padx=(0, 5))
+        
+        # Área de resultados
+        self.diagnostics_pane = ResultPane(diagnostics_frame)
+        self.diagnostics_pane.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
         
     def login(self):
         """Iniciar sesión"""
         selected_user = self.user_var.get()
         if selected_user in USERS:
             user_data = USERS[selected_user]
-            result = self.client.login(user_data["email"], user_data["password"])
+            self.login_btn.config(state="disabled")
+            self.status_label.config(text="Autenticando...", foreground="blue")
             
-            if result["success"]:
-                self.current_user = selected_user
-                self.status_label.config(text=f"Autenticado como: {selected_user}", foreground="green")
-                self.login_btn.config(state="disabled")
-                self.logout_btn.config(state="normal")
-                self.toggle_tabs(True)
-                messagebox.showinfo("Éxito", f"Conectado como {user_data['description']}")
-            else:
-                messagebox.showerror("Error", result["message"])
+            def done(result):
+                if result["success"]:
+                    self.current_user = selected_user
+                    self.status_label.config(text=f"Autenticado como: {selected_user}", foreground="green")
+                    self.logout_btn.config(state="normal")
+                    self.toggle_tabs(True)
+                    if self.replica_var.get():
+                        self.start_replica()
+                    messagebox.showinfo("Éxito", f"Conectado como {user_data['description']}")
+                else:
+                    self.status_label.config(text="No autenticado", foreground="red")
+                    self.login_btn.config(state="normal")
+                    messagebox.showerror("Error", result.get("message", result.get("error")))
+                    
+            self.runner.submit("login", self.client.login, done, user_data["email"], user_data["password"])
+        
+    def login_all(self):
+        """Autenticar a todos los usuarios de config y activar el seleccionado"""
+        self.status_label.config(text="Autenticando usuarios...", foreground="blue")
+        
+        def done(result):
+            failed = result["data"]["failed"]
+            if failed:
+                messagebox.showwarning("Sesiones", "No se pudo autenticar a:\n" + "\n".join(failed))
+            self.on_user_selected()
+            
+        self.runner.submit("login", self.client.login_all, done)
+        
+    def on_user_selected(self):
+        """Cambiar a la sesión del usuario elegido si ya está en el pool"""
+        selected_user = self.user_var.get()
+        if selected_user not in USERS or selected_user == self.current_user:
+            return
+        pooled = self.client.sessions.get(USERS[selected_user]["email"]) is not None
+        if not pooled and not self.current_user:
+            return
+        self.runner.cancel_all()
+        self.clear_panes()
+        # Cambiar de usuario recién cuando la sincronización de la réplica terminó
+        self.stop_replica(then=lambda: self.activate_user(selected_user, pooled))
+        
+    def activate_user(self, selected_user, pooled):
+        """Activar la sesión del usuario elegido (o autenticarlo si no está en el pool)"""
+        if self.user_var.get() != selected_user:
+            # Se eligió otro usuario mientras se detenía la réplica
+            return
+        if not pooled:
+            # Usuario sin sesión: autenticarlo (queda en el pool para el próximo cambio)
+            self.login()
+            return
+        self.client.switch_user(USERS[selected_user]["email"])
+        self.current_user = selected_user
+        self.status_label.config(text=f"Autenticado como: {selected_user}", foreground="green")
+        self.login_btn.config(state="disabled")
+        self.logout_btn.config(state="normal")
+        self.toggle_tabs(True)
+        if self.replica_var.get():
+            self.start_replica()
         
     def logout(self):
         """Cerrar sesión"""
-        self.client.jwt_token = None
-        self.client.user_id = None
+        self.runner.cancel_all()
+        self.stop_replica()
+        self.client.logout()
         self.current_user = None
         self.status_label.config(text="No autenticado", foreground="red")
         self.login_btn.config(state="normal")
         self.logout_btn.config(state="disabled")
         self.toggle_tabs(False)
+        self.clear_panes()
+        
+    def clear_panes(self):
+        """Limpiar los paneles de resultados de las pestañas ya construidas"""
+        for pane in (self.reports_pane, self.auth_pane, self.advanced_pane, self.admin_pane):
+            if pane is not None:
+                pane.clear()
+        if self.freshness_label is not None:
+            self.freshness_label.config(text="")
+        
+    def toggle_replica(self):
+        """Activar o desactivar la réplica local del usuario autenticado"""
+        if not self.replica_var.get():
+            self.stop_replica()
+        elif self.current_user:
+            self.start_replica()
+            
+    def start_replica(self):
+        """Crear la réplica del usuario actual y sincronizarla en segundo plano
         
-        # Limpiar todas las áreas de texto
-        self.reports_text.delete(1.0, tk.END)
-        self.auth_text.delete(1.0, tk.END)
-        self.advanced_text.delete(1.0, tk.END)
-        self.admin_text.delete(1.0, tk.END)
+        Mientras no termine la primera sincronización las consultas siguen
+        yendo a Supabase.
+        """
+        self.stop_replica()
+        from replica import LocalReplica
+        self.replica = LocalReplica(self.client)
+        self.client.attach_replica(self.replica)
+        self.replica.start_background_sync()
+        
+    def stop_replica(self, then=None):
+        """Desconectar la réplica local sin bloquear la interfaz
+        
+        `then` se llama en el hilo de Tk cuando el hilo de sincronización ya terminó.
+        """
+        if self.replica is None:
+            if then:
+                then()
+            return
+        replica = self.replica
+        self.replica = None
+        self.client.attach_replica(None)
+        self.runner.submit("replica", replica.stop, lambda result: then() if then else None)
         
     def toggle_tabs(self, enable):
         """Habilitar/deshabilitar pestañas (excepto configuración)"""
@@ -360,90 +571,225 @@ class SupabaseGUI:
         for i in range(1, self.notebook.index("end")):
             self.notebook.tab(i, state=state)
             
-    def display_result(self, text_widget, result, title="Resultado"):
-        """Mostrar resultado en el widget de texto"""
-        text_widget.delete(1.0, tk.END)
-        text_widget.insert(tk.END, f"=== {title} ===\n\n")
+    def update_busy_indicator(self, count):
+        """Mostrar u ocultar el indicador de consultas en curso"""
+        if count > 0:
+            self.busy_bar.start(10)
+            self.busy_label.config(text=f"{count} consulta(s) en curso")
+        else:
+            self.busy_bar.stop()
+            self.busy_label.config(text="")
+            
+    def on_close(self):
+        """Cerrar la ventana sin esperar consultas pendientes"""
+        self.runner.shutdown()
+        if self.replica is not None:
+            self.replica.stop()
+        if self._client is not None:
+            self._client.close()
+        self.root.destroy()
+        
+    def run_query(self, pane, title, func, *args, on_success=None):
+        """Ejecutar una consulta en segundo plano y mostrarla en el panel
+        
+        Una consulta nueva sobre el mismo panel reemplaza a la anterior.
+        """
+        pane.show_loading(title)
+        
+        def done(result):
+            self.display_result(pane, result, title)
+            if on_success and result["success"]:
+                on_success(result)
+                
+        self.runner.submit(str(pane), func, done, *args)
+        
+    def run_paged_query(self, pane, title, func, *args):
+        """Mostrar la primera página de una consulta y cargar el resto al hacer scroll"""
+        pane.show_loading(title)
+        paged = func(*args, paged=True)
+        
+        def fetch_page():
+            return {"success": True, "data": paged.next_page(), "has_more": paged.has_more}
+        
+        def fetch_more():
+            self.runner.submit(str(pane), fetch_page,
+                               lambda result: self.append_page(pane, result))
+        
+        def done(result):
+            self.display_result(pane, result, title, fetch_more=fetch_more,
+                                has_more=result.get("has_more", False))
+            
+        self.runner.submit(str(pane), fetch_page, done)
         
+    def append_page(self, pane, result):
+        """Agregar una página cargada por scroll al panel"""
         if result["success"]:
-            if "data" in result:
-                # Formatear JSON de manera legible
-                formatted_data = json.dumps(result["data"], indent=2, ensure_ascii=False)
-                text_widget.insert(tk.END, formatted_data)
-            else:
-                text_widget.insert(tk.END, "Operación exitosa")
+            pane.append_rows(result["data"], has_more=result["has_more"])
         else:
-            text_widget.insert(tk.END, f"Error: {result.get('error', 'Error desconocido')}")
-            if "status" in result:
-                text_widget.insert(tk.END, f"\nCódigo de estado: {result['status']}")
+            pane.append_rows([], has_more=False)
+            messagebox.showerror("Error", result.get("error", "Error desconocido"))
+        
+    def display_result(self, pane, result, title="Resultado", fetch_more=None, has_more=False):
+        """Mostrar resultado en el panel (tabla virtualizada o texto)"""
+        pane.show_result(result, title, fetch_more=fetch_more, has_more=has_more)
                 
     # Métodos para reportes
     def get_sales_fact(self):
-        result = self.client.get_sales_fact()
-        self.display_result(self.reports_text, result, "Sales Fact View")
+        self.run_paged_query(self.reports_pane, "Sales Fact View", self.client.get_sales_fact)
+        self.update_report_freshness()
         
     def get_sales_by_category(self):
-        result = self.client.get_sales_by_category()
-        self.display_result(self.reports_text, result, "Sales by Category")
+        self.run_query(self.reports_pane, "Sales by Category", self.client.get_sales_by_category)
+        self.update_report_freshness()
         
     def get_sales_by_country(self):
-        result = self.client.get_sales_by_country()
-        self.display_result(self.reports_text, result, "Sales by Country (CR)")
+        self.run_query(self.reports_pane, "Sales by Country (CR)", self.client.get_sales_by_country)
+        self.update_report_freshness()
         
     def get_top_products(self):
-        result = self.client.get_top_products()
-        self.display_result(self.reports_text, result, "Top Products (30 días)")
+        self.run_query(self.reports_pane, "Top Products (30 días)", self.client.get_top_products)
+        self.update_report_freshness()
+        
+    def update_report_freshness(self):
+        """Mostrar hace cuánto se refrescaron las vistas materializadas"""
+        def done(result):
+            if not result["success"]:
+                self.freshness_label.config(text="")
+                return
+            info = result["data"]
+            minutes = int(info["age_seconds"] // 60)
+            text = "Datos actualizados hace menos de 1 min" if minutes < 1 else f"Datos actualizados hace {minutes} min"
+            if info["dirty"]:
+                text += " (hay cambios pendientes)"
+            self.freshness_label.config(text=text)
+            
+        self.runner.submit("freshness", self.client.get_reports_refreshed_at, done)
+        
+    def export_source(self, pane, source):
+        """Exportar una vista o tabla completa a disco sin cargarla en la GUI"""
+        from tkinter import filedialog
+        path = filedialog.asksaveasfilename(
+            title=f"Exportar {source}",
+            initialfile=f"{source}.csv.gz",
+            filetypes=[("CSV comprimido", "*.csv.gz"), ("CSV", "*.csv"), ("NDJSON comprimido", "*.ndjson.gz"),
+                       ("NDJSON", "*.ndjson"), ("Parquet", "*.parquet"), ("Todos los archivos", "*.*")]
+        )
+        if not path:
+            return
+        resume = False
+        if os.path.exists(path + ".checkpoint"):
+            resume = messagebox.askyesno("Exportar", "Hay una exportación incompleta en ese archivo. ¿Reanudarla?")
+        self.run_query(pane, f"Exportar {source} a {os.path.basename(path)}",
+                       self.client.export, source, path, resume=resume)
         
     # Métodos para autorización
     def get_allowed_countries(self):
-        result = self.client.get_my_allowed_countries()
-        self.display_result(self.auth_text, result, "Mis Países Permitidos")
+        self.run_query(self.auth_pane, "Mis Países Permitidos", self.client.get_my_allowed_countries)
         
     def get_allowed_categories(self):
-        result = self.client.get_my_allowed_categories()
-        self.display_result(self.auth_text, result, "Mis Categorías Permitidas")
+        self.run_query(self.auth_pane, "Mis Categorías Permitidas", self.client.get_my_allowed_categories)
         
     # Métodos para consultas avanzadas
     def search_products_by_price(self):
         try:
             min_price = float(self.min_price_var.get())
             max_price = float(self.max_price_var.get())
-            result = self.client.get_products_by_price_range(min_price, max_price)
-            self.display_result(self.advanced_text, result, f"Productos entre ${min_price} y ${max_price}")
+            self.run_query(self.advanced_pane, f"Productos entre ${min_price} y ${max_price}",
+                           self.client.get_products_by_price_range, min_price, max_price)
         except ValueError:
             messagebox.showerror("Error", "Por favor ingrese precios válidos")
             
     def search_customers(self):
+        self.cancel_typeahead()
         name = self.customer_name_var.get().strip()
         if name:
-            result = self.client.search_customers(name)
-            self.display_result(self.advanced_text, result, f"Clientes con nombre '{name}'")
+            self.run_query(self.advanced_pane, f"Clientes con nombre '{name}'",
+                           self.client.search_customers, name)
         else:
             messagebox.showerror("Error", "Por favor ingrese un nombre para buscar")
             
+    def on_customer_key(self, event):
+        """Reprogramar la búsqueda de sugerencias en cada tecla (debounce)"""
+        if event.keysym in ("Return", "Escape", "Tab"):
+            return
+        if self.typeahead_job is not None:
+            self.root.after_cancel(self.typeahead_job)
+        self.typeahead_job = self.root.after(config.TYPEAHEAD_DEBOUNCE_MS, self.suggest_customers)
+        
+    def suggest_customers(self):
+        """Buscar sugerencias en el canal del panel: una búsqueda nueva descarta la anterior"""
+        self.typeahead_job = None
+        text = self.customer_name_var.get().strip()
+        if len(text) < config.TYPEAHEAD_MIN_CHARS:
+            self.runner.cancel(str(self.advanced_pane))
+            return
+        self.run_query(self.advanced_pane, f"Clientes que contienen '{text}'",
+                       self.client.suggest_customers, text)
+        
+    def cancel_typeahead(self):
+        """Cancelar la sugerencia programada y descartar la que esté en curso"""
+        if self.typeahead_job is not None:
+            self.root.after_cancel(self.typeahead_job)
+            self.typeahead_job = None
+        self.runner.cancel(str(self.advanced_pane))
+        
+    def clear_customer_search(self):
+        self.cancel_typeahead()
+        self.customer_name_var.set("")
+        self.advanced_pane.clear()
+        
     def get_invoices_this_month(self):
-        result = self.client.get_invoices_this_month()
-        self.display_result(self.advanced_text, result, "Facturas Este Mes")
+        self.run_paged_query(self.advanced_pane, "Facturas Este Mes", self.client.get_invoices_this_month)
         
     def get_high_value_lines(self):
-        result = self.client.get_high_value_invoice_lines()
-        self.display_result(self.advanced_text, result, "Líneas de Factura Alto Valor (>$1000)")
+        self.run_paged_query(self.advanced_pane, "Líneas de Factura Alto Valor (>$1000)", self.client.get_high_value_invoice_lines)
+        
+    # Métodos de diagnóstico (los spans ya están en memoria: no se consulta la red)
+    def show_slowest_calls(self):
+        result = {"success": True, "data": self.client.get_trace_stats(50)["slowest"]}
+        self.display_result(self.diagnostics_pane, result, "Llamadas Más Lentas")
+        
+    def show_endpoint_latency(self):
+        result = {"success": True, "data": self.client.get_trace_stats()["endpoints"]}
+        self.display_result(self.diagnostics_pane, result, "Latencia por Endpoint")
+        
+    def show_startup_times(self):
+        report = self.startup_report()
+        rows = report["phases"] + [{"phase": f"pestaña: {text}", "ms": ms, "total_ms": None}
+                                   for text, ms in report["tabs_ms"].items()]
+        self.display_result(self.diagnostics_pane, {"success": True, "data": rows}, "Tiempos de Inicio")
+        
+    def clear_diagnostics(self):
+        if self.client.instrumentation.memory is not None:
+            self.client.instrumentation.memory.clear()
+        self.display_result(self.diagnostics_pane, {"success": True, "data": []}, "Diagnósticos")
         
     # Métodos administrativos
     def admin_get_users(self):
-        result = self.client.admin_get_all_users()
-        self.display_result(self.admin_text, result, "Todos los Usuarios (Admin)")
-        
+        self.run_query(self.admin_pane, "Todos los Usuarios (Admin)", self.client.admin_get_all_users)
+        
+    def admin_import_file(self):
+        """Crear usuarios y asignar permisos en lote desde un CSV"""
+        from tkinter import filedialog
+        path = filedialog.askopenfilename(
+            title="Importar usuarios y permisos",
+            filetypes=[("CSV", "*.csv"), ("Todos los archivos", "*.*")]
+        )
+        if path:
+            self.run_query(self.admin_pane, f"Importar {os.path.basename(path)}",
+                           self.client.admin_import_users_csv, path)
+            
     def admin_create_user(self):
         email = self.new_email_var.get().strip()
         password = self.new_password_var.get().strip()
         
         if email and password:
-            result = self.client.admin_create_user(email, password)
-            self.display_result(self.admin_text, result, f"Crear Usuario: {email}")
-            if result["success"]:
+            def created(result):
                 self.new_email_var.set("")
                 messagebox.showinfo("Éxito", f"Usuario {email} creado exitosamente")
+                
+            self.run_query(self.admin_pane, f"Crear Usuario: {email}",
+                           self.client.admin_create_user, email, password, on_success=created)
         else:
             messagebox.showerror("Error", "Por favor complete email y password")
             
@@ -452,10 +798,9 @@ class SupabaseGUI:
         country = self.country_var.get().strip()
         
         if user_id and country:
-            result = self.client.admin_assign_country_permission(user_id, country)
-            self.display_result(self.admin_text, result, f"Asignar País {country} a Usuario {user_id[:8]}...")
-            if result["success"]:
-                messagebox.showinfo("Éxito", f"Permiso de país {country} asignado")
+            self.run_query(self.admin_pane, f"Asignar País {country} a Usuario {user_id[:8]}...",
+                           self.client.admin_assign_country_permission, user_id, country,
+                           on_success=lambda r: messagebox.showinfo("Éxito", f"Permiso de país {country} asignado"))
         else:
             messagebox.showerror("Error", "Por favor complete User ID y País")
             
@@ -466,10 +811,9 @@ class SupabaseGUI:
         if user_id and category_id:
             try:
                 cat_id = int(category_id)
-                result = self.client.admin_assign_category_permission(user_id, cat_id)
-                self.display_result(self.admin_text, result, f"Asignar Categoría {cat_id} a Usuario {user_id[:8]}...")
-                if result["success"]:
-                    messagebox.showinfo("Éxito", f"Permiso de categoría {cat_id} asignado")
+                self.run_query(self.admin_pane, f"Asignar Categoría {cat_id} a Usuario {user_id[:8]}...",
+                               self.client.admin_assign_category_permission, user_id, cat_id,
+                               on_success=lambda r: messagebox.showinfo("Éxito", f"Permiso de categoría {cat_id} asignado"))
             except ValueError:
                 messagebox.showerror("Error", "ID de categoría debe ser un número")
         else:
@@ -503,15 +847,18 @@ class SupabaseGUI:
             if service_key:
                 config.SERVICE_ROLE_KEY = service_key
             
-            # Actualizar cliente existente
+            # Si hay una sesión activa, cerrarla (y detener la réplica) para forzar re-autenticación
+            had_session = self.current_user is not None
+            if had_session:
+                self.logout()
+            
+            # Actualizar cliente existente: descarta las sesiones del proyecto anterior
             self.client.update_credentials()
             
             # Actualizar estado
             self.config_status_label.config(text="✅ Configuración guardada exitosamente", foreground="green")
             
-            # Si hay una sesión activa, cerrarla para forzar re-autenticación
-            if self.current_user:
-                self.logout()
+            if had_session:
                 messagebox.showinfo("Configuración Guardada", 
                                   "Configuración actualizada. Por favor, inicia sesión nuevamente.")
             else:
@@ -530,45 +877,41 @@ class SupabaseGUI:
     
     def test_connection(self):
         """Probar conexión con las credenciales actuales"""
-        try:
-            # Guardar temporalmente credenciales actuales
-            original_url = config.SUPABASE_URL
-            original_key = config.SUPABASE_KEY
-            
-            # Usar credenciales del formulario
-            config.SUPABASE_URL = self.supabase_url_var.get().strip()
-            config.SUPABASE_KEY = self.api_key_var.get().strip()
-            
-            # Crear cliente temporal
+        url = self.supabase_url_var.get().strip()
+        api_key = self.api_key_var.get().strip()
+        self.config_status_label.config(text="⏳ Probando conexión...", foreground="blue")
+        
+        def probe():
+            # Cliente temporal con las credenciales del formulario
+            from supabase_client import SupabaseClient
             test_client = SupabaseClient()
-            
-            # Intentar una llamada simple (obtener users admin)
-            url = f"{test_client.base_url}/auth/v1/admin/users"
-            headers = {"apikey": test_client.api_key}
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            
-            if response.status_code in [200, 401, 403]:
+            test_client.base_url = url
+            test_client.api_key = api_key
+            try:
+                # Intentar una llamada simple (obtener users admin)
+                response = test_client._request("GET", f"{url}/auth/v1/admin/users",
+                                                headers={"apikey": api_key}, timeout=10)
+                return {"success": True, "status": response.status_code, "text": response.text[:200]}
+            except Exception as e:
+                return {"success": False, "error": str(e)}
+            finally:
+                test_client.close()
+        
+        def done(result):
+            if result["success"] and result["status"] in [200, 401, 403]:
                 # 200 = éxito, 401/403 = sin permisos pero conexión OK
                 self.config_status_label.config(text="✅ Conexión exitosa", foreground="green")
                 messagebox.showinfo("Prueba de Conexión", 
                                   "¡Conexión exitosa! Las credenciales son válidas.")
-            else:
+            elif result["success"]:
                 self.config_status_label.config(text="❌ Error de conexión", foreground="red")
                 messagebox.showerror("Error de Conexión", 
-                                   f"Error {response.status_code}: {response.text[:200]}")
-            
-            # Restaurar credenciales originales
-            config.SUPABASE_URL = original_url
-            config.SUPABASE_KEY = original_key
-            
-        except Exception as e:
-            self.config_status_label.config(text="❌ Error de conexión", foreground="red")
-            messagebox.showerror("Error de Conexión", f"No se pudo conectar: {str(e)}")
-            
-            # Restaurar credenciales originales en caso de error
-            config.SUPABASE_URL = original_url
-            config.SUPABASE_KEY = original_key
+                                   f"Error {result['status']}: {result['text']}")
+            else:
+                self.config_status_label.config(text="❌ Error de conexión", foreground="red")
+                messagebox.showerror("Error de Conexión", f"No se pudo conectar: {result['error']}")
+                
+        self.runner.submit("test_connection", probe, done)
     
     def add_custom_user(self):
         """Agregar usuario personalizado a la lista"""
@@ -586,9 +929,20 @@ class SupabaseGUI:
         else:
             messagebox.showerror("Error", "Por favor complete email y password")
 
-def main():
+def main(argv=None):
+    """Iniciar la GUI; con --startup-report imprime los tiempos de arranque en JSON y sale"""
+    argv = sys.argv[1:] if argv is None else argv
     root = tk.Tk()
     app = SupabaseGUI(root)
+    # Primer dibujado: esperar a que la ventana sea visible y procesar el redibujado pendiente
+    root.wait_visibility()
+    root.update_idletasks()
+    report_only = "--startup-report" in argv
+    app.on_first_paint(preload=not report_only)
+    if report_only:
+        print(json.dumps(app.startup_report()))
+        root.destroy()
+        return
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,71 @@
+-- Agregaciones del lado del servidor expuestas como RPC (/rest/v1/rpc/...)
+-- SECURITY INVOKER: la función corre con el rol del usuario, así las
+-- políticas RLS de invoice_lines/invoices/customers/products siguen aplicando
+-- y solo viajan por la red las filas ya agregadas.
+
+CREATE OR REPLACE FUNCTION public.sales_summary(
+  p_group_by text DEFAULT 'category',
+  p_date_from date DEFAULT NULL,
+  p_date_to date DEFAULT NULL,
+  p_countries text[] DEFAULT NULL,
+  p_categories bigint[] DEFAULT NULL,
+  p_limit integer DEFAULT NULL
+)
+RETURNS TABLE (
+  group_key text,
+  group_label text,
+  invoices bigint,
+  total_quantity numeric,
+  total_sales numeric
+)
+LANGUAGE plpgsql
+STABLE
+SECURITY INVOKER
+SET search_path = public
+AS $$
+#variable_conflict use_column
+BEGIN
+  IF p_group_by NOT IN ('category', 'country', 'product', 'customer', 'day', 'month') THEN
+    RAISE EXCEPTION 'p_group_by inválido: %', p_group_by
+      USING ERRCODE = '22023';
+  END IF;
+
+  RETURN QUERY
+  SELECT
+    CASE p_group_by
+      WHEN 'category' THEN p.category_id::text
+      WHEN 'country'  THEN c.country_code
+      WHEN 'product'  THEN p.id::text
+      WHEN 'customer' THEN c.id::text
+      WHEN 'day'      THEN i.invoice_date::text
+      ELSE to_char(i.invoice_date, 'YYYY-MM')
+    END AS group_key,
+    CASE p_group_by
+      WHEN 'category' THEN cat.name
+      WHEN 'country'  THEN co.name
+      WHEN 'product'  THEN p.name
+      WHEN 'customer' THEN c.name
+      WHEN 'day'      THEN i.invoice_date::text
+      ELSE to_char(i.invoice_date, 'YYYY-MM')
+    END AS group_label,
+    COUNT(DISTINCT l.invoice_id) AS invoices,
+    SUM(l.quantity) AS total_quantity,
+    SUM(l.line_total) AS total_sales
+  FROM public.invoice_lines l
+  JOIN public.invoices i ON i.id = l.invoice_id
+  JOIN public.customers c ON c.id = i.customer_id
+  JOIN public.products p ON p.id = l.product_id
+  JOIN public.categories cat ON cat.id = p.category_id
+  JOIN public.countries co ON co.code = c.country_code
+  WHERE (p_date_from IS NULL OR i.invoice_date >= p_date_from)
+    AND (p_date_to IS NULL OR i.invoice_date <= p_date_to)
+    AND (p_countries IS NULL OR c.country_code = ANY (p_countries))
+    AND (p_categories IS NULL OR p.category_id = ANY (p_categories))
+  GROUP BY 1, 2
+  ORDER BY 5 DESC
+  LIMIT p_limit;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.sales_summary(text, date, date, text[], bigint[], integer) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.sales_summary(text, date, date, text[], bigint[], integer) TO authenticated;
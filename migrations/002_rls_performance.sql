@@ -0,0 +1,99 @@
+-- Rendimiento de RLS: índices para las llaves foráneas que usan las políticas
+-- y políticas reescritas para que los permisos del usuario se calculen una
+-- sola vez por sentencia en lugar de una vez por fila.
+--
+-- Medición antes/después: migrations/bench/rls_explain.sql
+
+BEGIN;
+
+-- 1. Índices sobre las columnas de join de las políticas y vistas
+CREATE INDEX IF NOT EXISTS invoice_lines_invoice_id_idx ON public.invoice_lines (invoice_id);
+CREATE INDEX IF NOT EXISTS invoice_lines_product_id_idx ON public.invoice_lines (product_id);
+CREATE INDEX IF NOT EXISTS invoices_customer_id_idx ON public.invoices (customer_id);
+CREATE INDEX IF NOT EXISTS customers_country_code_idx ON public.customers (country_code);
+CREATE INDEX IF NOT EXISTS products_category_id_idx ON public.products (category_id);
+
+-- 2. Conjuntos permitidos del usuario actual
+-- SECURITY DEFINER evita evaluar RLS sobre las tablas de autorización y
+-- STABLE permite que el planner las ejecute una vez como initplan cuando se
+-- invocan dentro de (SELECT ...).
+CREATE OR REPLACE FUNCTION public.my_allowed_country_codes()
+RETURNS text[]
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  SELECT coalesce(array_agg(country_code), '{}')
+  FROM public.user_allowed_country
+  WHERE user_id = (SELECT auth.uid());
+$$;
+
+CREATE OR REPLACE FUNCTION public.my_allowed_category_ids()
+RETURNS bigint[]
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  SELECT coalesce(array_agg(category_id), '{}')
+  FROM public.user_allowed_category
+  WHERE user_id = (SELECT auth.uid());
+$$;
+
+REVOKE ALL ON FUNCTION public.my_allowed_country_codes() FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.my_allowed_category_ids() FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.my_allowed_country_codes() TO authenticated;
+GRANT EXECUTE ON FUNCTION public.my_allowed_category_ids() TO authenticated;
+
+-- 3. Políticas reescritas (mismo alcance que las de database_squema.sql)
+
+-- Products por categoría
+DROP POLICY IF EXISTS "products_by_user_category_select" ON public.products;
+CREATE POLICY "products_by_user_category_select"
+ON public.products FOR SELECT
+TO authenticated
+USING (category_id = ANY ((SELECT public.my_allowed_category_ids())));
+
+-- Customers por país
+DROP POLICY IF EXISTS "customers_by_user_country_select" ON public.customers;
+CREATE POLICY "customers_by_user_country_select"
+ON public.customers FOR SELECT
+TO authenticated
+USING (country_code = ANY ((SELECT public.my_allowed_country_codes())));
+
+-- Invoices por país (ligado al cliente)
+DROP POLICY IF EXISTS "invoices_by_user_country_select" ON public.invoices;
+CREATE POLICY "invoices_by_user_country_select"
+ON public.invoices FOR SELECT
+TO authenticated
+USING (EXISTS (
+  SELECT 1
+  FROM public.customers c
+  WHERE c.id = invoices.customer_id
+  AND c.country_code = ANY ((SELECT public.my_allowed_country_codes()))
+));
+
+-- Invoice lines por país y categoría
+DROP POLICY IF EXISTS "lines_by_country_and_category_select" ON public.invoice_lines;
+CREATE POLICY "lines_by_country_and_category_select"
+ON public.invoice_lines FOR SELECT
+TO authenticated
+USING (
+  EXISTS (
+    SELECT 1
+    FROM public.invoices i
+    JOIN public.customers c ON c.id = i.customer_id
+    WHERE i.id = invoice_lines.invoice_id
+    AND c.country_code = ANY ((SELECT public.my_allowed_country_codes()))
+  )
+  AND
+  EXISTS (
+    SELECT 1
+    FROM public.products p
+    WHERE p.id = invoice_lines.product_id
+    AND p.category_id = ANY ((SELECT public.my_allowed_category_ids()))
+  )
+);
+
+COMMIT;
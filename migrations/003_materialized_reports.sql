@@ -0,0 +1,230 @@
+-- Vistas de reporte materializadas con refresco concurrente
+--
+-- Requiere 002_rls_performance.sql (my_allowed_country_codes / my_allowed_category_ids).
+-- Las vistas materializadas no aplican RLS, por eso no se otorgan a los
+-- usuarios: las vistas públicas v_* las leen con los privilegios del dueño
+-- y filtran con los mismos conjuntos permitidos que usan las políticas de
+-- invoice_lines (país del cliente y categoría del producto).
+
+BEGIN;
+
+-- 1. Hechos de venta a nivel de línea
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_sales_fact AS
+SELECT
+  l.id AS line_id,
+  l.invoice_id,
+  i.invoice_date,
+  c.id AS customer_id,
+  c.name AS customer_name,
+  c.country_code,
+  p.id AS product_id,
+  p.name AS product_name,
+  p.category_id,
+  cat.name AS category_name,
+  l.quantity,
+  l.unit_price,
+  l.line_total
+FROM public.invoice_lines l
+JOIN public.invoices i ON i.id = l.invoice_id
+JOIN public.customers c ON c.id = i.customer_id
+JOIN public.products p ON p.id = l.product_id
+JOIN public.categories cat ON cat.id = p.category_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS mv_sales_fact_line_id_idx ON public.mv_sales_fact (line_id);
+CREATE INDEX IF NOT EXISTS mv_sales_fact_scope_idx ON public.mv_sales_fact (country_code, category_id);
+
+-- 2. Agregados diarios (base de los demás reportes). Cada factura tiene una sola
+-- fecha y un solo país, así la suma de `invoices` por categoría sigue siendo exacta.
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_sales_daily AS
+SELECT
+  invoice_date,
+  country_code,
+  category_id,
+  category_name,
+  COUNT(DISTINCT invoice_id) AS invoices,
+  COUNT(*) AS line_count,
+  SUM(quantity) AS total_quantity,
+  SUM(line_total) AS total_sales
+FROM public.mv_sales_fact
+GROUP BY invoice_date, country_code, category_id, category_name;
+
+CREATE UNIQUE INDEX IF NOT EXISTS mv_sales_daily_key_idx
+  ON public.mv_sales_daily (invoice_date, country_code, category_id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_product_sales_daily AS
+SELECT
+  invoice_date,
+  country_code,
+  category_id,
+  category_name,
+  product_id,
+  product_name,
+  SUM(quantity) AS total_quantity,
+  SUM(line_total) AS total_sales
+FROM public.mv_sales_fact
+GROUP BY invoice_date, country_code, category_id, category_name, product_id, product_name;
+
+CREATE UNIQUE INDEX IF NOT EXISTS mv_product_sales_daily_key_idx
+  ON public.mv_product_sales_daily (invoice_date, country_code, category_id, product_id);
+
+REVOKE ALL ON public.mv_sales_fact, public.mv_sales_daily, public.mv_product_sales_daily
+  FROM anon, authenticated;
+
+-- 3. Vistas públicas con filtrado equivalente a RLS
+DROP VIEW IF EXISTS public.v_sales_fact;
+CREATE VIEW public.v_sales_fact AS
+SELECT *
+FROM public.mv_sales_fact
+WHERE country_code = ANY ((SELECT public.my_allowed_country_codes()))
+  AND category_id = ANY ((SELECT public.my_allowed_category_ids()));
+
+DROP VIEW IF EXISTS public.v_sales_by_category;
+CREATE VIEW public.v_sales_by_category AS
+SELECT
+  category_id,
+  category_name,
+  SUM(invoices) AS invoices,
+  SUM(total_quantity) AS total_quantity,
+  SUM(total_sales) AS total_sales
+FROM public.mv_sales_daily
+WHERE country_code = ANY ((SELECT public.my_allowed_country_codes()))
+  AND category_id = ANY ((SELECT public.my_allowed_category_ids()))
+GROUP BY category_id, category_name;
+
+DROP VIEW IF EXISTS public.v_sales_by_country;
+CREATE VIEW public.v_sales_by_country AS
+SELECT
+  country_code,
+  SUM(line_count) AS line_count,
+  SUM(total_quantity) AS total_quantity,
+  SUM(total_sales) AS total_sales
+FROM public.mv_sales_daily
+WHERE country_code = ANY ((SELECT public.my_allowed_country_codes()))
+  AND category_id = ANY ((SELECT public.my_allowed_category_ids()))
+GROUP BY country_code;
+
+DROP VIEW IF EXISTS public.v_top_products_30d;
+CREATE VIEW public.v_top_products_30d AS
+SELECT
+  product_id,
+  product_name,
+  category_name,
+  SUM(total_quantity) AS total_quantity,
+  SUM(total_sales) AS total_sales
+FROM public.mv_product_sales_daily
+WHERE invoice_date >= current_date - 30
+  AND country_code = ANY ((SELECT public.my_allowed_country_codes()))
+  AND category_id = ANY ((SELECT public.my_allowed_category_ids()))
+GROUP BY product_id, product_name, category_name
+ORDER BY total_sales DESC;
+
+GRANT SELECT ON public.v_sales_fact, public.v_sales_by_category,
+                public.v_sales_by_country, public.v_top_products_30d TO authenticated;
+
+-- 4. Estado de refresco (lo lee el cliente para mostrar la antigüedad de los datos)
+-- Cada sentencia de escritura incrementa write_version; el refresco guarda en
+-- refreshed_version la versión que vio al empezar. Un incremento aún sin
+-- confirmar no es visible para el refresco, así que una escritura que se
+-- confirma durante el REFRESH deja write_version > refreshed_version y entra
+-- en la siguiente ejecución.
+CREATE TABLE IF NOT EXISTS public.report_refresh_state (
+  view_name text PRIMARY KEY,
+  refreshed_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Instalaciones anteriores tenían `dirty` como columna común
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM information_schema.columns
+             WHERE table_schema = 'public' AND table_name = 'report_refresh_state'
+               AND column_name = 'dirty' AND is_generated = 'NEVER') THEN
+    ALTER TABLE public.report_refresh_state DROP COLUMN dirty;
+  END IF;
+END;
+$$;
+
+ALTER TABLE public.report_refresh_state
+  ADD COLUMN IF NOT EXISTS write_version bigint NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS refreshed_version bigint NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS dirty boolean GENERATED ALWAYS AS (write_version > refreshed_version) STORED;
+
+INSERT INTO public.report_refresh_state (view_name)
+VALUES ('mv_sales_fact'), ('mv_sales_daily'), ('mv_product_sales_daily')
+ON CONFLICT (view_name) DO NOTHING;
+
+-- Supabase da por defecto DML sobre las tablas nuevas de public a anon y
+-- authenticated: sin este REVOKE cualquiera podría limpiar el estado por la API
+REVOKE ALL ON public.report_refresh_state FROM PUBLIC, anon, authenticated;
+GRANT SELECT ON public.report_refresh_state TO authenticated;
+
+CREATE OR REPLACE FUNCTION public.refresh_report_views(p_force boolean DEFAULT false)
+RETURNS timestamptz
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_dirty boolean;
+  v_seen bigint;
+BEGIN
+  -- Versión confirmada antes de refrescar: lo que se confirme después queda pendiente
+  SELECT bool_or(dirty), max(write_version) INTO v_dirty, v_seen FROM public.report_refresh_state;
+  IF NOT p_force AND NOT coalesce(v_dirty, true) THEN
+    RETURN (SELECT min(refreshed_at) FROM public.report_refresh_state);
+  END IF;
+
+  REFRESH MATERIALIZED VIEW CONCURRENTLY public.mv_sales_fact;
+  REFRESH MATERIALIZED VIEW CONCURRENTLY public.mv_sales_daily;
+  REFRESH MATERIALIZED VIEW CONCURRENTLY public.mv_product_sales_daily;
+  UPDATE public.report_refresh_state SET refreshed_at = now(), refreshed_version = coalesce(v_seen, 0);
+  RETURN now();
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.refresh_report_views(boolean) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.refresh_report_views(boolean) TO service_role;
+
+-- 5. Las escrituras solo marcan los reportes como pendientes (un UPDATE por sentencia)
+-- El incremento es incondicional: saltarlo cuando ya hay cambios pendientes
+-- perdería las escrituras que se confirman mientras corre un refresco.
+CREATE OR REPLACE FUNCTION public.mark_reports_dirty()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  UPDATE public.report_refresh_state SET write_version = write_version + 1;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS invoice_lines_mark_reports_dirty ON public.invoice_lines;
+CREATE TRIGGER invoice_lines_mark_reports_dirty
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.invoice_lines
+FOR EACH STATEMENT EXECUTE FUNCTION public.mark_reports_dirty();
+
+DROP TRIGGER IF EXISTS invoices_mark_reports_dirty ON public.invoices;
+CREATE TRIGGER invoices_mark_reports_dirty
+AFTER UPDATE OR DELETE ON public.invoices
+FOR EACH STATEMENT EXECUTE FUNCTION public.mark_reports_dirty();
+
+DROP TRIGGER IF EXISTS customers_mark_reports_dirty ON public.customers;
+CREATE TRIGGER customers_mark_reports_dirty
+AFTER UPDATE OR DELETE ON public.customers
+FOR EACH STATEMENT EXECUTE FUNCTION public.mark_reports_dirty();
+
+DROP TRIGGER IF EXISTS products_mark_reports_dirty ON public.products;
+CREATE TRIGGER products_mark_reports_dirty
+AFTER UPDATE OR DELETE ON public.products
+FOR EACH STATEMENT EXECUTE FUNCTION public.mark_reports_dirty();
+
+COMMIT;
+
+-- 6. Refresco programado con pg_cron (Database > Extensions > pg_cron en Supabase):
+-- cada minuto si hubo escrituras y una vez por noche de forma forzada.
+CREATE EXTENSION IF NOT EXISTS pg_cron;
+SELECT cron.schedule('refresh-report-views', '* * * * *',
+                     $$SELECT public.refresh_report_views(false)$$);
+SELECT cron.schedule('refresh-report-views-nightly', '0 3 * * *',
+                     $$SELECT public.refresh_report_views(true)$$);
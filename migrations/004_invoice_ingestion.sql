@@ -0,0 +1,98 @@
+-- Carga masiva de facturas (SupabaseClient.ingest_invoices / ingestion.py)
+--
+-- 1. `invoices.source_ref` identifica cada factura en el archivo de origen:
+--    con ON CONFLICT (source_ref) una carga repetida o reanudada no duplica
+--    encabezados.
+-- 2. `line_total` y `total_amount` los calcula la base de datos con triggers,
+--    así coinciden con lo que calcula el cliente sin importar quién escribe.
+--    Los triggers de totales son por sentencia (tablas de transición): un
+--    INSERT de 5.000 líneas recalcula cada factura afectada una sola vez.
+
+BEGIN;
+
+ALTER TABLE public.invoices ADD COLUMN IF NOT EXISTS source_ref text;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_constraint WHERE conname = 'invoices_source_ref_key'
+  ) THEN
+    ALTER TABLE public.invoices ADD CONSTRAINT invoices_source_ref_key UNIQUE (source_ref);
+  END IF;
+END;
+$$;
+
+-- Total de línea: cantidad x precio redondeado a 2 decimales
+CREATE OR REPLACE FUNCTION public.set_line_total()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.line_total := round(NEW.quantity * NEW.unit_price, 2);
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS invoice_lines_set_line_total ON public.invoice_lines;
+CREATE TRIGGER invoice_lines_set_line_total
+BEFORE INSERT OR UPDATE OF quantity, unit_price ON public.invoice_lines
+FOR EACH ROW EXECUTE FUNCTION public.set_line_total();
+
+-- Total de factura: suma de sus líneas, recalculado una vez por sentencia
+CREATE OR REPLACE FUNCTION public.recompute_invoice_totals(p_invoice_ids bigint[])
+RETURNS void
+LANGUAGE sql
+AS $$
+  UPDATE public.invoices i
+  SET total_amount = coalesce(t.total, 0)
+  FROM (
+    SELECT ids.id, sum(l.line_total) AS total
+    FROM unnest(p_invoice_ids) AS ids(id)
+    LEFT JOIN public.invoice_lines l ON l.invoice_id = ids.id
+    GROUP BY ids.id
+  ) t
+  WHERE i.id = t.id AND i.total_amount IS DISTINCT FROM coalesce(t.total, 0);
+$$;
+
+CREATE OR REPLACE FUNCTION public.refresh_invoice_totals()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    PERFORM public.recompute_invoice_totals(ARRAY(SELECT DISTINCT invoice_id FROM new_lines));
+  ELSIF TG_OP = 'DELETE' THEN
+    PERFORM public.recompute_invoice_totals(ARRAY(SELECT DISTINCT invoice_id FROM old_lines));
+  ELSE
+    -- Un UPDATE puede mover líneas entre facturas: recalcular ambas
+    PERFORM public.recompute_invoice_totals(ARRAY(
+      SELECT invoice_id FROM new_lines UNION SELECT invoice_id FROM old_lines));
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+-- Las tablas de transición exigen un trigger por evento
+DROP TRIGGER IF EXISTS invoice_lines_totals_insert ON public.invoice_lines;
+CREATE TRIGGER invoice_lines_totals_insert
+AFTER INSERT ON public.invoice_lines
+REFERENCING NEW TABLE AS new_lines
+FOR EACH STATEMENT EXECUTE FUNCTION public.refresh_invoice_totals();
+
+DROP TRIGGER IF EXISTS invoice_lines_totals_update ON public.invoice_lines;
+CREATE TRIGGER invoice_lines_totals_update
+AFTER UPDATE ON public.invoice_lines
+REFERENCING OLD TABLE AS old_lines NEW TABLE AS new_lines
+FOR EACH STATEMENT EXECUTE FUNCTION public.refresh_invoice_totals();
+
+DROP TRIGGER IF EXISTS invoice_lines_totals_delete ON public.invoice_lines;
+CREATE TRIGGER invoice_lines_totals_delete
+AFTER DELETE ON public.invoice_lines
+REFERENCING OLD TABLE AS old_lines
+FOR EACH STATEMENT EXECUTE FUNCTION public.refresh_invoice_totals();
+
+REVOKE ALL ON FUNCTION public.recompute_invoice_totals(bigint[]) FROM PUBLIC;
+
+COMMIT;
@@ -0,0 +1,26 @@
+-- Búsqueda de clientes por nombre (type-ahead): índice de trigramas para
+-- que `name ILIKE '%texto%'` use un Bitmap Index Scan en lugar de recorrer
+-- toda la tabla bajo RLS.
+--
+-- Verificación:
+--   EXPLAIN ANALYZE SELECT id, name FROM public.customers
+--   WHERE name ILIKE '%mar%' ORDER BY name LIMIT 51;
+-- Debe mostrar "Bitmap Index Scan on customers_name_trgm_idx". Los patrones
+-- de menos de 3 caracteres no tienen trigramas completos y siguen haciendo
+-- Seq Scan; por eso el cliente no consulta antes de TYPEAHEAD_MIN_CHARS.
+
+BEGIN;
+
+-- En Supabase las extensiones viven en el esquema `extensions`
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA extensions;
+
+CREATE INDEX IF NOT EXISTS customers_name_trgm_idx
+  ON public.customers USING gin (name extensions.gin_trgm_ops);
+
+-- El orden por nombre de las sugerencias se resuelve con este índice cuando
+-- el filtro es poco selectivo
+CREATE INDEX IF NOT EXISTS customers_name_idx ON public.customers (name);
+
+ANALYZE public.customers;
+
+COMMIT;
@@ -0,0 +1,87 @@
+-- Medición de costo de RLS antes/después de 002_rls_performance.sql
+--
+-- Ejecutar con psql sobre un proyecto de pruebas (inserta datos sintéticos):
+--   psql "$DATABASE_URL" -v user_id=<uuid de auth.users> -v lines=1000000 \
+--        -f migrations/bench/rls_explain.sql
+-- 1. Correr una vez con solo database_squema.sql aplicado (antes).
+-- 2. Aplicar migrations/002_rls_performance.sql.
+-- 3. Correr de nuevo con -v seed=off para reutilizar los datos (después).
+-- Comparar "Execution Time" de cada EXPLAIN.
+
+\set ON_ERROR_STOP on
+\if :{?lines}
+\else
+  \set lines 1000000
+\endif
+\if :{?seed}
+\else
+  \set seed on
+\endif
+
+\if :seed
+BEGIN;
+INSERT INTO public.countries (code, name)
+SELECT 'C' || g, 'Country ' || g FROM generate_series(1, 20) g
+ON CONFLICT (code) DO NOTHING;
+
+INSERT INTO public.categories (name)
+SELECT 'Bench category ' || g FROM generate_series(1, 40) g
+ON CONFLICT (name) DO NOTHING;
+
+INSERT INTO public.products (name, category_id, unit_price)
+SELECT 'Bench product ' || g, cats.ids[1 + g % array_length(cats.ids, 1)], (g % 500) + 10
+FROM generate_series(1, 5000) g,
+     (SELECT array_agg(id) AS ids FROM public.categories WHERE name LIKE 'Bench category %') cats;
+
+INSERT INTO public.customers (name, email, country_code)
+SELECT 'Bench customer ' || g, 'bench' || g || '@example.com', 'C' || (1 + g % 20)
+FROM generate_series(1, 50000) g;
+
+INSERT INTO public.invoices (customer_id, invoice_date)
+SELECT custs.ids[1 + g % array_length(custs.ids, 1)], current_date - (g % 365)
+FROM generate_series(1, (:lines / 5)::int) g,
+     (SELECT array_agg(id) AS ids FROM public.customers WHERE name LIKE 'Bench customer %') custs;
+
+INSERT INTO public.invoice_lines (invoice_id, product_id, quantity, unit_price, line_total)
+SELECT invs.ids[1 + g % array_length(invs.ids, 1)],
+       prods.ids[1 + (g * 7) % array_length(prods.ids, 1)],
+       1 + g % 5, 100, (1 + g % 5) * 100
+FROM generate_series(1, :lines) g,
+     (SELECT array_agg(i.id) AS ids FROM public.invoices i
+      JOIN public.customers c ON c.id = i.customer_id
+      WHERE c.name LIKE 'Bench customer %') invs,
+     (SELECT array_agg(id) AS ids FROM public.products WHERE name LIKE 'Bench product %') prods;
+
+-- El usuario de prueba ve 3 de 20 países y 5 de 40 categorías
+INSERT INTO public.user_allowed_country (user_id, country_code)
+SELECT :'user_id'::uuid, 'C' || g FROM generate_series(1, 3) g
+ON CONFLICT DO NOTHING;
+INSERT INTO public.user_allowed_category (user_id, category_id)
+SELECT :'user_id'::uuid, id FROM public.categories WHERE name LIKE 'Bench category %' ORDER BY id LIMIT 5
+ON CONFLICT DO NOTHING;
+COMMIT;
+\endif
+
+ANALYZE public.products, public.customers, public.invoices, public.invoice_lines,
+        public.user_allowed_country, public.user_allowed_category;
+
+-- Consultas que hace SupabaseClient, ejecutadas con el rol y JWT del usuario
+BEGIN;
+SET LOCAL ROLE authenticated;
+SELECT set_config('request.jwt.claims',
+                  json_build_object('sub', :'user_id', 'role', 'authenticated')::text, true);
+
+\echo '== invoice_lines: conteo visible (lines_by_country_and_category_select) =='
+EXPLAIN (ANALYZE, BUFFERS) SELECT count(*) FROM public.invoice_lines;
+
+\echo '== invoice_lines: líneas alto valor (get_high_value_invoice_lines) =='
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM public.invoice_lines WHERE line_total >= 400 LIMIT 1000;
+
+\echo '== invoices: facturas desde una fecha (get_invoices_this_month) =='
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM public.invoices WHERE invoice_date >= current_date - 30 ORDER BY invoice_date DESC LIMIT 1000;
+
+\echo '== customers / products =='
+EXPLAIN (ANALYZE, BUFFERS) SELECT count(*) FROM public.customers;
+EXPLAIN (ANALYZE, BUFFERS) SELECT count(*) FROM public.products;
+ROLLBACK;
@@ -0,0 +1,182 @@
+from datetime import date, datetime
+
+# Operadores de filtro de PostgREST que acepta Query.filter
+OPERATORS = {"eq", "neq", "gt", "gte", "lt", "lte", "like", "ilike", "in", "is", "fts", "plfts", "wfts"}
+
+# Caracteres con significado en listas de PostgREST: los valores que los
+# contienen van entre comillas dobles dentro de in.(...)
+RESERVED_CHARS = set(',.:()" \\')
+
+def render_select(projection):
+    """Proyección -> parámetro select de PostgREST
+
+    Una proyección es un texto ya armado ("id,name") o una secuencia de
+    columnas ("id", "alias:columna") y dicts {recurso_embebido: proyección}:
+
+        ("id", "quantity", {"products": ("name",), "invoices": ("invoice_date", {"customers": ("name",)})})
+        -> "id,quantity,products(name),invoices(invoice_date,customers(name))"
+    """
+    if projection is None:
+        return "*"
+    if isinstance(projection, str):
+        return projection
+    if isinstance(projection, dict):
+        projection = (projection,)
+    parts = []
+    for item in projection:
+        if isinstance(item, dict):
+            for name, children in item.items():
+                _check_name(name)
+                parts.append(f"{name}({render_select(children)})")
+        else:
+            _check_name(item)
+            parts.append(item)
+    if not parts:
+        raise ValueError("La proyección no tiene columnas")
+    return ",".join(parts)
+
+def format_value(value):
+    """Valor de Python -> texto de un filtro de PostgREST"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+def quote_item(value):
+    """Valor dentro de una lista in.(...), entre comillas si hace falta"""
+    text = format_value(value)
+    if text and not RESERVED_CHARS.intersection(text):
+        return text
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def like_pattern(text, nested=False):
+    """Patrón de like/ilike que busca `text` literal en cualquier parte del valor
+
+    Escapa la barra invertida y los comodines de LIKE (`%`, `_`). PostgREST
+    convierte todo `*` en `%` y no permite escaparlo: un `*` del texto se
+    envía como `_` (un carácter cualquiera) y quien llama descarta los
+    falsos positivos con `contains_literal`. En un filtro simple PostgREST
+    toma el valor completo, con comas y paréntesis; `nested=True` lo pone
+    entre comillas para usarlo dentro de or=(...) o and=(...).
+    """
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_").replace("*", "_")
+    pattern = f"*{escaped}*"
+    return quote_item(pattern) if nested else pattern
+
+def contains_literal(value, text):
+    """Indicar si `value` contiene `text` sin distinguir mayúsculas (lo que busca like_pattern)"""
+    return value is not None and text.casefold() in str(value).casefold()
+
+class Query:
+    """Constructor de consultas GET de PostgREST (proyección, filtros, orden y límite)
+
+    Cada método devuelve la misma consulta para encadenar:
+
+        Query("products").select("id", "name", {"categories": ("name",)}) \\
+            .gte("unit_price", 100).lte("unit_price", 1000).order("unit_price").params()
+
+    `params()` devuelve una lista de pares (un mismo filtro puede repetirse,
+    como gte y lte sobre la misma columna) que requests codifica en la URL.
+    """
+    def __init__(self, resource, projection=None):
+        self.resource = resource
+        self.projection = projection
+        self.filters = []
+        self.ordering = []
+        self.limit_value = None
+        self.offset_value = None
+
+    def select(self, *projection):
+        """Reemplazar la proyección (columnas y recursos embebidos)
+
+        Acepta las columnas como argumentos, una secuencia o un select ya armado.
+        """
+        if len(projection) == 1 and isinstance(projection[0], (str, list, tuple)):
+            projection = projection[0]
+        self.projection = projection or None
+        return self
+
+    def filter(self, column, operator, value, negate=False):
+        """Agregar un filtro `columna=[not.]operador.valor`"""
+        if operator not in OPERATORS:
+            raise ValueError(f"Operador no soportado: {operator}")
+        _check_name(column)
+        if operator == "in":
+            text = "(" + ",".join(quote_item(item) for item in value) + ")"
+        else:
+            text = format_value(value)
+        self.filters.append((column, f"{'not.' if negate else ''}{operator}.{text}"))
+        return self
+
+    def eq(self, column, value):
+        return self.filter(column, "eq", value)
+
+    def neq(self, column, value):
+        return self.filter(column, "neq", value)
+
+    def gt(self, column, value):
+        return self.filter(column, "gt", value)
+
+    def gte(self, column, value):
+        return self.filter(column, "gte", value)
+
+    def lt(self, column, value):
+        return self.filter(column, "lt", value)
+
+    def lte(self, column, value):
+        return self.filter(column, "lte", value)
+
+    def like(self, column, pattern):
+        return self.filter(column, "like", pattern)
+
+    def ilike(self, column, pattern):
+        """Filtro sin distinguir mayúsculas; `*` es el comodín (ej. '*mar*')"""
+        return self.filter(column, "ilike", pattern)
+
+    def in_(self, column, values):
+        return self.filter(column, "in", list(values))
+
+    def is_(self, column, value):
+        """Comparar con null, true o false"""
+        if value not in (None, True, False):
+            raise ValueError("is solo acepta None, True o False")
+        return self.filter(column, "is", value)
+
+    def order(self, column, desc=False, nulls=None):
+        """Agregar una columna de orden; `nulls` es 'first' o 'last'"""
+        _check_name(column)
+        text = f"{column}.{'desc' if desc else 'asc'}"
+        if nulls:
+            if nulls not in ("first", "last"):
+                raise ValueError("nulls debe ser 'first' o 'last'")
+            text += f".nulls{nulls}"
+        self.ordering.append(text)
+        return self
+
+    def limit(self, count):
+        self.limit_value = int(count)
+        return self
+
+    def offset(self, count):
+        self.offset_value = int(count)
+        return self
+
+    def params(self):
+        """Parámetros de la URL en el orden select, filtros, order, limit, offset"""
+        params = [("select", render_select(self.projection))]
+        params.extend(self.filters)
+        if self.ordering:
+            params.append(("order", ",".join(self.ordering)))
+        if self.limit_value is not None:
+            params.append(("limit", self.limit_value))
+        if self.offset_value is not None:
+            params.append(("offset", self.offset_value))
+        return params
+
+def _check_name(name):
+    """Rechazar nombres de columna que romperían la sintaxis del select"""
+    if not isinstance(name, str) or not name.strip() or any(char in name for char in ",()"):
+        raise ValueError(f"Nombre de columna inválido: {name!r}")
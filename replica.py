@@ -0,0 +1,277 @@
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+import config
+from supabase_client import SupabaseError
+
+# Tablas replicadas: columnas y columna de marca de agua (None = copia completa)
+TABLES = {
+    "countries": (("code", "name"), None),
+    "categories": (("id", "name"), "id"),
+    "products": (("id", "name", "category_id", "unit_price", "created_at"), "id"),
+    "customers": (("id", "name", "email", "country_code", "created_at"), "id"),
+    "invoices": (("id", "customer_id", "invoice_date", "total_amount", "created_at"), "id"),
+    "invoice_lines": (("id", "invoice_id", "product_id", "quantity", "unit_price", "line_total"), "id")
+}
+
+# Permisos del usuario: si cambian, la marca de agua ya no sirve y se copia todo
+GRANT_TABLES = (("user_allowed_country", "country_code"), ("user_allowed_category", "category_id"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS countries (code TEXT PRIMARY KEY, name TEXT);
+CREATE TABLE IF NOT EXISTS categories (id INTEGER PRIMARY KEY, name TEXT);
+CREATE TABLE IF NOT EXISTS products (id INTEGER PRIMARY KEY, name TEXT, category_id INTEGER,
+                                     unit_price REAL, created_at TEXT);
+CREATE TABLE IF NOT EXISTS customers (id INTEGER PRIMARY KEY, name TEXT, email TEXT,
+                                      country_code TEXT, created_at TEXT);
+CREATE TABLE IF NOT EXISTS invoices (id INTEGER PRIMARY KEY, customer_id INTEGER, invoice_date TEXT,
+                                     total_amount REAL, created_at TEXT);
+CREATE TABLE IF NOT EXISTS invoice_lines (id INTEGER PRIMARY KEY, invoice_id INTEGER, product_id INTEGER,
+                                          quantity REAL, unit_price REAL, line_total REAL);
+CREATE TABLE IF NOT EXISTS sync_state (table_name TEXT PRIMARY KEY, high_water INTEGER, synced_at REAL);
+CREATE TABLE IF NOT EXISTS replica_meta (name TEXT PRIMARY KEY, value TEXT);
+CREATE INDEX IF NOT EXISTS idx_products_price ON products (unit_price);
+CREATE INDEX IF NOT EXISTS idx_products_category ON products (category_id);
+CREATE INDEX IF NOT EXISTS idx_invoices_date ON invoices (invoice_date);
+CREATE INDEX IF NOT EXISTS idx_lines_invoice ON invoice_lines (invoice_id);
+CREATE INDEX IF NOT EXISTS idx_lines_product ON invoice_lines (product_id);
+"""
+
+class SyncAborted(Exception):
+    """La sincronización se detuvo o cambió el usuario del cliente: se descarta"""
+
+class LocalReplica:
+    """Réplica local (SQLite) de las tablas de ventas de un usuario autenticado
+
+    Cada usuario tiene su propio archivo y la réplica se llena con las
+    lecturas del propio usuario, así conserva el alcance de sus políticas RLS.
+    La sincronización es incremental: solo se piden filas con `id` mayor a la
+    marca de agua guardada por tabla. Como la marca de agua no ve filas
+    borradas ni filas antiguas que se vuelven visibles, la réplica se
+    reconstruye completa cuando cambian los permisos del usuario y, en segundo
+    plano, cada REPLICA_FULL_SYNC_EVERY ciclos.
+
+    Las lecturas usan una vista del cliente fijada a la sesión del usuario
+    (`for_user`): si el cliente cambia de usuario a mitad de una
+    sincronización, las páginas siguientes no viajan con el JWT del nuevo
+    usuario. Antes de cada tabla y de cada página se verifica que la réplica
+    siga activa y el usuario sea el mismo; si no, se descarta la tabla en curso.
+    """
+    def __init__(self, client, directory=None):
+        if not client.user_id:
+            raise ValueError("La réplica local requiere un usuario autenticado")
+        self.client = client
+        self.user_id = client.user_id
+        if client.auth is not None:
+            self.reader = client.for_user(client.auth.email)
+        else:
+            # Sin sesión en el pool (token asignado a mano): copia con el JWT actual
+            self.reader = copy.copy(client)
+            self.reader.replica = None
+        directory = directory or config.REPLICA_DIR
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"replica_{self.user_id}.sqlite")
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.create_function("casefold", 1, lambda value: value.casefold() if value else value)
+        # WAL: las consultas leen la última versión confirmada mientras se sincroniza
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.last_sync = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def is_ready(self):
+        """Indicar si ya hubo al menos una sincronización completa"""
+        with self.lock:
+            row = self.db.execute("SELECT COUNT(*) FROM sync_state").fetchone()
+        return row[0] == len(TABLES)
+
+    def sync(self, full=False):
+        """Traer las filas nuevas de cada tabla; full=True reconstruye la réplica
+
+        La copia completa descarta filas que el usuario ya no puede ver
+        (por ejemplo, tras revocar un permiso de país o categoría). Se hace
+        sola si los permisos del usuario cambiaron desde la última sincronización.
+        """
+        added = {}
+        # Conexión propia de escritura: cada tabla se confirma en una sola transacción
+        writer = sqlite3.connect(self.path, timeout=30)
+        try:
+            self._check_active()
+            grants = self._grants()
+            if grants is not None and grants != self._meta(writer, "grants"):
+                full = True
+            for table, (columns, key) in TABLES.items():
+                high_water = None if full or key is None else self._high_water(writer, table)
+                params = [("select", ",".join(columns))]
+                if high_water is not None:
+                    params.append((key, f"gt.{high_water}"))
+                self._check_active()
+                rows = self.reader.iter_rows(table, params, keyset=key, count=False)
+
+                count = 0
+                with writer:
+                    if high_water is None:
+                        writer.execute(f"DELETE FROM {table}")
+                    while True:
+                        # Un SyncAborted dentro del `with` revierte la tabla en curso
+                        self._check_active()
+                        page = rows.next_page()
+                        if not page:
+                            break
+                        count += self._insert(writer, table, columns,
+                                              [tuple(row.get(column) for column in columns) for row in page])
+                    new_mark = None
+                    if key is not None:
+                        new_mark = writer.execute(f"SELECT MAX({key}) FROM {table}").fetchone()[0]
+                    writer.execute(
+                        "INSERT OR REPLACE INTO sync_state (table_name, high_water, synced_at) VALUES (?, ?, ?)",
+                        (table, new_mark, time.time())
+                    )
+                added[table] = count
+            if grants is not None:
+                with writer:
+                    writer.execute("INSERT OR REPLACE INTO replica_meta (name, value) VALUES ('grants', ?)",
+                                   (grants,))
+        finally:
+            writer.close()
+        self.last_sync = time.time()
+        return added
+
+    def _grants(self):
+        """Huella de los países y categorías permitidos (None si no se pudieron leer)"""
+        grants = []
+        for table, column in GRANT_TABLES:
+            params = [("select", column), ("user_id", f"eq.{self.user_id}")]
+            try:
+                rows = list(self.reader.iter_rows(table, params, count=False))
+            except SupabaseError:
+                return None
+            grants.append(sorted(str(row.get(column)) for row in rows))
+        return json.dumps(grants)
+
+    def _check_active(self):
+        if self._stop.is_set():
+            raise SyncAborted("Réplica detenida")
+        if self.client.user_id != self.user_id:
+            raise SyncAborted("El cliente cambió de usuario")
+
+    def start_background_sync(self, interval=None, on_error=None):
+        """Sincronizar en un hilo cada `interval` segundos hasta llamar stop()
+
+        Cada REPLICA_FULL_SYNC_EVERY ciclos la sincronización es completa, así
+        se descartan filas borradas en el servidor que el delta no detecta.
+        """
+        interval = interval or config.REPLICA_SYNC_INTERVAL
+        every = config.REPLICA_FULL_SYNC_EVERY
+
+        def loop():
+            cycle = 0
+            while not self._stop.is_set():
+                cycle += 1
+                try:
+                    self.sync(full=bool(every) and cycle % every == 0)
+                except SyncAborted:
+                    break
+                except Exception as e:
+                    if on_error:
+                        on_error(e)
+                self._stop.wait(interval)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="replica-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Detener la sincronización en segundo plano y cerrar la base local
+
+        Espera a que el hilo termine: la sincronización en curso se corta
+        antes de la próxima página.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+        with self.lock:
+            self.db.close()
+
+    # Consultas respondidas localmente (mismo formato que SupabaseClient)
+    def get_sales_by_category(self):
+        """Ventas por categoría calculadas sobre la réplica"""
+        return self._query("""
+            SELECT c.id AS category_id, c.name AS category_name,
+                   COUNT(DISTINCT l.invoice_id) AS invoices,
+                   SUM(l.quantity) AS total_quantity,
+                   ROUND(SUM(l.line_total), 2) AS total_sales
+            FROM invoice_lines l
+            JOIN products p ON p.id = l.product_id
+            JOIN categories c ON c.id = p.category_id
+            GROUP BY c.id, c.name
+            ORDER BY total_sales DESC
+        """)
+
+    def get_top_products(self, limit=10, days=30):
+        """Productos más vendidos en los últimos `days` días"""
+        return self._query("""
+            SELECT p.id AS product_id, p.name AS product_name,
+                   SUM(l.quantity) AS total_quantity,
+                   ROUND(SUM(l.line_total), 2) AS total_sales
+            FROM invoice_lines l
+            JOIN invoices i ON i.id = l.invoice_id
+            JOIN products p ON p.id = l.product_id
+            WHERE i.invoice_date >= date('now', ?)
+            GROUP BY p.id, p.name
+            ORDER BY total_sales DESC
+            LIMIT ?
+        """, (f"-{int(days)} days", limit))
+
+    def get_products_by_price_range(self, min_price=100, max_price=1000):
+        """Productos por rango de precio con su categoría embebida"""
+        result = self._query("""
+            SELECT p.*, c.name AS category_name
+            FROM products p LEFT JOIN categories c ON c.id = p.category_id
+            WHERE p.unit_price BETWEEN ? AND ?
+            ORDER BY p.unit_price
+        """, (min_price, max_price))
+        for row in result["data"]:
+            row["categories"] = {"id": row["category_id"], "name": row.pop("category_name")}
+        return result
+
+    def search_customers(self, name_filter):
+        """Clientes cuyo nombre contiene el texto (sin distinguir mayúsculas)"""
+        return self._query(
+            "SELECT * FROM customers WHERE instr(casefold(name), ?) > 0 ORDER BY name",
+            (name_filter.casefold(),)
+        )
+
+    def _query(self, sql, params=()):
+        try:
+            with self.lock:
+                rows = [dict(row) for row in self.db.execute(sql, params)]
+        except sqlite3.Error as e:
+            return {"success": False, "error": str(e)}
+        return {"success": True, "data": rows, "source": "replica"}
+
+    @staticmethod
+    def _meta(db, name):
+        row = db.execute("SELECT value FROM replica_meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _high_water(db, table):
+        row = db.execute("SELECT high_water FROM sync_state WHERE table_name = ?", (table,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _insert(db, table, columns, batch):
+        if not batch:
+            return 0
+        placeholders = ", ".join("?" for _ in columns)
+        db.executemany(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", batch
+        )
+        return len(batch)
@@ -0,0 +1,278 @@
+import tkinter as tk
+from tkinter import ttk, scrolledtext
+import decoding
+
+def flatten_row(row, prefix=""):
+    """Aplanar recursos embebidos: {"countries": {"name": ...}} -> {"countries.name": ...}"""
+    flat = {}
+    for key, value in row.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_row(value, f"{name}."))
+        elif isinstance(value, list):
+            flat[name] = decoding.dumps(value)
+        else:
+            flat[name] = value
+    return flat
+
+def _sort_key(value):
+    """Clave de orden estable para columnas con tipos mezclados o nulos"""
+    if value is None:
+        return (2, "")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value)
+    return (1, str(value).lower())
+
+class GridModel:
+    """Filas de una tabla virtualizada con índices precalculados de orden y filtro
+
+    Las columnas se toman de la primera página. Los índices de orden por
+    columna se calculan una vez y se reutilizan hasta que llegan filas nuevas.
+    """
+    def __init__(self):
+        self.columns = []
+        self.rows = []
+        self.search_text = []
+        self.sort_indexes = {}
+        self.sort_column = None
+        self.sort_descending = False
+        self.filter_text = ""
+        self.view = []
+
+    def set_rows(self, rows):
+        """Reemplazar las filas (la primera página define las columnas)"""
+        self.columns = []
+        self.rows = []
+        self.search_text = []
+        self.sort_column = None
+        self.sort_descending = False
+        self.filter_text = ""
+        self.append(rows)
+
+    def append(self, rows):
+        """Agregar una página de filas y recalcular la vista"""
+        flat_rows = [flatten_row(row) for row in rows]
+        if not self.columns:
+            seen = {}
+            for row in flat_rows:
+                for column in row:
+                    seen.setdefault(column, None)
+            self.columns = list(seen)
+        for row in flat_rows:
+            values = tuple(row.get(column) for column in self.columns)
+            self.rows.append(values)
+            self.search_text.append("\x1f".join("" if v is None else str(v) for v in values).lower())
+        self.sort_indexes.clear()
+        self._rebuild_view()
+
+    def sort(self, column, descending=None):
+        """Ordenar por columna; sin `descending` alterna el sentido"""
+        if descending is None:
+            descending = not self.sort_descending if column == self.sort_column else False
+        self.sort_column = column
+        self.sort_descending = descending
+        self._rebuild_view()
+
+    def filter(self, text):
+        """Mostrar solo filas que contienen el texto en alguna columna"""
+        self.filter_text = text.strip().lower()
+        self._rebuild_view()
+
+    def window(self, start, count):
+        """Filas visibles desde la posición `start` de la vista"""
+        return [self.rows[i] for i in self.view[start:start + count]]
+
+    def _sort_index(self, column):
+        index = self.sort_indexes.get(column)
+        if index is None:
+            position = self.columns.index(column)
+            index = sorted(range(len(self.rows)), key=lambda i: _sort_key(self.rows[i][position]))
+            self.sort_indexes[column] = index
+        return index
+
+    def _rebuild_view(self):
+        if self.sort_column in self.columns:
+            order = self._sort_index(self.sort_column)
+            if self.sort_descending:
+                order = order[::-1]
+        else:
+            order = range(len(self.rows))
+        if self.filter_text:
+            needle = self.filter_text
+            self.view = [i for i in order if needle in self.search_text[i]]
+        else:
+            self.view = list(order)
+
+class ResultGrid(ttk.Frame):
+    """Tabla basada en Treeview que solo crea los ítems de las filas visibles"""
+    def __init__(self, parent, row_height=20, on_need_more=None):
+        super().__init__(parent)
+        self.model = GridModel()
+        self.row_height = row_height
+        self.on_need_more = on_need_more
+        self.has_more = False
+        self.loading = False
+        self.offset = 0
+        self.visible_rows = 20
+
+        filter_frame = ttk.Frame(self)
+        filter_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(filter_frame, text="Filtrar:").pack(side=tk.LEFT)
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add("write", lambda *args: self._apply_filter())
+        ttk.Entry(filter_frame, textvariable=self.filter_var, width=30).pack(side=tk.LEFT, padx=(5, 10))
+        self.count_label = ttk.Label(filter_frame, text="")
+        self.count_label.pack(side=tk.LEFT)
+
+        table_frame = ttk.Frame(self)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(table_frame, show="headings", selectmode="browse")
+        self.vscroll = ttk.Scrollbar(table_frame, orient="vertical", command=self._on_scrollbar)
+        self.hscroll = ttk.Scrollbar(table_frame, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=self.hscroll.set)
+        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.vscroll.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.hscroll.grid(row=1, column=0, sticky=(tk.W, tk.E))
+        table_frame.columnconfigure(0, weight=1)
+        table_frame.rowconfigure(0, weight=1)
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_by(-1 if e.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda e: self.scroll_by(-1, "units"))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_by(1, "units"))
+
+    def set_rows(self, rows, has_more=False):
+        """Mostrar una primera página de filas"""
+        self.model.set_rows(rows)
+        self.has_more = has_more
+        self.loading = False
+        self.offset = 0
+        self.filter_var.set("")
+        self.tree.configure(columns=self.model.columns)
+        for column in self.model.columns:
+            self.tree.heading(column, text=column, command=lambda c=column: self._sort(c))
+            self.tree.column(column, width=120, stretch=False)
+        self.render()
+
+    def append_rows(self, rows, has_more=False):
+        """Agregar una página cargada al hacer scroll"""
+        self.model.append(rows)
+        self.has_more = has_more
+        self.loading = False
+        self.render()
+
+    def scroll_by(self, amount, what="units"):
+        step = self.visible_rows if what == "pages" else 3
+        self.scroll_to(self.offset + int(amount) * step)
+
+    def scroll_to(self, offset):
+        limit = max(len(self.model.view) - self.visible_rows, 0)
+        self.offset = min(max(int(offset), 0), limit)
+        self.render()
+
+    def render(self):
+        """Redibujar solo las filas dentro de la ventana visible"""
+        self.tree.delete(*self.tree.get_children())
+        for values in self.model.window(self.offset, self.visible_rows):
+            self.tree.insert("", tk.END, values=["" if v is None else v for v in values])
+
+        total = len(self.model.view)
+        if total:
+            first = self.offset / total
+            last = min((self.offset + self.visible_rows) / total, 1.0)
+        else:
+            first, last = 0.0, 1.0
+        self.vscroll.set(first, last)
+        suffix = " (cargando más...)" if self.loading else (" (hay más)" if self.has_more else "")
+        self.count_label.config(text=f"{total} de {len(self.model.rows)} filas{suffix}")
+
+        # Pedir la siguiente página cuando el scroll se acerca al final
+        near_end = self.offset + 2 * self.visible_rows >= total
+        if near_end and self.has_more and not self.loading and self.on_need_more:
+            self.loading = True
+            self.on_need_more()
+
+    def _on_scrollbar(self, action, amount, what=None):
+        if action == "moveto":
+            self.scroll_to(float(amount) * len(self.model.view))
+        else:
+            self.scroll_by(amount, what)
+
+    def _on_resize(self, event):
+        visible = max((event.height - self.row_height) // self.row_height, 1)
+        if visible != self.visible_rows:
+            self.visible_rows = visible
+            self.scroll_to(self.offset)
+
+    def _sort(self, column):
+        self.model.sort(column)
+        arrow = " ▼" if self.model.sort_descending else " ▲"
+        for name in self.model.columns:
+            self.tree.heading(name, text=name + (arrow if name == column else ""))
+        self.scroll_to(0)
+
+    def _apply_filter(self):
+        self.model.filter(self.filter_var.get())
+        self.scroll_to(0)
+
+class ResultPane(ttk.Frame):
+    """Panel de resultados: tabla virtualizada para listas de filas y texto para el resto"""
+    def __init__(self, parent, on_need_more=None):
+        super().__init__(parent)
+        self.title_label = ttk.Label(self, text="", font=("TkDefaultFont", 10, "bold"))
+        self.title_label.pack(fill=tk.X, pady=(0, 5))
+        self.grid_view = ResultGrid(self, on_need_more=self._need_more)
+        self.text = scrolledtext.ScrolledText(self, height=10, wrap=tk.WORD)
+        self.fetch_more = None
+        self._showing = None
+        self._show(self.text)
+
+    def show_loading(self, title):
+        self.fetch_more = None
+        self.title_label.config(text=f"=== {title} ===")
+        self._set_text("⏳ Cargando...")
+
+    def show_result(self, result, title="Resultado", fetch_more=None, has_more=False):
+        """Mostrar un resultado del cliente ({"success", "data"/"error"})"""
+        self.title_label.config(text=f"=== {title} ===")
+        self.fetch_more = fetch_more
+        if not result["success"]:
+            message = f"Error: {result.get('error', 'Error desconocido')}"
+            if "status" in result:
+                message += f"\nCódigo de estado: {result['status']}"
+            self._set_text(message)
+            return
+
+        data = result.get("data")
+        if isinstance(data, list) and data and all(isinstance(row, dict) for row in data[:50]):
+            self._show(self.grid_view)
+            self.grid_view.set_rows(data, has_more=has_more)
+        elif "data" in result:
+            self._set_text(decoding.dumps(data, indent=True))
+        else:
+            self._set_text("Operación exitosa")
+
+    def append_rows(self, rows, has_more=False):
+        self.grid_view.append_rows(rows, has_more=has_more)
+
+    def clear(self):
+        self.fetch_more = None
+        self.title_label.config(text="")
+        self._set_text("")
+
+    def _need_more(self):
+        if self.fetch_more:
+            self.fetch_more()
+
+    def _set_text(self, message):
+        self._show(self.text)
+        self.text.delete(1.0, tk.END)
+        self.text.insert(tk.END, message)
+
+    def _show(self, widget):
+        if self._showing is widget:
+            return
+        if self._showing is not None:
+            self._showing.pack_forget()
+        widget.pack(fill=tk.BOTH, expand=True)
+        self._showing = widget
@@ -0,0 +1,94 @@
+import bisect
+import threading
+import time
+
+def fold(text):
+    """Normalizar texto para comparar sin distinguir mayúsculas"""
+    return " ".join(str(text or "").casefold().split())
+
+def trigrams(text):
+    """Trigramas de un texto ya normalizado"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class CustomerSearchIndex:
+    """Índice local de clientes ya descargados para búsqueda por nombre
+
+    Guarda las filas de cada búsqueda al servidor y recuerda qué textos
+    quedaron completos (el servidor devolvió menos filas que el límite).
+    Si el texto nuevo contiene uno de esos textos, sus coincidencias son un
+    subconjunto de las ya descargadas y se resuelven aquí: por trigramas
+    (3+ caracteres) y verificando la subcadena. Las coincidencias al inicio
+    de una palabra (índice de prefijos) van primero.
+    """
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self._reset()
+
+    def clear(self):
+        """Olvidar todo (por ejemplo, al cambiar de usuario: cada uno ve otros clientes)"""
+        with self.lock:
+            self._reset()
+
+    def _reset(self):
+        self.rows = {}
+        self.names = {}
+        self.trigrams = {}
+        self.words = []
+        self.covered = {}
+
+    def add(self, text, rows, complete):
+        """Registrar el resultado de una búsqueda al servidor"""
+        with self.lock:
+            for row in rows:
+                row_id = row.get("id")
+                if row_id is None:
+                    continue
+                name = fold(row.get("name"))
+                if row_id in self.rows and self.names[row_id] == name:
+                    self.rows[row_id] = row
+                    continue
+                self.rows[row_id] = row
+                self.names[row_id] = name
+                for gram in trigrams(name):
+                    self.trigrams.setdefault(gram, set()).add(row_id)
+                for word in name.split():
+                    bisect.insort(self.words, (word, row_id))
+            if complete:
+                self.covered[fold(text)] = time.monotonic()
+
+    def can_answer(self, text):
+        """Indicar si una búsqueda completa anterior contiene todas las coincidencias de `text`"""
+        text = fold(text)
+        now = time.monotonic()
+        with self.lock:
+            return any(known in text and now - at < self.ttl for known, at in self.covered.items())
+
+    def search(self, text, limit=None):
+        """Clientes descargados cuyo nombre contiene `text`, prefijos de palabra primero"""
+        text = fold(text)
+        with self.lock:
+            if len(text) >= 3:
+                grams = sorted(trigrams(text), key=lambda gram: len(self.trigrams.get(gram, ())))
+                candidates = set(self.trigrams.get(grams[0], ()))
+                for gram in grams[1:]:
+                    candidates &= self.trigrams.get(gram, set())
+                    if not candidates:
+                        break
+            else:
+                candidates = self.rows.keys()
+            matches = [row_id for row_id in candidates if text in self.names[row_id]]
+            prefixed = self._prefix_ids(text.split(" ")[0]) if text else set()
+            matches.sort(key=lambda row_id: (row_id not in prefixed, self.names[row_id]))
+            if limit is not None:
+                matches = matches[:limit]
+            return [self.rows[row_id] for row_id in matches]
+
+    def _prefix_ids(self, prefix):
+        """IDs con alguna palabra que empieza con `prefix` (búsqueda binaria)"""
+        ids = set()
+        index = bisect.bisect_left(self.words, (prefix,))
+        while index < len(self.words) and self.words[index][0].startswith(prefix):
+            ids.add(self.words[index][1])
+            index += 1
+        return ids
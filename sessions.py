@@ -0,0 +1,171 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import config
+
+class AuthSession:
+    """Tokens de un usuario autenticado (access + refresh) y su vencimiento"""
+    __slots__ = ("email", "user_id", "access_token", "refresh_token", "expires_at", "refreshes", "lock")
+
+    def __init__(self, email, token_response):
+        self.email = email
+        self.user_id = None
+        self.access_token = None
+        self.refresh_token = None
+        self.expires_at = None
+        self.refreshes = 0
+        self.lock = threading.Lock()
+        self.update(token_response)
+
+    def update(self, token_response):
+        """Tomar los tokens de una respuesta de /auth/v1/token"""
+        self.access_token = token_response.get("access_token")
+        self.refresh_token = token_response.get("refresh_token") or self.refresh_token
+        self.user_id = (token_response.get("user") or {}).get("id") or self.user_id
+        # expires_in es relativo: no depende de que los relojes estén sincronizados
+        if token_response.get("expires_in"):
+            self.expires_at = time.time() + float(token_response["expires_in"])
+        elif token_response.get("expires_at"):
+            self.expires_at = float(token_response["expires_at"])
+        else:
+            self.expires_at = None
+
+    def expires_in(self):
+        """Segundos hasta el vencimiento del access token (None si no se conoce)"""
+        return None if self.expires_at is None else self.expires_at - time.time()
+
+    def needs_refresh(self, margin):
+        remaining = self.expires_in()
+        return remaining is not None and remaining <= margin
+
+    def info(self):
+        remaining = self.expires_in()
+        return {"email": self.email, "user_id": self.user_id, "refreshes": self.refreshes,
+                "expires_in": None if remaining is None else round(remaining)}
+
+class SessionManager:
+    """Pool de sesiones autenticadas por email con refresco anticipado de tokens
+
+    Cada sesión se renueva con su refresh token antes de vencer: un hilo en
+    segundo plano revisa el pool cada SESSION_REFRESH_CHECK segundos y,
+    además, cada petición verifica la sesión activa antes de enviarse. Si el
+    refresh token ya no sirve y el usuario está en config.USERS, se vuelve a
+    autenticar con su contraseña.
+    """
+    def __init__(self, client, margin=None, check_interval=None):
+        self.client = client
+        self.margin = config.SESSION_REFRESH_MARGIN if margin is None else margin
+        self.check_interval = check_interval or config.SESSION_REFRESH_CHECK
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def login(self, email, password):
+        """Autenticar con contraseña y guardar la sesión en el pool"""
+        data = self._token_request("password", {"email": email, "password": password})
+        if not data["success"]:
+            return data
+        with self.lock:
+            session = self.sessions.get(email)
+            if session is None:
+                session = self.sessions[email] = AuthSession(email, data["data"])
+            else:
+                with session.lock:
+                    session.update(data["data"])
+        self._start_refresher()
+        return {"success": True, "data": session}
+
+    def login_all(self, users=None, max_workers=None):
+        """Autenticar en paralelo a todos los usuarios (por defecto config.USERS)"""
+        entries = list((users or config.USERS).values())
+        workers = max_workers or max(len(entries), 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda user: self.login(user["email"], user["password"]), entries))
+        failed = {user["email"]: result.get("error") for user, result in zip(entries, results)
+                  if not result["success"]}
+        return {"success": not failed, "data": {"sessions": len(entries) - len(failed), "failed": failed}}
+
+    def get(self, email):
+        with self.lock:
+            return self.sessions.get(email)
+
+    def remove(self, email):
+        with self.lock:
+            self.sessions.pop(email, None)
+
+    def clear(self):
+        with self.lock:
+            self.sessions.clear()
+
+    def access_token(self, session):
+        """Access token vigente de la sesión, renovándolo si está por vencer"""
+        if session.needs_refresh(self.margin):
+            self.refresh(session)
+        return session.access_token
+
+    def refresh(self, session, force=False):
+        """Renovar los tokens de una sesión (un solo refresco aunque lo pidan varios hilos)"""
+        with session.lock:
+            # Otro hilo pudo renovarla mientras se esperaba el lock
+            if not force and not session.needs_refresh(self.margin):
+                return {"success": True}
+            result = {"success": False, "error": "Sin refresh token"}
+            if session.refresh_token:
+                result = self._token_request("refresh_token", {"refresh_token": session.refresh_token})
+            if not result["success"]:
+                password = next((user["password"] for user in config.USERS.values()
+                                 if user["email"] == session.email), None)
+                if password is None:
+                    return result
+                result = self._token_request("password", {"email": session.email, "password": password})
+                if not result["success"]:
+                    return result
+            session.update(result["data"])
+            session.refreshes += 1
+            return {"success": True}
+
+    def refresh_due(self):
+        """Renovar todas las sesiones del pool que vencen dentro del margen"""
+        with self.lock:
+            due = [session for session in self.sessions.values() if session.needs_refresh(self.margin)]
+        for session in due:
+            self.refresh(session)
+        return len(due)
+
+    def stats(self):
+        with self.lock:
+            return [session.info() for session in self.sessions.values()]
+
+    def close(self):
+        self._stop.set()
+
+    def _start_refresher(self):
+        if not config.SESSION_AUTO_REFRESH:
+            return
+        with self.lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="session-refresh", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.refresh_due()
+            except Exception:
+                # Un fallo de red no debe detener el hilo: se reintenta en la próxima vuelta
+                pass
+
+    def _token_request(self, grant_type, payload):
+        url = f"{self.client.base_url}/auth/v1/token"
+        headers = {"apikey": self.client.api_key, "Content-Type": "application/json"}
+        try:
+            response = self.client._request("POST", url, headers=headers, json=payload,
+                                            params={"grant_type": grant_type})
+        except Exception as e:
+            return {"success": False, "error": f"Error de conexión: {str(e)}"}
+        if response.status_code != 200:
+            return {"success": False, "error": response.text, "status": response.status_code}
+        return {"success": True, "data": response.json()}
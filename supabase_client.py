@@ -1,43 +1,435 @@
 import requests
+import csv
 import json
+import contextlib
+import copy
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 import config
+import decoding
+from cache import ResponseCache
+from columnar import ColumnarResult
+from instrumentation import Instrumentation, MemorySink, JsonLinesSink
+from query import Query, contains_literal, format_value, like_pattern, render_select
+from coalesce import SingleFlight, MicroBatcher
+from search import CustomerSearchIndex
+from sessions import SessionManager
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+class SupabaseError(Exception):
+    """Error devuelto por la API de Supabase"""
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+# Proyección por defecto de cada consulta: solo las columnas que muestra la GUI.
+# Cada método acepta `columns=` (proyección de query.render_select) para cambiarla.
+DEFAULT_COLUMNS = {
+    "countries": ("code", "name"),
+    "categories": ("id", "name"),
+    "v_sales_fact": ("line_id", "invoice_id", "invoice_date", "customer_name", "country_code",
+                     "product_name", "category_name", "quantity", "unit_price", "line_total"),
+    "v_sales_by_category": ("category_id", "category_name", "invoices", "total_quantity", "total_sales"),
+    "v_sales_by_country": ("country_code", "line_count", "total_quantity", "total_sales"),
+    "v_top_products_30d": ("product_id", "product_name", "category_name", "total_quantity", "total_sales"),
+    "user_allowed_country": ("country_code", {"countries": ("name",)}),
+    "user_allowed_category": ("category_id", {"categories": ("name",)}),
+    "products": ("id", "name", "unit_price", {"categories": ("name",)}),
+    "invoices": ("id", "invoice_date", "total_amount", {"customers": ("name", "country_code")}),
+    "customers": ("id", "name", "email", "country_code"),
+    "invoice_lines": ("id", "invoice_id", "quantity", "unit_price", "line_total",
+                      {"products": ("name",), "invoices": ("invoice_date", {"customers": ("name",)})})
+}
+
+class PagedRows:
+    """Iterador de filas de PostgREST paginado por Range o por keyset
+    
+    Solo mantiene en memoria la página actual (salvo `keep_pages=True`,
+    que guarda cada página con sus validadores para la caché). El total
+    reportado por el servidor (Prefer: count=exact|estimated) queda en
+    `total` después de pedir la primera página. Con keyset, `after` (dict
+    con los valores de las columnas keyset) continúa después de esa fila.
+    Con `stream=True` cada página se decodifica fila por fila mientras llega
+    del socket y `keep_raw=True` conserva el JSON original de cada fila
+    (decoding.RawRow).
+    """
+    def __init__(self, client, resource, params=None, page_size=None, keyset=None,
+                 count=None, use_service_role=False, cached_pages=None, keep_pages=False, after=None,
+                 stream=False, keep_raw=False):
+        self.client = client
+        self.resource = resource
+        self.params = list(params.items()) if isinstance(params, dict) else list(params or [])
+        self.page_size = page_size or config.PAGE_SIZE
+        self.keyset = (keyset,) if isinstance(keyset, str) else keyset
+        self.count = count if count is not None else config.PAGE_COUNT_MODE
+        self.use_service_role = use_service_role
+        self.total = None
+        self.pages = 0
+        self.rows = 0
+        self.bytes = 0
+        self.bytes_saved = 0
+        self.not_modified = 0
+        # Validadores y filas de cada página de una lectura anterior
+        self.cached_pages = cached_pages or []
+        self.page_meta = []
+        self.keep_pages = keep_pages or bool(cached_pages)
+        self.after = after
+        self.stream = stream
+        self.keep_raw = keep_raw
+        self.delivered = 0
+        self._iterator = None
+        
+    def __iter__(self):
+        return self._generate()
+    
+    def next_page(self):
+        """Devolver las siguientes `page_size` filas (lista vacía al terminar)"""
+        if self._iterator is None:
+            self._iterator = iter(self)
+        rows = list(itertools.islice(self._iterator, self.page_size))
+        self.delivered += len(rows)
+        return rows
+    
+    @property
+    def has_more(self):
+        """Indicar si quedan filas por pedir después de la última página entregada"""
+        if self._iterator is None:
+            return True
+        if self.total is not None:
+            return self.delivered < self.total
+        return self.delivered > 0 and self.delivered % self.page_size == 0
+    
+    def _generate(self):
+        url = f"{self.client.base_url}/rest/v1/{self.resource}"
+        offset = 0
+        last_row = self.after if self.keyset else None
+        while True:
+            headers = self.client.get_headers(use_service_role=self.use_service_role)
+            params = list(self.params)
+            if self.count and self.pages == 0:
+                headers["Prefer"] = f"count={self.count}"
+            if self.keyset:
+                params.append(("order", ",".join(f"{column}.asc" for column in self.keyset)))
+                params.append(("limit", self.page_size))
+                if last_row is not None:
+                    params.append(self._keyset_filter(last_row))
+            else:
+                headers["Range-Unit"] = "items"
+                headers["Range"] = f"{offset}-{offset + self.page_size - 1}"
+            cached = self.cached_pages[self.pages] if self.pages < len(self.cached_pages) else None
+            if cached:
+                SupabaseClient._add_conditional_headers(headers, cached)
+                
+            with self.client._stream_scope(self.stream, self.resource, params):
+                response = self.client._request("GET", url, headers=headers, params=params, stream=self.stream)
+                if response.status_code in (304, 416) and self.stream:
+                    # Sin cuerpo que leer: liberar la conexión
+                    response.close()
+                if response.status_code == 416:
+                    # Rango fuera del total: no hay más filas
+                    break
+                if response.status_code == 304 and cached:
+                    # La página no cambió: usar las filas ya decodificadas
+                    page = cached["rows"]
+                    size = cached["size"]
+                    self.bytes_saved += size
+                    self.not_modified += 1
+                    if self.pages == 0:
+                        self.total = cached.get("total")
+                elif response.status_code in (200, 206):
+                    if self.pages == 0:
+                        self.total = self._parse_total(response.headers.get("Content-Range"))
+                    if self.stream:
+                        page, size = self.client._decode_stream(response, self.keep_raw)
+                    else:
+                        page = self.client._decode(response)
+                        size = len(response.content)
+                else:
+                    raise SupabaseError(response.text, response.status_code)
+            
+            meta = SupabaseClient._validators(response) or {}
+            if response.status_code == 304:
+                meta = {"etag": cached.get("etag"), "last_modified": cached.get("last_modified")}
+            meta.update({"rows": page, "size": size, "total": self.total})
+            if self.keep_pages:
+                self.page_meta.append(meta)
+            self.pages += 1
+            self.bytes += size
+            if not page:
+                break
+            for row in page:
+                yield row
+            self.rows += len(page)
+            offset += len(page)
+            last_row = page[-1]
+            
+            # Si PostgREST recorta por max-rows la página llega más corta que
+            # page_size; el total permite seguir pidiendo sin perder filas
+            if self.total is not None:
+                if offset >= self.total:
+                    break
+            elif len(page) < self.page_size:
+                break
+    
+    def _keyset_filter(self, last_row):
+        """Filtro para continuar después de la última fila (keyset simple o compuesto)"""
+        if len(self.keyset) == 1:
+            column = self.keyset[0]
+            return (column, f"gt.{last_row[column]}")
+        first, second = self.keyset
+        return ("or", f"({first}.gt.{last_row[first]},"
+                      f"and({first}.eq.{last_row[first]},{second}.gt.{last_row[second]}))")
+    
+    @staticmethod
+    def _parse_total(content_range):
+        """Extraer el total de un header Content-Range (ej. 0-999/12345)"""
+        if not content_range or "/" not in content_range:
+            return None
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total.isdigit() else None
 
 class SupabaseClient:
-    def __init__(self):
-        self.update_credentials()
+    def __init__(self, pool_size=None):
+        self._load_credentials()
         self.jwt_token = None
         self.user_id = None
+        self.auth = None
+        self.pool_size = pool_size or config.HTTP_POOL_SIZE
+        self.timeout = (config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT)
+        self.request_count = 0
+        self.session = self._create_session()
+        self.cache = ResponseCache(config.CACHE_MAX_BYTES, config.CACHE_DEFAULT_TTL, config.CACHE_TTLS)
+        self.replica = None
+        self.inflight = SingleFlight()
+        self.customer_index = CustomerSearchIndex(self.cache.ttl_for("customers"))
+        self.sessions = SessionManager(self)
+        self.batcher = MicroBatcher(self._fetch_batch, config.BATCH_WINDOW_MS / 1000, config.BATCH_MAX_VALUES)
+        self.instrumentation = Instrumentation([MemorySink(config.TRACE_MEMORY_SPANS)])
+        if config.TRACE_JSONL_PATH:
+            self.instrumentation.add_sink(JsonLinesSink(config.TRACE_JSONL_PATH))
         
     def update_credentials(self):
-        """Actualizar credenciales desde config"""
+        """Actualizar credenciales desde config
+        
+        Las sesiones del pool y la caché son del proyecto anterior: se
+        descartan para no enviar sus tokens (ni renovarlos) contra el nuevo.
+        """
+        self.logout()
+        self.sessions.clear()
+        self.cache.invalidate()
+        self._load_credentials()
+        
+    def _load_credentials(self):
         self.base_url = config.SUPABASE_URL
         self.api_key = config.SUPABASE_KEY
         self.service_key = config.SERVICE_ROLE_KEY
         
-    def login(self, email, password):
-        """Autenticar usuario y obtener JWT token"""
-        url = f"{self.base_url}/auth/v1/token"
-        headers = {
-            "apikey": self.api_key,
-            "Content-Type": "application/json"
-        }
-        data = {
-            "email": email,
-            "password": password
-        }
-        params = {"grant_type": "password"}
+    def _create_session(self):
+        """Crear sesión HTTP con pool de conexiones keep-alive y reintentos para GET"""
+        session = requests.Session()
+        retry = Retry(
+            total=config.HTTP_MAX_RETRIES,
+            backoff_factor=config.HTTP_BACKOFF_FACTOR,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    
+    def _request(self, method, url, **kwargs):
+        """Ejecutar request sobre la sesión compartida con timeouts por defecto
+        
+        Los datos de la respuesta se suman al span activo; una petición hecha
+        fuera de un span (por ejemplo, una página pedida por scroll) abre el suyo.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        self.request_count += 1
+        # En streaming el cuerpo lo lee _decode_stream, que suma los bytes al span
+        body = not kwargs.get("stream", False)
+        span = self.instrumentation.current()
+        if span is None:
+            endpoint = url[len(self.base_url):] if url.startswith(self.base_url) else url
+            with self.instrumentation.span(f"{method} {endpoint}", endpoint, kwargs.get("params")) as span:
+                response = self.session.request(method, url, **kwargs)
+                span.record_response(response, body)
+                return response
+        response = self.session.request(method, url, **kwargs)
+        span.record_response(response, body)
+        return response
+    
+    def _decode(self, response):
+        """Decodificar un cuerpo JSON registrando el tiempo y las filas en el span activo
         
+        Usa el backend de decoding.py (orjson si está instalado) sobre los
+        bytes, sin la detección de codificación de response.json().
+        """
+        started = time.perf_counter()
+        data = decoding.loads(response.content)
+        span = self.instrumentation.current()
+        if span is not None:
+            span.decode += time.perf_counter() - started
+            if isinstance(data, list):
+                span.add_rows(len(data))
+        return data
+    
+    def _stream_scope(self, stream, resource, params):
+        """Span para una página en streaming pedida fuera de una llamada con span propio
+        
+        El cuerpo se lee después de _request, así que el span debe cubrir también la lectura.
+        """
+        if not stream or self.instrumentation.current() is not None:
+            return contextlib.nullcontext()
+        endpoint = f"/rest/v1/{resource}"
+        return self.instrumentation.span(f"GET {endpoint}", endpoint, params)
+    
+    def _decode_stream(self, response, keep_raw=False):
+        """Decodificar un arreglo JSON fila por fila mientras se recibe (petición con stream=True)
+        
+        Devuelve (filas, bytes recibidos).
+        """
+        stream = decoding.ArrayStream(response.iter_content(config.JSON_STREAM_CHUNK), keep_raw)
         try:
-            response = requests.post(url, headers=headers, json=data, params=params)
-            if response.status_code == 200:
-                result = response.json()
-                self.jwt_token = result.get("access_token")
-                self.user_id = result.get("user", {}).get("id")
-                return {"success": True, "message": "Login exitoso"}
-            else:
-                return {"success": False, "message": f"Error de login: {response.text}"}
-        except Exception as e:
-            return {"success": False, "message": f"Error de conexión: {str(e)}"}
+            rows = list(stream)
+        finally:
+            response.close()
+        span = self.instrumentation.current()
+        if span is not None:
+            span.decode += stream.decode_seconds
+            span.bytes += stream.bytes
+            span.add_rows(len(rows))
+        return rows, stream.bytes
+    
+    def get_trace_stats(self, slowest=20):
+        """Llamadas recientes más lentas y resumen de latencia por endpoint"""
+        memory = self.instrumentation.memory
+        if memory is None:
+            return {"slowest": [], "endpoints": []}
+        return {"slowest": memory.slowest(slowest), "endpoints": memory.summary()}
+    
+    def get_connection_stats(self):
+        """Obtener contadores de uso del pool (conexiones abiertas vs reutilizadas)"""
+        opened = 0
+        pool_requests = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+                    pool_requests += pool.num_requests
+        return {
+            "requests": self.request_count,
+            "pool_requests": pool_requests,
+            "connections_opened": opened,
+            "connections_reused": max(pool_requests - opened, 0),
+            "coalesced": self.inflight.stats()["shared"],
+            "batched_lookups": self.batcher.stats()
+        }
+    
+    def close(self):
+        """Cerrar las conexiones del pool"""
+        self.sessions.close()
+        self.session.close()
+    
+    def login(self, email, password):
+        """Autenticar usuario y obtener JWT token
+        
+        La sesión (access y refresh token) queda en el pool de `sessions` y
+        se renueva sola antes de vencer.
+        """
+        result = self.sessions.login(email, password)
+        if not result["success"]:
+            if "status" in result:
+                return {"success": False, "message": f"Error de login: {result['error']}"}
+            return {"success": False, "message": result["error"]}
+        self.cache.invalidate()
+        self._activate(result["data"])
+        return {"success": True, "message": "Login exitoso"}
+    
+    def login_all(self, users=None):
+        """Autenticar de una vez a todos los usuarios de config.USERS (en paralelo)"""
+        return self.sessions.login_all(users)
+    
+    def switch_user(self, email):
+        """Pasar a otra sesión del pool sin volver a autenticar
+        
+        La caché separa los resultados por usuario, así que no se descarta.
+        """
+        session = self.sessions.get(email)
+        if session is None:
+            return {"success": False, "message": f"No hay sesión para {email}"}
+        self._activate(session)
+        return {"success": True, "message": f"Sesión activa: {email}"}
+    
+    def for_user(self, email):
+        """Cliente de solo lectura con la sesión de otro usuario del pool
+        
+        Comparte el pool HTTP, la caché y la instrumentación con este
+        cliente; sirve para comparar lo que ve cada usuario lado a lado.
+        """
+        session = self.sessions.get(email)
+        if session is None:
+            return None
+        view = copy.copy(self)
+        # Cada vista cuenta solo sus propias peticiones (no las heredadas del cliente)
+        view.request_count = 0
+        view.replica = None
+        view.customer_index = CustomerSearchIndex(self.cache.ttl_for("customers"))
+        view.batcher = MicroBatcher(view._fetch_batch, config.BATCH_WINDOW_MS / 1000, config.BATCH_MAX_VALUES)
+        view._activate(session)
+        return view
+    
+    def _pinned(self, user_id, identity):
+        """Copia del cliente que pide con una sesión (AuthSession) o JWT fijos
+        
+        A diferencia de for_user no necesita que la sesión siga en el pool.
+        """
+        view = copy.copy(self)
+        view.request_count = 0
+        view.replica = None
+        view.user_id = user_id
+        if isinstance(identity, str) or identity is None:
+            view.auth = None
+            view.jwt_token = identity
+        else:
+            view.auth = identity
+            view.jwt_token = identity.access_token
+        return view
+    
+    def _activate(self, session):
+        self.auth = session
+        self.jwt_token = session.access_token
+        self.user_id = session.user_id
+        self.customer_index.clear()
+        self.replica = None
+    
+    def logout(self):
+        """Cerrar sesión y descartar la caché del usuario"""
+        if self.auth is not None:
+            self.sessions.remove(self.auth.email)
+        self.auth = None
+        self.jwt_token = None
+        self.user_id = None
+        self.cache.invalidate()
+        self.customer_index.clear()
+        self.replica = None
+    
+    def attach_replica(self, replica):
+        """Responder reportes y búsquedas desde una réplica local (ver replica.py)"""
+        self.replica = replica
+    
+    def _local(self):
+        """Réplica utilizable: sincronizada y del mismo usuario autenticado"""
+        replica = self.replica
+        if replica is not None and replica.user_id == self.user_id and replica.is_ready():
+            return replica
+        return None
     
     def get_headers(self, use_service_role=False):
         """Obtener headers para requests"""
@@ -46,6 +438,9 @@ class SupabaseClient:
             "Content-Type": "application/json"
         }
         
+        if not use_service_role and self.auth is not None:
+            # Renovar el token antes de que venza en lugar de esperar un 401
+            self.jwt_token = self.sessions.access_token(self.auth)
         if not use_service_role and self.jwt_token:
             headers["Authorization"] = f"Bearer {self.jwt_token}"
         elif use_service_role:
@@ -53,104 +448,359 @@ class SupabaseClient:
             
         return headers
     
-    def get_sales_fact(self):
-        """Obtener datos de Sales Fact View"""
-        url = f"{self.base_url}/rest/v1/v_sales_fact"
-        params = {"select": "*"}
-        response = requests.get(url, headers=self.get_headers(), params=params)
-        return self._handle_response(response)
+    def iter_rows(self, resource, params=None, page_size=None, keyset=None, count=None,
+                  use_service_role=False, cached_pages=None, keep_pages=False, after=None,
+                  stream=False, keep_raw=False):
+        """Iterar filas de una tabla o vista página por página"""
+        return PagedRows(self, resource, params, page_size=page_size, keyset=keyset,
+                         count=count, use_service_role=use_service_role, cached_pages=cached_pages,
+                         keep_pages=keep_pages, after=after, stream=stream, keep_raw=keep_raw)
+    
+    def _cache_key(self, url, params, use_service_role=False, mode="page"):
+        """Clave de caché que separa resultados por usuario, rol (RLS) y modo de lectura"""
+        if use_service_role:
+            role = "service_role"
+        else:
+            role = "authenticated" if self.jwt_token else "anon"
+        return ResponseCache.make_key(self.user_id, url, params, role, mode)
+    
+    def get_cache_stats(self):
+        """Obtener contadores de la caché de respuestas"""
+        return self.cache.stats()
+    
+    @staticmethod
+    def _validators(response):
+        """Extraer ETag/Last-Modified de una respuesta (None si no hay)"""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return None
+        return {"etag": etag, "last_modified": last_modified}
+    
+    @staticmethod
+    def _add_conditional_headers(headers, validators):
+        """Agregar If-None-Match/If-Modified-Since a partir de los validadores guardados"""
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    
+    def _get(self, resource, params=None, use_service_role=False, path="rest/v1"):
+        """GET de una sola página con caché de respuestas y revalidación condicional"""
+        with self.instrumentation.span(f"GET {resource}", resource, params) as span:
+            url = f"{self.base_url}/{path}/{resource}"
+            ttl = self.cache.ttl_for(resource)
+            key = self._cache_key(url, params, use_service_role)
+            entry = None
+            span.cache = "bypass"
+            if ttl > 0:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    span.cache = "hit"
+                    return self._close_span(span, cached)
+                entry = self.cache.get_stale(key)
+                span.cache = "miss"
+            
+            def load():
+                headers = self.get_headers(use_service_role)
+                # Solo los validadores de una respuesta (dict) sirven para un GET condicional
+                if entry is not None and isinstance(entry.validators, dict):
+                    self._add_conditional_headers(headers, entry.validators)
+                response = self._request("GET", url, headers=headers, params=params)
+                result = self._handle_response(response, entry)
+                if response.status_code == 304 and entry is not None:
+                    self.cache.revalidate(key, entry, ttl)
+                    span.cache = "revalidated"
+                elif result["success"] and ttl > 0:
+                    self.cache.put(key, result, len(response.content), ttl, self._validators(response))
+                return result
+            
+            return self._close_span(span, self._coalesce(span, ("page", key), load))
+    
+    def _coalesce(self, span, key, load):
+        """Ejecutar load() una sola vez para llamadas idénticas en curso (single-flight)"""
+        if not config.COALESCE_REQUESTS:
+            return load()
+        result, shared = self.inflight.do(key, load)
+        if shared:
+            span.cache = "shared"
+        return result
+    
+    @staticmethod
+    def _close_span(span, result):
+        """Completar filas y error del span a partir del resultado"""
+        data = result.get("data")
+        if span.rows is None and hasattr(data, "__len__") and not isinstance(data, dict):
+            span.rows = len(data)
+        if not result["success"]:
+            span.error = str(result.get("error"))[:500]
+        return result
+    
+    def _fetch_all(self, resource, params=None, **kwargs):
+        """Leer todas las páginas de un recurso sin el recorte silencioso de max-rows"""
+        with self.instrumentation.span(f"GET {resource} (todas las páginas)", resource, params) as span:
+            url = f"{self.base_url}/rest/v1/{resource}"
+            ttl = self.cache.ttl_for(resource)
+            key = self._cache_key(url, params, kwargs.get("use_service_role", False), mode="all")
+            entry = None
+            span.cache = "bypass"
+            if ttl > 0:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    span.cache = "hit"
+                    return self._close_span(span, cached)
+                entry = self.cache.get_stale(key)
+                span.cache = "miss"
+            
+            def load():
+                # Revalidar cada página con sus propios validadores
+                cached_pages = entry.validators if entry is not None and isinstance(entry.validators, list) else None
+                rows = self.iter_rows(resource, params, cached_pages=cached_pages, keep_pages=True, **kwargs)
+                try:
+                    data = list(rows)
+                except SupabaseError as e:
+                    return {"success": False, "error": str(e), "status": e.status}
+                except Exception as e:
+                    return {"success": False, "error": str(e)}
+                
+                if cached_pages and rows.not_modified == rows.pages == len(cached_pages):
+                    self.cache.revalidate(key, entry, ttl)
+                    span.cache = "revalidated"
+                    return entry.result
+                result = {"success": True, "data": data, "total": rows.total}
+                if ttl > 0:
+                    if rows.bytes_saved:
+                        self.cache.record_saved(rows.bytes_saved)
+                    has_validators = any(p.get("etag") or p.get("last_modified") for p in rows.page_meta)
+                    self.cache.put(key, result, rows.bytes, ttl, rows.page_meta if has_validators else None)
+                return result
+            
+            return self._close_span(span, self._coalesce(span, ("all", key), load))
+    
+    def _fetch_columnar(self, paged):
+        """Consumir un iterador paginado directamente a un ColumnarResult"""
+        with self.instrumentation.span(f"GET {paged.resource} (columnar)", paged.resource, paged.params) as span:
+            try:
+                store = ColumnarResult.from_rows(paged)
+            except SupabaseError as e:
+                return self._close_span(span, {"success": False, "error": str(e), "status": e.status})
+            except Exception as e:
+                return self._close_span(span, {"success": False, "error": str(e)})
+            span.rows = len(store)
+            return {"success": True, "data": store, "total": paged.total}
+    
+    def query(self, resource, columns=None):
+        """Nueva consulta sobre `resource` con su proyección por defecto"""
+        return Query(resource, columns or DEFAULT_COLUMNS.get(resource))
+    
+    def fetch(self, query, all_pages=False, paged=False, keyset=None, use_service_role=False):
+        """Ejecutar una Query: una página (con caché), todas las páginas o un iterador"""
+        params = query.params()
+        if paged:
+            return self.iter_rows(query.resource, params, keyset=keyset, use_service_role=use_service_role)
+        if all_pages:
+            return self._fetch_all(query.resource, params, keyset=keyset, use_service_role=use_service_role)
+        return self._get(query.resource, params, use_service_role=use_service_role)
     
-    def get_sales_by_category(self):
+    def lookup(self, resource, column, value, columns=None):
+        """Filas de `resource` con `column` = `value`, juntando búsquedas concurrentes
+        
+        Las búsquedas sobre el mismo recurso, columna y proyección que llegan
+        dentro de BATCH_WINDOW_MS se resuelven con un solo GET `column=in.(...)`
+        y cada llamada recibe solo sus filas.
+        """
+        select = render_select(columns or DEFAULT_COLUMNS.get(resource))
+        if select != "*" and column not in select.split(","):
+            select = f"{column},{select}"
+        # La sesión (o el JWT) es parte de la clave: el lote se ejecuta con la
+        # identidad de quien lo pidió aunque el cliente cambie de usuario antes
+        identity = self.auth if self.auth is not None else self.jwt_token
+        key = (self.user_id, identity, resource, column, select)
+        if config.BATCH_WINDOW_MS <= 0:
+            return self._fetch_batch(key, [value])[value]
+        return self.batcher.submit(key, value)
+    
+    def _fetch_batch(self, key, values):
+        """Resolver un lote de búsquedas de lookup() con un filtro in.(...)"""
+        user_id, identity, resource, column, select = key
+        reader = self._pinned(user_id, identity)
+        try:
+            result = reader.fetch(Query(resource, select).in_(column, values), all_pages=True)
+        finally:
+            self.request_count += reader.request_count
+        if not result["success"]:
+            return {value: result for value in values}
+        groups = {}
+        for row in result["data"]:
+            groups.setdefault(format_value(row.get(column)), []).append(row)
+        return {value: {"success": True, "data": groups.get(format_value(value), [])} for value in values}
+    
+    def get_countries(self, columns=None):
+        """Obtener catálogo de países"""
+        return self.fetch(self.query("countries", columns))
+    
+    def get_categories(self, columns=None):
+        """Obtener catálogo de categorías"""
+        return self.fetch(self.query("categories", columns))
+    
+    def get_sales_fact(self, paged=False, columnar=False, columns=None):
+        """Obtener datos de Sales Fact View
+        
+        paged=True devuelve un iterador de páginas; columnar=True devuelve los
+        datos como ColumnarResult para agregarlos del lado del cliente.
+        """
+        params = self.query("v_sales_fact", columns).params()
+        if paged:
+            return self.iter_rows("v_sales_fact", params)
+        if columnar:
+            return self._fetch_columnar(self.iter_rows("v_sales_fact", params))
+        return self._fetch_all("v_sales_fact", params)
+    
+    def get_sales_by_category(self, columns=None):
         """Obtener ventas por categoría"""
-        url = f"{self.base_url}/rest/v1/v_sales_by_category"
-        params = {"select": "*"}
-        response = requests.get(url, headers=self.get_headers(), params=params)
-        return self._handle_response(response)
+        local = self._local()
+        if local:
+            return local.get_sales_by_category()
+        return self.fetch(self.query("v_sales_by_category", columns))
     
-    def get_sales_by_country(self, country_code="CR"):
+    def get_sales_by_country(self, country_code="CR", columns=None):
         """Obtener ventas por país"""
-        url = f"{self.base_url}/rest/v1/v_sales_by_country"
-        params = {
-            "select": "*",
-            "country_code": f"eq.{country_code}"
-        }
-        response = requests.get(url, headers=self.get_headers(), params=params)
-        return self._handle_response(response)
+        return self.fetch(self.query("v_sales_by_country", columns).eq("country_code", country_code))
     
-    def get_top_products(self, limit=10):
+    def get_top_products(self, limit=10, columns=None):
         """Obtener top productos (30 días)"""
-        url = f"{self.base_url}/rest/v1/v_top_products_30d"
-        params = {
-            "select": "*",
-            "limit": limit
+        local = self._local()
+        if local:
+            return local.get_top_products(limit)
+        return self.fetch(self.query("v_top_products_30d", columns).limit(limit))
+    
+    def get_reports_refreshed_at(self):
+        """Obtener cuándo se refrescaron por última vez las vistas materializadas
+        
+        Devuelve el refresco más antiguo, su antigüedad en segundos y si hay
+        escrituras pendientes de incluir (`dirty`).
+        """
+        result = self._get("report_refresh_state", {"select": "view_name,refreshed_at,dirty"})
+        if not result["success"]:
+            return result
+        rows = result["data"]
+        if not rows:
+            return {"success": False, "error": "Sin información de refresco"}
+        refreshed_at = min(datetime.fromisoformat(row["refreshed_at"]) for row in rows)
+        age = (datetime.now(timezone.utc) - refreshed_at).total_seconds()
+        return {
+            "success": True,
+            "data": {
+                "refreshed_at": refreshed_at.isoformat(),
+                "age_seconds": max(age, 0),
+                "dirty": any(row.get("dirty") for row in rows)
+            }
         }
-        response = requests.get(url, headers=self.get_headers(), params=params)
-        return self._handle_response(response)
     
-    def get_my_allowed_countries(self):
+    def get_my_allowed_countries(self, columns=None):
         """Obtener países permitidos para el usuario actual"""
-        url = f"{self.base_url}/rest/v1/user_allowed_country"
-        params = {
-            "select": "*,countries(*)",
-            "user_id": f"eq.{self.user_id}"
-        }
-        response = requests.get(url, headers=self.get_headers(), params=params)
-        return self._handle_response(response)
+        return self.fetch(self.query("user_allowed_country", columns).eq("user_id", self.user_id))
     
-    def get_my_allowed_categories(self):
+    def get_my_allowed_categories(self, columns=None):
         """Obtener categorías permitidas para el usuario actual"""
-        url = f"{self.base_url}/rest/v1/user_allowed_category"
-        params = {
-            "select": "*,categories(*)",
-            "user_id": f"eq.{self.user_id}"
-        }
-        response = requests.get(url, headers=self.get_headers(), params=params)
-        return self._handle_response(response)
+        return self.fetch(self.query("user_allowed_category", columns).eq("user_id", self.user_id))
     
-    def get_products_by_price_range(self, min_price=100, max_price=1000):
+    def get_products_by_price_range(self, min_price=100, max_price=1000, columns=None):
         """Obtener productos por rango de precio"""
-        url = f"{self.base_url}/rest/v1/products"
-        url += f"?select=*,categories(*)&unit_price=gte.{min_price}&unit_price=lte.{max_price}"
-        response = requests.get(url, headers=self.get_headers())
-        return self._handle_response(response)
+        local = self._local()
+        if local:
+            return local.get_products_by_price_range(min_price, max_price)
+        query = self.query("products", columns).gte("unit_price", min_price).lte("unit_price", max_price)
+        return self.fetch(query)
     
-    def get_invoices_this_month(self, start_date="2024-12-01"):
-        """Obtener facturas del mes actual"""
-        url = f"{self.base_url}/rest/v1/invoices"
-        params = {
-            "select": "*,customers(*)",
-            "invoice_date": f"gte.{start_date}",
-            "order": "invoice_date.desc"
-        }
-        response = requests.get(url, headers=self.get_headers(), params=params)
-        return self._handle_response(response)
+    def get_invoices_this_month(self, start_date="2024-12-01", paged=False, columns=None):
+        """Obtener facturas del mes actual (paged=True devuelve un iterador de páginas)"""
+        query = self.query("invoices", columns).gte("invoice_date", start_date) \
+            .order("invoice_date", desc=True).order("id", desc=True)
+        return self.fetch(query, all_pages=True, paged=paged)
     
-    def search_customers(self, name_filter):
+    def search_customers(self, name_filter, columns=None):
         """Buscar clientes por nombre"""
-        url = f"{self.base_url}/rest/v1/customers"
-        params = {
-            "select": "*",
-            "name": f"ilike.*{name_filter}*"
-        }
-        response = requests.get(url, headers=self.get_headers(), params=params)
-        return self._handle_response(response)
+        local = self._local()
+        if local:
+            return local.search_customers(name_filter)
+        result = self.fetch(self.query("customers", columns).ilike("name", like_pattern(name_filter)))
+        return _literal_matches(result, name_filter)
     
-    def get_high_value_invoice_lines(self, min_total=1000):
-        """Obtener líneas de factura con total alto"""
-        url = f"{self.base_url}/rest/v1/invoice_lines"
-        params = {
-            "select": "*,products(*),invoices(customers(*))",
-            "line_total": f"gte.{min_total}"
-        }
-        response = requests.get(url, headers=self.get_headers(), params=params)
-        return self._handle_response(response)
+    def suggest_customers(self, text, limit=None):
+        """Sugerencias de clientes para búsqueda mientras se escribe
+        
+        Si una búsqueda anterior ya trajo todas las coincidencias de un texto
+        contenido en `text` (por ejemplo "mar" antes de "mari"), se responde
+        con el índice local sin ir al servidor (`source` = "index"). Si no,
+        se piden `limit` + 1 filas ordenadas por nombre; la fila extra indica
+        si el resultado quedó completo. Usa el índice de trigramas de
+        migrations/005_customer_search.sql.
+        """
+        limit = limit or config.TYPEAHEAD_LIMIT
+        text = " ".join(text.split())
+        local = self._local()
+        if local:
+            result = local.search_customers(text)
+            if result["success"]:
+                result["data"] = result["data"][:limit]
+            return result
+        if self.customer_index.can_answer(text):
+            return {"success": True, "data": self.customer_index.search(text, limit), "source": "index"}
+        
+        query = self.query("customers").ilike("name", like_pattern(text)) \
+            .order("name").order("id").limit(limit + 1)
+        result = self.fetch(query)
+        if not result["success"]:
+            return result
+        complete = len(result["data"]) <= limit
+        rows = _literal_matches(result, text)["data"]
+        self.customer_index.add(text, rows, complete=complete)
+        return {"success": True, "data": rows[:limit], "source": "server"}
+    
+    def get_high_value_invoice_lines(self, min_total=1000, paged=False, columns=None):
+        """Obtener líneas de factura con total alto (paged=True devuelve un iterador de páginas)
+        
+        La paginación es por keyset sobre `id`, así que la proyección debe incluirlo.
+        """
+        query = self.query("invoice_lines", columns).gte("line_total", min_total)
+        return self.fetch(query, all_pages=True, paged=paged, keyset="id")
+    
+    # Agregaciones del lado del servidor (ver migrations/001_report_rpcs.sql)
+    def _rpc(self, function, payload):
+        """Llamar una función SQL expuesta por PostgREST en /rest/v1/rpc"""
+        url = f"{self.base_url}/rest/v1/rpc/{function}"
+        data = {key: value for key, value in payload.items() if value is not None}
+        with self.instrumentation.span(f"RPC {function}", f"rpc/{function}", data) as span:
+            def load():
+                response = self._request("POST", url, headers=self.get_headers(), json=data)
+                return self._handle_response(response)
+            
+            # Las funciones de reporte solo leen: llamadas idénticas se comparten
+            key = ("rpc", self._cache_key(url, data))
+            return self._close_span(span, self._coalesce(span, key, load))
+    
+    def get_sales_summary(self, group_by="category", date_from=None, date_to=None,
+                          countries=None, categories=None, limit=None):
+        """Obtener ventas agregadas en el servidor por categoría, país, producto, cliente, día o mes"""
+        return self._rpc("sales_summary", {
+            "p_group_by": group_by,
+            "p_date_from": date_from,
+            "p_date_to": date_to,
+            "p_countries": list(countries) if countries else None,
+            "p_categories": list(categories) if categories else None,
+            "p_limit": limit
+        })
+    
+    def get_top_products_range(self, limit=10, date_from=None, date_to=None,
+                               countries=None, categories=None):
+        """Obtener top N productos para cualquier rango de fechas, países o categorías"""
+        return self.get_sales_summary("product", date_from, date_to, countries, categories, limit)
     
     # Funciones administrativas
     def admin_get_all_users(self):
         """ADMIN - Obtener todos los usuarios"""
-        url = f"{self.base_url}/auth/v1/admin/users"
-        response = requests.get(url, headers=self.get_headers(use_service_role=True))
-        return self._handle_response(response)
+        return self._get("admin/users", use_service_role=True, path="auth/v1")
     
     def admin_create_user(self, email, password):
         """ADMIN - Crear nuevo usuario"""
@@ -160,7 +810,8 @@ class SupabaseClient:
             "password": password,
             "email_confirm": True
         }
-        response = requests.post(url, headers=self.get_headers(use_service_role=True), json=data)
+        response = self._request("POST", url, headers=self.get_headers(use_service_role=True), json=data)
+        self.cache.invalidate()
         return self._handle_response(response)
     
     def admin_assign_country_permission(self, user_id, country_code):
@@ -170,7 +821,8 @@ class SupabaseClient:
             "user_id": user_id,
             "country_code": country_code
         }
-        response = requests.post(url, headers=self.get_headers(use_service_role=True), json=data)
+        response = self._request("POST", url, headers=self.get_headers(use_service_role=True), json=data)
+        self.cache.invalidate()
         return self._handle_response(response)
     
     def admin_assign_category_permission(self, user_id, category_id):
@@ -180,15 +832,202 @@ class SupabaseClient:
             "user_id": user_id,
             "category_id": category_id
         }
-        response = requests.post(url, headers=self.get_headers(use_service_role=True), json=data)
+        response = self._request("POST", url, headers=self.get_headers(use_service_role=True), json=data)
+        self.cache.invalidate()
         return self._handle_response(response)
     
-    def _handle_response(self, response):
+    def ingest_invoices(self, source, fmt=None, checkpoint=None, chunk_size=None):
+        """ADMIN - Cargar facturas y sus líneas desde CSV o NDJSON (ver ingestion.py)
+        
+        Las facturas inválidas se reportan sin detener la carga y el progreso
+        queda en un checkpoint para poder reanudarla.
+        """
+        from ingestion import InvoiceIngestor
+        return InvoiceIngestor(self, chunk_size=chunk_size).run(source, fmt=fmt, checkpoint=checkpoint)
+    
+    def export(self, source, path, fmt=None, compression=None, columns=None, filters=None,
+               resume=False, progress=None):
+        """Exportar v_sales_fact, invoices o invoice_lines a CSV, NDJSON o Parquet (ver export.py)"""
+        from export import Exporter
+        return Exporter(self).export(source, path, fmt, compression, columns, filters, resume, progress)
+    
+    # Operaciones masivas de administración
+    def admin_bulk_create_users(self, users, max_workers=None):
+        """ADMIN - Crear muchos usuarios en paralelo
+        
+        `users` es un iterable de dicts con `email` y `password` o de tuplas
+        (email, password). Como máximo `max_workers` creaciones van en curso a
+        la vez; una fila con error se reporta sin detener el resto.
+        """
+        rows = [user if isinstance(user, dict) else {"email": user[0], "password": user[1]}
+                for user in users]
+        workers = min(max_workers or config.BULK_MAX_WORKERS, self.pool_size)
+        
+        def create(row):
+            if not row.get("email") or not row.get("password"):
+                return {"success": False, "error": "Fila sin email o password"}
+            try:
+                return self.admin_create_user(row["email"], row["password"])
+            except requests.RequestException as e:
+                return {"success": False, "error": str(e)}
+        
+        created = []
+        failed = []
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="supabase-bulk") as executor:
+            for index, (row, result) in enumerate(zip(rows, executor.map(create, rows)), start=1):
+                if result["success"]:
+                    created.append({"row": index, "email": row["email"], "id": result["data"]["id"]})
+                else:
+                    failed.append(self._row_failure(index, {"email": row.get("email")}, result))
+        return {"success": True, "data": {"created": created, "failed": failed}}
+    
+    def admin_bulk_assign_country_permissions(self, grants, chunk_size=None):
+        """ADMIN - Asignar permisos de país en lote
+        
+        `grants` es un iterable de dicts con `user_id` y `country_code` o de
+        tuplas (user_id, country_code).
+        """
+        return self._bulk_insert("user_allowed_country", ("user_id", "country_code"), grants, chunk_size)
+    
+    def admin_bulk_assign_category_permissions(self, grants, chunk_size=None):
+        """ADMIN - Asignar permisos de categoría en lote (user_id, category_id)"""
+        return self._bulk_insert("user_allowed_category", ("user_id", "category_id"), grants, chunk_size)
+    
+    def admin_import_users_csv(self, source, chunk_size=None, max_workers=None):
+        """ADMIN - Crear usuarios y asignar permisos desde un CSV
+        
+        Columnas: `email`, `password`, `user_id`, `countries` y `categories`
+        (las dos últimas separadas por `;`). Las filas con `user_id` no crean
+        usuario, solo reciben los permisos. `source` es una ruta o un archivo
+        abierto.
+        """
+        if isinstance(source, str):
+            with open(source, newline="", encoding="utf-8-sig") as handle:
+                rows = list(csv.DictReader(handle))
+        else:
+            rows = list(csv.DictReader(source))
+        
+        to_create = [row for row in rows if not (row.get("user_id") or "").strip()]
+        users = self.admin_bulk_create_users(to_create, max_workers=max_workers)["data"]
+        for item in users["created"]:
+            to_create[item["row"] - 1]["user_id"] = item["id"]
+        
+        country_grants = []
+        category_grants = []
+        for row in rows:
+            user_id = (row.get("user_id") or "").strip()
+            if not user_id:
+                continue
+            for code in _split_list(row.get("countries")):
+                country_grants.append((user_id, code.upper()))
+            for category in _split_list(row.get("categories")):
+                category_grants.append((user_id, category))
+        
+        countries = self.admin_bulk_assign_country_permissions(country_grants, chunk_size)["data"]
+        categories = self.admin_bulk_assign_category_permissions(category_grants, chunk_size)["data"]
+        return {
+            "success": True,
+            "data": {
+                "users_created": len(users["created"]),
+                "country_grants": countries["inserted"],
+                "category_grants": categories["inserted"],
+                "failed": {
+                    "users": users["failed"],
+                    "countries": countries["failed"],
+                    "categories": categories["failed"]
+                }
+            }
+        }
+    
+    def _bulk_insert(self, resource, columns, rows, chunk_size=None):
+        """Upsert de filas en lotes con un INSERT de arreglo por lote
+        
+        Usa `Prefer: resolution=merge-duplicates`, así repetir una importación
+        no falla por filas ya existentes. Si un lote falla se reintenta fila por
+        fila para aislar las filas con error sin descartar las demás.
+        """
+        url = f"{self.base_url}/rest/v1/{resource}"
+        headers = self.get_headers(use_service_role=True)
+        headers["Prefer"] = "resolution=merge-duplicates,return=minimal"
+        params = {"on_conflict": ",".join(columns)}
+        chunk_size = chunk_size or config.BULK_CHUNK_SIZE
+        
+        inserted = 0
+        failed = []
+        seen = set()
+        chunk = []
+        
+        def flush():
+            nonlocal inserted
+            if not chunk:
+                return
+            result = self._post_rows(url, headers, params, [row for _, row in chunk])
+            if result["success"]:
+                inserted += len(chunk)
+            elif len(chunk) == 1:
+                failed.append(self._row_failure(*chunk[0], result))
+            else:
+                for index, row in chunk:
+                    single = self._post_rows(url, headers, params, [row])
+                    if single["success"]:
+                        inserted += 1
+                    else:
+                        failed.append(self._row_failure(index, row, single))
+            chunk.clear()
+        
+        for index, row in enumerate(rows, start=1):
+            row = dict(row) if isinstance(row, dict) else dict(zip(columns, row))
+            key = tuple(str(row.get(column, "")).strip() for column in columns)
+            if not all(key):
+                failed.append(self._row_failure(index, row, {"error": "Faltan columnas requeridas"}))
+                continue
+            # Un mismo INSERT no puede afectar dos veces la misma fila con merge-duplicates
+            if key in seen:
+                continue
+            seen.add(key)
+            chunk.append((index, row))
+            if len(chunk) >= chunk_size:
+                flush()
+        flush()
+        
+        self.cache.invalidate()
+        return {"success": True, "data": {"inserted": inserted, "failed": failed}}
+    
+    def _post_rows(self, url, headers, params, rows):
+        try:
+            response = self._request("POST", url, headers=headers, params=params, json=rows)
+        except requests.RequestException as e:
+            return {"success": False, "error": str(e)}
+        return self._handle_response(response)
+    
+    @staticmethod
+    def _row_failure(index, row, result):
+        failure = {"row": index, "data": row, "error": result.get("error", "Error desconocido")}
+        if "status" in result:
+            failure["status"] = result["status"]
+        return failure
+    
+    def _handle_response(self, response, cached=None):
         """Manejar respuesta de la API"""
         try:
-            if response.status_code == 200:
-                return {"success": True, "data": response.json()}
+            if response.status_code == 304 and cached is not None:
+                # 304 Not Modified: servir el cuerpo ya decodificado de la caché
+                return cached.result
+            if response.status_code in (200, 201, 204):
+                # Las inserciones responden 201, sin cuerpo si se pidió return=minimal
+                return {"success": True, "data": self._decode(response) if response.content else None}
             else:
                 return {"success": False, "error": response.text, "status": response.status_code}
         except Exception as e:
-            return {"success": False, "error": str(e)}
\ No newline at end of file
+            return {"success": False, "error": str(e)}
+
+def _literal_matches(result, text, column="name"):
+    """Quitar las filas que solo coinciden porque un `*` se envió como `_` (ver like_pattern)"""
+    if "*" not in text or not result["success"]:
+        return result
+    rows = [row for row in result["data"] if row.get(column) is None or contains_literal(row[column], text)]
+    return dict(result, data=rows)
+
+def _split_list(value):
+    """Separar una celda de CSV con valores separados por `;`"""
+    return [item.strip() for item in (value or "").split(";") if item.strip()]
@@ -4,6 +4,19 @@ Script de prueba para verificar que la aplicación GUI funciona correctamente
 import sys
 import os
 
+def start_test_server(handler_class):
+    """Levantar un servidor HTTP local en un puerto libre; devuelve (server, base_url)"""
+    import threading
+    from http.server import ThreadingHTTPServer
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def stop_test_server(server):
+    server.shutdown()
+    server.server_close()
+
 def test_imports():
     """Probar que todas las importaciones funcionan"""
     try:
@@ -72,6 +85,1229 @@ def test_client_creation():
         print(f"❌ Error creando cliente: {e}")
         return False
 
+def test_connection_pool_reuse():
+    """Probar que el pool reutiliza conexiones keep-alive"""
+    from http.server import BaseHTTPRequestHandler
+    from supabase_client import SupabaseClient
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_GET(self):
+            body = b"[]"
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            
+        def log_message(self, *args):
+            pass
+    
+    server, base_url = start_test_server(Handler)
+    try:
+        client = SupabaseClient(pool_size=2)
+        client.base_url = base_url
+        for country in ("CR", "US", "MX"):
+            assert client.get_sales_by_country(country)["success"]
+        stats = client.get_connection_stats()
+        assert stats["requests"] == 3
+        assert stats["connections_opened"] == 1
+        assert stats["connections_reused"] == 2
+        client.close()
+        print("✓ Pool de conexiones reutilizado correctamente")
+    finally:
+        stop_test_server(server)
+    
+    return True
+
+def test_paged_rows_max_rows_cap():
+    """Probar que la paginación no pierde filas cuando PostgREST recorta por max-rows"""
+    import json
+    from http.server import BaseHTTPRequestHandler
+    import config
+    from benchmarks.datasets import Dataset
+    from benchmarks.mock_server import MockSupabase
+    from supabase_client import SupabaseClient
+    
+    rows = [{"id": i} for i in range(1, 2501)]
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_GET(self):
+            # Simular max-rows = 1000 con respuesta según header Range
+            start, end = (int(x) for x in self.headers["Range"].split("-"))
+            end = min(end, start + 999, len(rows) - 1)
+            body = json.dumps(rows[start:end + 1]).encode()
+            self.send_response(206)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Range", f"{start}-{end}/{len(rows)}")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            
+        def log_message(self, *args):
+            pass
+    
+    server, base_url = start_test_server(Handler)
+    try:
+        client = SupabaseClient()
+        client.base_url = base_url
+        paged = client.iter_rows("v_sales_fact", {"select": "*"}, page_size=1500)
+        ids = [row["id"] for row in paged]
+        assert ids == list(range(1, 2501))
+        assert paged.total == 2500 and paged.pages == 3
+        print("✓ Paginación completa a pesar del recorte de max-rows")
+    finally:
+        stop_test_server(server)
+    
+    with MockSupabase(Dataset(30000), max_rows=1000) as mock:
+        client = SupabaseClient()
+        client.base_url = mock.base_url
+        user = next(iter(config.USERS.values()))
+        assert client.login(user["email"], user["password"])["success"]
+        query = client.query("v_sales_fact")
+        page = client.fetch(query)
+        everything = client.fetch(query, all_pages=True)
+        expected = [row for row in mock.dataset.fact if mock.is_visible(user["email"], row[5], row[8])]
+        assert len(page["data"]) == 1000
+        assert len(everything["data"]) == everything["total"] == len(expected)
+        client.close()
+    print("✓ Una página en caché no responde a la lectura de todas las páginas")
+    
+    return True
+
+def test_background_runner_supersedes():
+    """Probar que una consulta nueva en el mismo panel reemplaza a la anterior"""
+    import threading
+    from background import BackgroundRunner
+    
+    class FakeRoot:
+        """Sustituto de Tk: guarda los callbacks de after() para ejecutarlos a mano"""
+        def __init__(self):
+            self.pending = []
+            
+        def after(self, ms, callback):
+            self.pending.append(callback)
+    
+    root = FakeRoot()
+    busy = []
+    runner = BackgroundRunner(root, max_workers=1, on_busy_change=busy.append)
+    release = threading.Event()
+    delivered = []
+    
+    slow = runner.submit("reports", lambda: release.wait(5) and "viejo", delivered.append)
+    runner.submit("reports", lambda: "nuevo", delivered.append)
+    runner.submit("auth", lambda: 1 / 0, delivered.append)
+    release.set()
+    slow.result(timeout=5)
+    runner.executor.shutdown(wait=True)
+    
+    while root.pending:
+        root.pending.pop(0)()
+    
+    assert delivered[0] == "nuevo"
+    assert delivered[1]["success"] is False
+    assert len(delivered) == 2
+    assert runner.superseded == 1
+    assert busy[-1] == 0 and max(busy) == 3
+    print("✓ Consultas en segundo plano reemplazadas y entregadas correctamente")
+    return True
+
+def test_async_client_fan_out():
+    """Probar que el cliente asyncio ejecuta las consultas en paralelo"""
+    import asyncio
+    import time
+    from http.server import BaseHTTPRequestHandler
+    from async_client import AsyncSupabaseClient
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_GET(self):
+            time.sleep(0.3)
+            body = b'[{"ok": true}]'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            
+        def log_message(self, *args):
+            pass
+    
+    server, base_url = start_test_server(Handler)
+    
+    async def refresh(client):
+        return await client.gather(
+            categories=client.get_sales_by_category(),
+            country=client.get_sales_by_country("CR"),
+            top=client.get_top_products(5),
+            countries=client.get_my_allowed_countries(),
+            limit=4
+        )
+    
+    try:
+        client = AsyncSupabaseClient(max_concurrency=4)
+        client.client.base_url = base_url
+        start = time.perf_counter()
+        results = asyncio.run(refresh(client))
+        elapsed = time.perf_counter() - start
+        
+        async def mixed(client):
+            return await client.gather(client.get_sales_by_category(), top=client.get_top_products(5))
+        
+        try:
+            asyncio.run(mixed(client))
+            assert False, "mezclar consultas por posición y por nombre debe fallar"
+        except TypeError:
+            pass
+        client.close()
+        assert set(results) == {"categories", "country", "top", "countries"}
+        assert all(r["success"] for r in results.values())
+        assert elapsed < 0.9, f"Las consultas se ejecutaron en serie ({elapsed:.2f}s)"
+        print(f"✓ Cuatro consultas concurrentes en {elapsed:.2f}s")
+    finally:
+        stop_test_server(server)
+    
+    return True
+
+def test_response_cache():
+    """Probar TTL, desalojo LRU por bytes y separación por usuario de la caché"""
+    from cache import ResponseCache
+    from supabase_client import SupabaseClient
+    
+    cache = ResponseCache(max_bytes=100, default_ttl=60, ttls={"admin/users": 0})
+    key_a = ResponseCache.make_key("user-a", "/rest/v1/countries", {"select": "*"}, "authenticated")
+    key_b = ResponseCache.make_key("user-b", "/rest/v1/countries", {"select": "*"}, "authenticated")
+    cache.put(key_a, {"success": True, "data": ["CR"]}, 60, 60)
+    assert cache.get(key_a)["data"] == ["CR"]
+    assert cache.get(key_b) is None
+    cache.put(key_b, {"success": True, "data": ["US"]}, 60, 60)
+    assert cache.get(key_a) is None
+    assert cache.stats()["evictions"] == 1
+    assert cache.ttl_for("admin/users") == 0
+    print("✓ Caché con LRU por bytes y claves por usuario")
+    
+    client = SupabaseClient()
+    client.user_id = "user-a"
+    key = client._cache_key("/rest/v1/countries", {"select": "*"})
+    client.cache.put(key, {"success": True, "data": []}, 10, 60)
+    client.logout()
+    assert client.get_cache_stats()["entries"] == 0
+    print("✓ Caché invalidada al cerrar sesión")
+    return True
+
+def test_conditional_revalidation():
+    """Probar que una entrada expirada se revalida con ETag y un 304 evita la descarga"""
+    import json
+    import time
+    from http.server import BaseHTTPRequestHandler
+    from supabase_client import SupabaseClient
+    
+    body = json.dumps([{"code": "CR", "name": "Costa Rica"}]).encode()
+    statuses = []
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_GET(self):
+            if self.headers.get("If-None-Match") == '"v1"':
+                statuses.append(304)
+                self.send_response(304)
+                self.send_header("ETag", '"v1"')
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            statuses.append(200)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Range", "0-0/1")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            
+        def log_message(self, *args):
+            pass
+    
+    server, base_url = start_test_server(Handler)
+    try:
+        client = SupabaseClient()
+        client.base_url = base_url
+        client.cache.ttls.update({"countries": 0.05, "v_sales_fact": 0.05})
+        first = client.get_countries()
+        fact = client.get_sales_fact()
+        time.sleep(0.1)
+        assert client.get_countries()["data"] == first["data"]
+        assert client.get_sales_fact()["data"] == fact["data"]
+        assert statuses == [200, 200, 304, 304]
+        stats = client.get_cache_stats()
+        assert stats["revalidations"] == 2
+        assert stats["bytes_saved"] == 2 * len(body)
+        print("✓ Revalidación condicional con 304 sin volver a descargar")
+        
+        # Lectura de todas las páginas y de una sola página con el TTL vencido
+        del statuses[:]
+        countries = client.query("countries")
+        everything = client.fetch(countries, all_pages=True)
+        time.sleep(0.1)
+        assert client.fetch(countries)["data"] == everything["data"]
+        assert client.fetch(countries, all_pages=True)["data"] == everything["data"]
+        assert statuses == [200, 304, 304]
+        
+        # Una entrada con validadores por página no sirve para un GET condicional
+        key = client._cache_key(f"{base_url}/rest/v1/countries", countries.params())
+        client.cache.put(key, everything, 10, 60, [{"etag": '"v1"', "last_modified": None}])
+        client.cache.get_stale(key).expires_at = 0
+        del statuses[:]
+        assert client.fetch(countries)["data"] == everything["data"]
+        assert statuses == [200]
+        print("✓ Revalidación con TTL vencido separada por modo de lectura")
+    finally:
+        stop_test_server(server)
+    
+    return True
+
+def test_grid_model():
+    """Probar el modelo de la tabla virtualizada: columnas, orden, filtro y ventana"""
+    from result_grid import GridModel
+    
+    model = GridModel()
+    model.set_rows([
+        {"id": 1, "name": "María", "countries": {"code": "CR"}},
+        {"id": 2, "name": "Ana", "countries": {"code": "US"}}
+    ])
+    model.append([{"id": 3, "name": "Zoe", "countries": {"code": "CR"}, "extra": True}])
+    assert model.columns == ["id", "name", "countries.code"]
+    
+    model.sort("name")
+    assert [row[1] for row in model.window(0, 10)] == ["Ana", "María", "Zoe"]
+    model.sort("name")
+    assert [row[1] for row in model.window(0, 2)] == ["Zoe", "María"]
+    
+    model.filter("cr")
+    assert [row[0] for row in model.window(0, 10)] == [3, 1]
+    assert "name" in model.sort_indexes
+    print("✓ Tabla virtualizada ordena y filtra con índices precalculados")
+    return True
+
+def test_columnar_result():
+    """Probar el contenedor columnar: tipos compactos, group-by, suma y top-N"""
+    from array import array
+    from columnar import ColumnarResult, DictColumn
+    
+    rows = [
+        {"invoice_id": 1, "country_code": "CR", "category_name": "Electronics", "quantity": 2, "line_total": 200.0},
+        {"invoice_id": 2, "country_code": "US", "category_name": "Furniture", "quantity": 1, "line_total": 50.5},
+        {"invoice_id": 3, "country_code": "CR", "category_name": "Furniture", "quantity": 3, "line_total": None},
+        {"invoice_id": 4, "country_code": "CR", "category_name": "Electronics", "quantity": 1, "line_total": 99.5}
+    ]
+    store = ColumnarResult.from_rows(iter(rows))
+    assert isinstance(store.columns["line_total"], array)
+    assert isinstance(store.columns["country_code"], DictColumn)
+    assert store.columns["country_code"].values == ["CR", "US"]
+    assert store.sum("line_total") == 350.0
+    
+    by_country = {g["country_code"]: g for g in store.group_by("country_code")}
+    assert by_country["CR"]["count"] == 3 and by_country["CR"]["line_total"] == 299.5
+    by_both = store.group_by(("country_code", "category_name"), sums=("quantity",))
+    assert {"country_code": "CR", "category_name": "Furniture", "count": 1, "quantity": 3.0} in by_both
+    
+    top = store.top_n("line_total", 2)
+    assert [row.invoice_id for row in top] == [1, 4]
+    assert store.row(2)["line_total"] is None
+    assert store.to_rows()[1]["category_name"] == "Furniture"
+    print("✓ Resultado columnar con agregaciones")
+    
+    # El tipo sale de todos los valores, no solo de la primera fila
+    rows = [
+        {"invoice_id": 1, "customer_id": None, "discount": 0, "note": None, "line_total": 10.0},
+        {"invoice_id": 2, "customer_id": 7, "discount": 2.5, "note": 3, "line_total": 20.0},
+        {"invoice_id": 3, "customer_id": None, "discount": 1, "note": "ok", "line_total": 30.0}
+    ]
+    store = ColumnarResult.from_rows(iter(rows))
+    assert store.columns["invoice_id"].typecode == "q"
+    assert store.columns["customer_id"].typecode == "q"
+    assert store.columns["discount"].typecode == "d"
+    assert isinstance(store.columns["note"], list)
+    assert store.to_rows() == rows
+    assert type(store.row(1)["invoice_id"]) is int
+    assert store.top_n("customer_id", 5)[0].invoice_id == 2
+    assert {g["customer_id"]: g["count"] for g in store.group_by("customer_id")} == {None: 2, 7: 1}
+    print("✓ Columnas enteras, nulas al inicio y de tipo mezclado")
+    return True
+
+def test_local_replica_delta_sync():
+    """Probar la réplica local: sincronización incremental y consultas sin conexión"""
+    import json
+    import tempfile
+    from http.server import BaseHTTPRequestHandler
+    from urllib.parse import urlparse, parse_qsl
+    from replica import LocalReplica
+    from supabase_client import SupabaseClient
+    
+    tables = {
+        "countries": [{"code": "CR", "name": "Costa Rica"}],
+        "categories": [{"id": 1, "name": "Electronics"}],
+        "products": [{"id": 1, "name": "Laptop", "category_id": 1, "unit_price": 900.0, "created_at": None}],
+        "customers": [{"id": 1, "name": "María Pérez", "email": None, "country_code": "CR", "created_at": None}],
+        "invoices": [{"id": 1, "customer_id": 1, "invoice_date": "2000-01-01", "total_amount": 900.0, "created_at": None}],
+        "invoice_lines": [{"id": 1, "invoice_id": 1, "product_id": 1, "quantity": 1, "unit_price": 900.0, "line_total": 900.0}]
+    }
+    requested = []
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_GET(self):
+            url = urlparse(self.path)
+            table = url.path.rsplit("/", 1)[1]
+            params = parse_qsl(url.query)
+            requested.append((table, params))
+            rows = tables.get(table, [])
+            for key, value in params:
+                if key == "id" and value.startswith("gt."):
+                    rows = [r for r in rows if r["id"] > int(value[3:])]
+            body = json.dumps(rows).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            
+        def log_message(self, *args):
+            pass
+    
+    server, base_url = start_test_server(Handler)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            client = SupabaseClient()
+            client.base_url = base_url
+            client.user_id = "user-a"
+            replica = LocalReplica(client, directory)
+            assert replica.sync()["invoice_lines"] == 1
+            
+            tables["invoice_lines"].append({"id": 2, "invoice_id": 1, "product_id": 1,
+                                            "quantity": 2, "unit_price": 900.0, "line_total": 1800.0})
+            requested.clear()
+            added = replica.sync()
+            assert added["invoice_lines"] == 1 and added["products"] == 0
+            assert ("id", "gt.1") in [p for t, ps in requested if t == "invoice_lines" for p in ps]
+            
+            client.attach_replica(replica)
+            served = len(requested)
+            by_category = client.get_sales_by_category()
+            assert by_category["source"] == "replica"
+            assert by_category["data"][0]["total_sales"] == 2700.0
+            assert client.search_customers("maría")["data"][0]["id"] == 1
+            assert client.get_products_by_price_range(500, 1000)["data"][0]["categories"]["name"] == "Electronics"
+            assert len(requested) == served
+            replica.stop()
+            print("✓ Réplica local sincronizada por marca de agua y consultada sin conexión")
+    finally:
+        stop_test_server(server)
+    
+    # Cambiar de usuario a mitad de la sincronización no mezcla filas entre réplicas
+    from benchmarks.datasets import Dataset
+    from benchmarks.mock_server import MockSupabase
+    from replica import SyncAborted
+    import config
+    users = list(config.USERS.values())
+    with MockSupabase(Dataset(500)) as mock, tempfile.TemporaryDirectory() as directory:
+        client = SupabaseClient()
+        client.base_url = mock.base_url
+        assert client.login_all()["success"]
+        client.switch_user(users[0]["email"])
+        token_a = client.jwt_token
+        replica = LocalReplica(client, directory)
+        sent = []
+        
+        def switch_on_customers(response, *args, **kwargs):
+            sent.append(response.request.headers.get("Authorization"))
+            if "/customers" in response.url and client.user_id == replica.user_id:
+                client.switch_user(users[1]["email"])
+        
+        client.session.hooks["response"].append(switch_on_customers)
+        try:
+            replica.sync()
+            assert False, "la sincronización debe abortar al cambiar de usuario"
+        except SyncAborted:
+            pass
+        client.session.hooks["response"].remove(switch_on_customers)
+        assert sent and all(header == f"Bearer {token_a}" for header in sent)
+        assert replica._query("SELECT * FROM customers")["data"] == []
+        assert replica._query("SELECT * FROM products")["data"]
+        replica.stop()
+        client.close()
+    print("✓ Cambio de usuario durante la sincronización: la tabla en curso se descarta")
+    
+    # Revocar y restaurar un país: la réplica descarta y recupera sus filas
+    with MockSupabase(Dataset(500)) as mock, tempfile.TemporaryDirectory() as directory:
+        user = users[0]
+        client = SupabaseClient()
+        client.base_url = mock.base_url
+        assert client.login(user["email"], user["password"])["success"]
+        replica = LocalReplica(client, directory)
+        replica.sync()
+        countries = sorted(mock.users[user["email"]].countries)
+        
+        def local_countries():
+            rows = replica._query("SELECT DISTINCT country_code FROM customers")["data"]
+            return sorted(row["country_code"] for row in rows)
+        
+        assert local_countries() == countries
+        mock.set_grants(user["email"], countries=countries[1:])
+        replica.sync()
+        assert local_countries() == countries[1:]
+        mock.set_grants(user["email"], countries=countries)
+        replica.sync()
+        assert local_countries() == countries
+        replica.stop()
+        client.close()
+    print("✓ Cambio de permisos: la réplica se reconstruye sin filas revocadas")
+    
+    return True
+
+def test_sales_summary_rpc():
+    """Probar que las agregaciones se piden al RPC con solo los parámetros indicados"""
+    import json
+    from http.server import BaseHTTPRequestHandler
+    from supabase_client import SupabaseClient
+    
+    calls = []
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            calls.append((self.path, payload))
+            body = b'[{"group_key": "1", "group_label": "Laptop", "total_sales": 900}]'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            
+        def log_message(self, *args):
+            pass
+    
+    server, base_url = start_test_server(Handler)
+    try:
+        client = SupabaseClient()
+        client.base_url = base_url
+        result = client.get_top_products_range(5, date_from="2024-01-01", countries=["CR", "US"])
+        assert result["success"] and result["data"][0]["group_label"] == "Laptop"
+        path, payload = calls[0]
+        assert path == "/rest/v1/rpc/sales_summary"
+        assert payload == {"p_group_by": "product", "p_date_from": "2024-01-01",
+                           "p_countries": ["CR", "US"], "p_limit": 5}
+        print("✓ Agregación en el servidor vía RPC")
+    finally:
+        stop_test_server(server)
+    
+    return True
+
+def test_reports_refreshed_at():
+    """Probar que el cliente reporta el refresco más antiguo de las vistas materializadas"""
+    from datetime import datetime, timedelta, timezone
+    from http.server import BaseHTTPRequestHandler
+    from supabase_client import SupabaseClient
+    
+    now = datetime.now(timezone.utc)
+    rows = [
+        {"view_name": "mv_sales_fact", "refreshed_at": (now - timedelta(minutes=5)).isoformat(), "dirty": False},
+        {"view_name": "mv_sales_daily", "refreshed_at": (now - timedelta(minutes=2)).isoformat(), "dirty": True}
+    ]
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_GET(self):
+            import json
+            body = json.dumps(rows).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            
+        def log_message(self, *args):
+            pass
+    
+    server, base_url = start_test_server(Handler)
+    try:
+        client = SupabaseClient()
+        client.base_url = base_url
+        result = client.get_reports_refreshed_at()
+        assert result["success"]
+        assert 290 <= result["data"]["age_seconds"] < 330
+        assert result["data"]["dirty"] is True
+        print("✓ Antigüedad de las vistas materializadas")
+    finally:
+        stop_test_server(server)
+    
+    return True
+
+def test_bulk_provisioning():
+    """Probar la importación masiva: lotes de upsert y errores aislados por fila"""
+    import io
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler
+    from supabase_client import SupabaseClient
+    
+    posts = []
+    lock = threading.Lock()
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with lock:
+                posts.append((self.path, self.headers.get("Prefer"), payload))
+            if self.path.startswith("/auth/v1/admin/users"):
+                if payload["email"].startswith("dup"):
+                    self._reply(422, {"msg": "User already registered"})
+                else:
+                    self._reply(200, {"id": "id-" + payload["email"].split("@")[0]})
+            elif any(row.get("country_code") == "XX" for row in payload):
+                self._reply(409, {"message": "violates foreign key constraint"})
+            else:
+                self._reply(201, None)
+                
+        def _reply(self, status, body):
+            data = b"" if body is None else json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            
+        def log_message(self, *args):
+            pass
+    
+    csv_text = (
+        "email,password,user_id,countries,categories\n"
+        "ana@x.com,secret1,,CR;US,1;2\n"
+        "dup@x.com,secret2,,CR,\n"
+        ",,existing,XX;MX,3\n"
+    )
+    server, base_url = start_test_server(Handler)
+    try:
+        client = SupabaseClient()
+        client.base_url = base_url
+        result = client.admin_import_users_csv(io.StringIO(csv_text), chunk_size=2, max_workers=2)
+        data = result["data"]
+        assert data["users_created"] == 1 and len(data["failed"]["users"]) == 1
+        assert data["country_grants"] == 3 and data["category_grants"] == 3
+        assert [f["data"]["country_code"] for f in data["failed"]["countries"]] == ["XX"]
+        
+        country_posts = [p for p in posts if p[0].startswith("/rest/v1/user_allowed_country")]
+        assert all("resolution=merge-duplicates" in prefer for _, prefer, _ in country_posts)
+        assert "on_conflict=user_id,country_code" in country_posts[0][0].replace("%2C", ",")
+        # 4 filas en lotes de 2: un lote bien, uno con XX que se reintenta fila por fila
+        assert [len(p[2]) for p in country_posts] == [2, 2, 1, 1]
+        print("✓ Importación masiva con errores aislados por fila")
+    finally:
+        stop_test_server(server)
+    
+    return True
+
+def test_invoice_ingestion_resume():
+    """Probar la carga de facturas: validación local, lotes y reanudación sin duplicar líneas"""
+    import io
+    import json
+    import os
+    import shutil
+    import tempfile
+    from http.server import BaseHTTPRequestHandler
+    from urllib.parse import urlparse, parse_qs
+    from supabase_client import SupabaseClient
+    
+    invoices = {}
+    lines = []
+    fail_lines = {"remaining": 1, "after": 1}
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_GET(self):
+            path = urlparse(self.path).path
+            rows = [{"id": 1, "unit_price": "10.00"}, {"id": 2, "unit_price": "2.50"}] \
+                if path.endswith("/products") else [{"id": 7}]
+            self._reply(200, rows)
+            
+        def do_POST(self):
+            path = urlparse(self.path).path
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if path.endswith("/invoices"):
+                merge = "merge-duplicates" in self.headers["Prefer"]
+                returned = []
+                for row in payload:
+                    if row["source_ref"] not in invoices:
+                        invoices[row["source_ref"]] = len(invoices) + 100
+                    elif not merge:
+                        continue
+                    returned.append({"id": invoices[row["source_ref"]], "source_ref": row["source_ref"]})
+                self._reply(201, returned)
+            else:
+                # Simular una caída justo después de insertar las líneas del segundo lote
+                lines.extend(payload)
+                fail_lines["after"] -= 1
+                if fail_lines["after"] < 0 and fail_lines["remaining"]:
+                    fail_lines["remaining"] -= 1
+                    self._reply(503, {"message": "conexión perdida"})
+                else:
+                    self._reply(201, None)
+                    
+        def do_DELETE(self):
+            ids = parse_qs(urlparse(self.path).query)["invoice_id"][0][4:-1].split(",")
+            lines[:] = [line for line in lines if str(line["invoice_id"]) not in ids]
+            self._reply(204, None)
+            
+        def _reply(self, status, body):
+            data = b"" if body is None else json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            
+        def log_message(self, *args):
+            pass
+    
+    csv_text = (
+        "ref,customer_id,invoice_date,product_id,quantity,unit_price\n"
+        "A,7,2024-12-01,1,3,\n"
+        "A,7,2024-12-01,2,1.5,\n"
+        "B,7,2024-12-02,2,2,2.555\n"
+        "C,9,2024-12-02,1,1,\n"
+        "D,7,2024-12-03,1,1,\n"
+        "E,7,2024-12-04,2,4,\n"
+    )
+    server, base_url = start_test_server(Handler)
+    directory = tempfile.mkdtemp()
+    try:
+        source = os.path.join(directory, "facturas.csv")
+        with open(source, "w", encoding="utf-8") as handle:
+            handle.write(csv_text)
+        client = SupabaseClient()
+        client.base_url = base_url
+        
+        first = client.ingest_invoices(source, chunk_size=2)
+        assert not first["success"] and first["data"]["invoices"] == 2
+        assert first["data"]["rejected"][0]["ref"] == "C"
+        
+        second = client.ingest_invoices(source, chunk_size=2)
+        assert second["success"], second
+        assert sorted(line["invoice_id"] for line in lines) == [100, 100, 101, 102, 103]
+        line_a = [line for line in lines if line["invoice_id"] == 100]
+        assert [line["line_total"] for line in line_a] == ["30.00", "3.75"]
+        assert [line["line_total"] for line in lines if line["invoice_id"] == 101] == ["5.11"]
+        with open(source + ".checkpoint", encoding="utf-8") as handle:
+            assert json.load(handle)["records"] == 5
+        print("✓ Carga de facturas con reanudación")
+        
+        # Falla el POST de líneas del primer lote (sin checkpoint previo): los
+        # encabezados ya insertados se recuperan en lugar de quedar sin líneas
+        invoices.clear()
+        lines.clear()
+        fail_lines.update(remaining=1, after=0)
+        retry = os.path.join(directory, "primer_lote.csv")
+        with open(retry, "w", encoding="utf-8") as handle:
+            handle.write(csv_text)
+        failed = client.ingest_invoices(retry, chunk_size=2)
+        assert not failed["success"] and failed["data"]["invoices"] == 0 and len(invoices) == 2
+        rerun = client.ingest_invoices(retry, chunk_size=2)
+        assert rerun["success"] and rerun["data"]["skipped"] == 0, rerun
+        assert sorted(line["invoice_id"] for line in lines) == [100, 100, 101, 102, 103]
+        print("✓ Reanudación después de fallar las líneas del primer lote")
+    finally:
+        stop_test_server(server)
+        shutil.rmtree(directory, ignore_errors=True)
+    
+    return True
+
+def test_benchmark_mock_server():
+    """Probar que el servidor simulado de benchmarks pagina y aplica el alcance RLS por usuario"""
+    import config
+    from benchmarks.datasets import Dataset
+    from benchmarks.mock_server import MockSupabase
+    from supabase_client import SupabaseClient
+    
+    dataset = Dataset(3000)
+    with MockSupabase(dataset) as mock:
+        for user in list(config.USERS.values())[:2]:
+            client = SupabaseClient()
+            client.base_url = mock.base_url
+            assert client.login(user["email"], user["password"])["success"]
+            paged = client.iter_rows("v_sales_fact", {"select": "*"}, page_size=100)
+            rows = list(paged)
+            expected = [row for row in dataset.fact if mock.is_visible(user["email"], row[5], row[8])]
+            assert len(rows) == len(expected) == paged.total
+            assert paged.pages > 1
+            assert all(mock.is_visible(user["email"], row["country_code"], row["category_id"]) for row in rows)
+            client.close()
+    print("✓ Servidor simulado con paginación y RLS por usuario")
+    
+    return True
+
+def test_instrumentation_spans():
+    """Probar que cada llamada del cliente genera un span con caché, filas y Server-Timing"""
+    import config
+    from benchmarks.datasets import Dataset
+    from benchmarks.mock_server import MockSupabase
+    from instrumentation import MemorySink, parse_server_timing
+    from supabase_client import SupabaseClient
+    
+    assert parse_server_timing("db;dur=12.5, app;desc=x;dur=3") == {"db": 12.5, "app": 3.0}
+    with MockSupabase(Dataset(500)) as mock:
+        client = SupabaseClient()
+        client.base_url = mock.base_url
+        user = next(iter(config.USERS.values()))
+        assert client.login(user["email"], user["password"])["success"]
+        sink = MemorySink()
+        client.instrumentation.add_sink(sink)
+        first = client.get_countries()
+        second = client.get_countries()
+        assert first["success"] and second["success"]
+        miss, hit = sink.spans
+        assert miss.cache == "miss" and hit.cache == "hit"
+        assert miss.requests >= 1 and hit.requests == 0
+        assert miss.status == 200 and miss.rows == len(first["data"])
+        assert "app" in miss.server_timing and miss.bytes > 0
+        assert miss.params_hash == hit.params_hash
+        
+        client._request("GET", f"{client.base_url}/rest/v1/no_existe", headers=client.get_headers())
+        assert sink.spans[-1].status == 404
+        endpoints = {row["endpoint"] for row in client.get_trace_stats()["endpoints"]}
+        assert "countries" in endpoints
+        client.close()
+    print("✓ Spans con resultado de caché, filas, estado y Server-Timing")
+    
+    return True
+
+def test_query_builder():
+    """Probar que el constructor de consultas genera sintaxis válida de PostgREST"""
+    from query import Query, like_pattern, render_select
+    from supabase_client import SupabaseClient
+    
+    projection = ("id", "quantity", {"products": ("name",), "invoices": ("invoice_date", {"customers": ("name",)})})
+    assert render_select(projection) == "id,quantity,products(name),invoices(invoice_date,customers(name))"
+    params = Query("products").select("id", "name", {"categories": ("name",)}) \
+        .gte("unit_price", 100).lte("unit_price", 1000).in_("category_id", [1, 2]) \
+        .is_("deleted_at", None).order("unit_price", desc=True, nulls="last").limit(5).params()
+    assert params == [
+        ("select", "id,name,categories(name)"),
+        ("unit_price", "gte.100"), ("unit_price", "lte.1000"),
+        ("category_id", "in.(1,2)"), ("deleted_at", "is.null"),
+        ("order", "unit_price.desc.nullslast"), ("limit", 5)
+    ]
+    assert Query("customers").in_("name", ["Pérez, Ana", 'Dice "hola"']).params()[1] == \
+        ("name", 'in.("Pérez, Ana","Dice \\"hola\\"")')
+    assert like_pattern("50%_off*") == "*50\\%\\_off_*"
+    assert like_pattern("a\\b (c, d)") == "*a\\\\b (c, d)*"
+    assert like_pattern("Pérez, Ana", nested=True) == '"*Pérez, Ana*"'
+    for bad in (lambda: Query("x").filter("id", "between", 1), lambda: render_select(("id,name", "x"))):
+        try:
+            bad()
+            assert False, "Debió rechazar la consulta"
+        except ValueError:
+            pass
+    
+    client = SupabaseClient()
+    assert client.query("v_top_products_30d").params()[0] == \
+        ("select", "product_id,product_name,category_name,total_quantity,total_sales")
+    assert client.query("products", "*").params()[0] == ("select", "*")
+    print("✓ Proyección, filtros y orden con sintaxis de PostgREST")
+    
+    return True
+
+def test_request_coalescing():
+    """Probar que llamadas idénticas concurrentes comparten una petición y que lookup() agrupa en in.(...)"""
+    import time
+    import config
+    from concurrent.futures import ThreadPoolExecutor
+    from benchmarks.datasets import Dataset
+    from benchmarks.mock_server import MockSupabase
+    from supabase_client import SupabaseClient
+    
+    with MockSupabase(Dataset(500), latency=0.2) as mock:
+        client = SupabaseClient()
+        client.base_url = mock.base_url
+        user = next(iter(config.USERS.values()))
+        assert client.login(user["email"], user["password"])["success"]
+        client.cache.ttls["customers"] = 0
+        
+        before = mock.request_count
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            results = list(executor.map(lambda _: client.search_customers("a"), range(5)))
+        assert mock.request_count - before == 1
+        assert all(result is results[0] for result in results) and results[0]["success"]
+        assert client.get_connection_stats()["coalesced"] == 4
+        assert sorted(span.cache for span in list(client.instrumentation.memory.spans)[-5:]) == \
+            ["bypass"] + ["shared"] * 4
+        
+        ids = [row["id"] for row in results[0]["data"][:4]] + [-1]
+        client.batcher.window = 0.2  # Ventana amplia para que la prueba no dependa del planificador
+        before = mock.request_count
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            found = list(executor.map(lambda i: client.lookup("customers", "id", i), ids))
+        assert mock.request_count - before == 1
+        assert [[row["id"] for row in result["data"]] for result in found] == [[i] for i in ids[:4]] + [[]]
+        
+        # Un cambio de usuario dentro de la ventana no cambia la identidad del lote pendiente
+        first, second = [entry["email"] for entry in list(config.USERS.values())[:2]]
+        assert client.login_all()["success"] and client.switch_user(first)["success"]
+        token = client.jwt_token
+        sent = []
+        client.session.hooks["response"].append(
+            lambda response, *args, **kwargs: sent.append(response.request.headers.get("Authorization")))
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(client.lookup, "customers", "id", ids[0])
+            time.sleep(0.05)
+            client.switch_user(second)
+            result = pending.result()
+        assert [row["id"] for row in result["data"]] == [ids[0]]
+        assert sent == [f"Bearer {token}"]
+        client.close()
+    print("✓ Single-flight para llamadas idénticas y micro-lotes eq -> in.(...)")
+    
+    return True
+
+def test_customer_typeahead():
+    """Probar que las búsquedas que acotan una anterior completa se resuelven con el índice local"""
+    import config
+    from benchmarks.datasets import Dataset
+    from benchmarks.mock_server import MockSupabase
+    from search import CustomerSearchIndex
+    from supabase_client import SupabaseClient
+    
+    index = CustomerSearchIndex()
+    index.add("an", [{"id": 1, "name": "Ana Mora"}, {"id": 2, "name": "Juan Vargas"},
+                     {"id": 3, "name": "Mariana Solís"}], complete=True)
+    assert index.can_answer("ana") and not index.can_answer("mo")
+    assert [row["id"] for row in index.search("ana")] == [1, 3]
+    assert [row["id"] for row in index.search("an")] == [1, 2, 3]
+    assert index.search("vargas")[0]["id"] == 2 and index.search("xyz") == []
+    
+    with MockSupabase(Dataset(2000)) as mock:
+        client = SupabaseClient()
+        client.base_url = mock.base_url
+        user = next(iter(config.USERS.values()))
+        assert client.login(user["email"], user["password"])["success"]
+        
+        before = mock.request_count
+        first = client.suggest_customers("mar", limit=200)
+        assert first["source"] == "server" and first["data"]
+        narrowed = client.suggest_customers("maría", limit=200)
+        assert narrowed["source"] == "index" and mock.request_count - before == 1
+        
+        client.cache.ttls["customers"] = 0
+        expected = client.search_customers("maría")["data"]
+        assert sorted(row["id"] for row in narrowed["data"]) == sorted(row["id"] for row in expected)
+        
+        partial = client.suggest_customers("ro", limit=3)
+        assert partial["source"] == "server" and len(partial["data"]) == 3
+        assert client.suggest_customers("rojas", limit=3)["source"] == "server"
+        
+        # El texto se busca literal: %, _ y * no actúan como comodines
+        for customer_id, name in ((90001, "Promo 50%_off* Ltda"), (90002, "Promo 500 off Ltda"),
+                                  (90003, "Promo 50%_offX Ltda")):
+            mock.dataset.customers.append((customer_id, name, None, "CR", None))
+        mock._cache.clear()
+        client.customer_index.clear()
+        for method in (client.search_customers, client.suggest_customers):
+            assert [row["name"] for row in method("50%_off*")["data"]] == ["Promo 50%_off* Ltda"]
+        assert [row["id"] for row in client.search_customers("50%_off")["data"]] == [90001, 90003]
+        client.logout()
+        assert not client.customer_index.can_answer("maría")
+        client.close()
+    print("✓ Sugerencias de clientes con índice local de trigramas y prefijos")
+    
+    return True
+
+def test_session_pool_refresh():
+    """Probar el pool de sesiones: cambio de usuario sin login y renovación anticipada del token"""
+    import time
+    import config
+    from benchmarks.datasets import Dataset
+    from benchmarks.mock_server import MockSupabase
+    from supabase_client import SupabaseClient
+    
+    with MockSupabase(Dataset(500), token_ttl=2) as mock:
+        client = SupabaseClient()
+        client.base_url = mock.base_url
+        client.sessions.margin = 1.5
+        assert client.login_all()["data"]["sessions"] == len(config.USERS)
+        
+        first, second = [user["email"] for user in list(config.USERS.values())[:2]]
+        before = mock.request_count
+        assert client.switch_user(first)["success"] and client.user_id == client.sessions.get(first).user_id
+        assert client.switch_user(second)["success"]
+        assert mock.request_count == before
+        
+        mine = client.get_my_allowed_countries()["data"]
+        other = client.for_user(first).get_my_allowed_countries()["data"]
+        assert {row["country_code"] for row in mine} != {row["country_code"] for row in other}
+        assert client.user_id == client.sessions.get(second).user_id
+        
+        time.sleep(0.6)
+        assert client.sessions.refresh_due() == len(config.USERS)
+        assert all(info["refreshes"] == 1 for info in client.sessions.stats())
+        old_token = client.jwt_token
+        time.sleep(0.6)
+        result = client.get_my_allowed_categories()
+        assert result["success"] and result["data"]
+        assert client.jwt_token != old_token and client.auth.refreshes == 2
+        
+        client.logout()
+        assert client.sessions.get(second) is None and client.sessions.get(first) is not None
+        client.close()
+    print("✓ Pool de sesiones con cambio de usuario y refresco de tokens")
+    
+    # Cambiar de proyecto descarta las sesiones del anterior
+    with MockSupabase(Dataset(200)) as project_a, MockSupabase(Dataset(200)) as project_b:
+        saved = config.SUPABASE_URL
+        client = SupabaseClient()
+        client.base_url = project_a.base_url
+        try:
+            assert client.login_all()["success"] and client.switch_user(first)["success"]
+            assert client.get_countries()["success"]
+            sent = []
+            client.session.hooks["response"].append(
+                lambda response, *args, **kwargs: sent.append(response.request.headers.get("Authorization")))
+            config.SUPABASE_URL = project_b.base_url
+            client.update_credentials()
+            assert client.jwt_token is None and client.auth is None and not client.sessions.stats()
+            assert not client.switch_user(first)["success"]
+            assert client.get_countries()["success"]
+            assert sent and all(header is None for header in sent)
+        finally:
+            config.SUPABASE_URL = saved
+            client.close()
+    print("✓ Cambio de proyecto sin reutilizar tokens del anterior")
+    
+    return True
+
+def test_streaming_export_resume():
+    """Probar la exportación por páginas con compresión y reanudación desde el checkpoint"""
+    import csv
+    import gzip
+    import json
+    import os
+    import tempfile
+    from benchmarks.datasets import Dataset
+    from benchmarks.mock_server import MockSupabase
+    from export import Exporter, detect_format
+    from supabase_client import SupabaseClient
+    
+    assert detect_format("ventas.csv.gz") == ("csv", "gzip")
+    assert detect_format("ventas.ndjson") == ("ndjson", None)
+    full_access = ("export@example.com", "export", ("CR", "US", "MX", "ES", "CO", "PA"), tuple(range(1, 9)))
+    with MockSupabase(Dataset(2000), users=[full_access]) as mock, tempfile.TemporaryDirectory() as directory:
+        client = SupabaseClient()
+        client.base_url = mock.base_url
+        assert client.login(full_access[0], full_access[1])["success"]
+        exporter = Exporter(client, page_size=100, checkpoint_rows=300)
+        path = os.path.join(directory, "ventas.csv.gz")
+        
+        def interrupt(rows, total):
+            assert total == 2000
+            if rows >= 1000:
+                raise ConnectionError("conexión perdida")
+        
+        failed = exporter.export("v_sales_fact", path, progress=interrupt)
+        assert not failed["success"] and failed["data"]["rows"] == 900
+        resumed = exporter.export("v_sales_fact", path, resume=True)
+        assert resumed["success"] and resumed["data"]["rows"] == 2000
+        assert resumed["data"]["rows_this_run"] == 1100 and resumed["data"]["rows_per_s"]
+        assert not os.path.exists(path + ".checkpoint")
+        with gzip.open(path, "rt", encoding="utf-8", newline="") as handle:
+            rows = list(csv.DictReader(handle))
+        assert [int(row["line_id"]) for row in rows] == list(range(1, 2001))
+        
+        lines = os.path.join(directory, "lineas.ndjson")
+        result = client.export("invoice_lines", lines, columns=("line_total", {"products": ("name",)}))
+        assert result["success"] and result["data"]["rows"] == 2000
+        with open(lines, encoding="utf-8") as handle:
+            first = json.loads(handle.readline())
+        assert set(first) == {"id", "line_total", "products"} and "name" in first["products"]
+        client.close()
+    print("✓ Exportación por páginas con gzip y reanudación sin filas duplicadas")
+    
+    return True
+
+def test_cli_batch_runner():
+    """Probar el ejecutor de reportes por lotes sin GUI (sin importar tkinter)"""
+    import csv
+    import json
+    import os
+    import subprocess
+    import sys
+    import tempfile
+    from benchmarks.datasets import Dataset
+    from benchmarks.mock_server import MockSupabase
+    
+    users = [("cr@example.com", "cr", ("CR",), tuple(range(1, 9))),
+             ("todo@example.com", "todo", ("CR", "US", "MX", "ES", "CO", "PA"), tuple(range(1, 9)))]
+    with MockSupabase(Dataset(1000), users=users) as mock, tempfile.TemporaryDirectory() as directory:
+        jobs = {
+            "users": {"cr@example.com": "cr", "todo@example.com": "todo"},
+            "jobs": [
+                {"user": "cr@example.com", "report": "get_sales_by_country", "params": {"country_code": "CR"},
+                 "output": os.path.join(directory, "cr.csv")},
+                {"user": "todo@example.com", "report": "get_sales_by_category",
+                 "output": os.path.join(directory, "categorias.json")},
+                {"user": "todo@example.com", "report": "export", "params": {"source": "v_sales_fact"},
+                 "output": os.path.join(directory, "ventas.ndjson.gz")},
+                {"user": "cr@example.com", "report": "get_sales_fact", "output": os.path.join(directory, "cr_fact.csv")}
+            ]
+        }
+        jobs_path = os.path.join(directory, "trabajos.json")
+        summary_path = os.path.join(directory, "resumen.json")
+        with open(jobs_path, "w", encoding="utf-8") as handle:
+            json.dump(jobs, handle)
+        
+        # Ejecutar en un proceso nuevo para verificar qué módulos se cargan
+        before = mock.request_count
+        script = ("import sys, cli\n"
+                  "code = cli.main(sys.argv[1:])\n"
+                  "assert 'tkinter' not in sys.modules and 'main' not in sys.modules, 'se importó la GUI'\n"
+                  "sys.exit(code)")
+        process = subprocess.run(
+            [sys.executable, "-c", script, jobs_path, "--url", mock.base_url, "--workers", "4",
+             "--summary", summary_path, "--quiet"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, timeout=120
+        )
+        assert process.returncode == 0, process.stderr
+        with open(summary_path, encoding="utf-8") as handle:
+            summary = json.load(handle)
+        assert summary["failed"] == 0 and len(summary["jobs"]) == 4
+        assert all(job["seconds"] >= 0 for job in summary["jobs"]) and summary["import_seconds"] > 0
+        # Una sola autenticación por usuario aunque tenga varios trabajos
+        assert len(mock.tokens) == 2
+        assert summary["requests"] == mock.request_count - before
+        with open(os.path.join(directory, "cr_fact.csv"), encoding="utf-8", newline="") as handle:
+            rows = list(csv.DictReader(handle))
+        assert rows and {row["country_code"] for row in rows} == {"CR"}
+        assert summary["jobs"][3]["rows"] == len(rows)
+        assert summary["jobs"][2]["rows"] == 1000
+    print(f"✓ CLI por lotes: 4 trabajos en {summary['total_seconds']}s sin importar tkinter")
+    
+    return True
+
+def test_gui_cold_start():
+    """Probar que la GUI difiere los módulos pesados y arranca dentro del presupuesto"""
+    import json
+    import subprocess
+    import sys
+    import config
+    
+    root = os.path.dirname(os.path.abspath(__file__))
+    # Importar main.py no debe cargar el cliente HTTP, la réplica ni los diálogos de archivo
+    script = ("import sys, main\n"
+              "loaded = [name for name in ('requests', 'supabase_client', 'replica', 'sqlite3', 'tkinter.filedialog')"
+              " if name in sys.modules]\n"
+              "assert not loaded, loaded")
+    process = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True, timeout=60)
+    assert process.returncode == 0, process.stderr
+    print("✓ main.py no importa supabase_client, requests ni sqlite3 al cargar")
+    
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        print("- Arranque en frío omitido: no hay pantalla (DISPLAY)")
+        return True
+    process = subprocess.run([sys.executable, "main.py", "--startup-report"], cwd=root,
+                             capture_output=True, text=True, timeout=60)
+    assert process.returncode == 0, process.stderr
+    report = json.loads(process.stdout.strip().splitlines()[-1])
+    assert [phase["phase"] for phase in report["phases"]] == ["imports", "ui", "first_paint"]
+    # Solo la pestaña visible (Configuración) se construye al arrancar
+    assert len(report["tabs_ms"]) == 1
+    assert report["total_ms"] <= config.STARTUP_BUDGET_MS, \
+        f"Arranque en {report['total_ms']} ms, presupuesto {config.STARTUP_BUDGET_MS} ms"
+    print(f"✓ Primer dibujado en {report['total_ms']} ms (presupuesto {config.STARTUP_BUDGET_MS} ms)")
+    
+    return True
+
+def test_json_decoding():
+    """Probar la decodificación en streaming, los backends JSON y las filas con JSON original"""
+    import json
+    import decoding
+    from benchmarks.datasets import Dataset
+    from benchmarks.mock_server import MockSupabase
+    from supabase_client import SupabaseClient
+    
+    data = [{"id": 1, "name": "a},{b", "tags": [{"x": 1}, {"y": None}]}, {"id": 2, "name": "ñandú 😀"},
+            {"id": 3, "total": 12.5}]
+    for name in decoding.BACKENDS:
+        decoding.set_backend(name)
+        assert decoding.loads(json.dumps(data).encode()) == data
+        assert json.loads(decoding.dumps(data, indent=True)) == data
+        for text in (json.dumps(data, separators=(",", ":"), ensure_ascii=False), json.dumps(data, indent=2)):
+            body = text.encode("utf-8")
+            for size in (1, 5, 64, len(body)):
+                chunks = [body[i:i + size] for i in range(0, len(body), size)]
+                rows = list(decoding.ArrayStream(chunks, keep_raw=True))
+                assert rows == data
+                assert all(json.loads(row.raw) == original and "\n" not in row.raw
+                           for row, original in zip(rows, data))
+    decoding.set_backend()
+    try:
+        list(decoding.ArrayStream([b'[{"id": 1}, {"id"']))
+        assert False, "un arreglo incompleto debe fallar"
+    except ValueError:
+        pass
+    print(f"✓ ArrayStream en bloques de 1 byte en adelante con backends {', '.join(decoding.BACKENDS)}")
+    
+    with MockSupabase(Dataset(1500)) as mock:
+        client = SupabaseClient()
+        client.base_url = mock.base_url
+        assert client.login("brianramirez0farias@gmail.com", "password123")["success"]
+        plain = list(client.iter_rows("v_sales_fact", page_size=500, keyset="line_id"))
+        streamed = client.iter_rows("v_sales_fact", page_size=500, keyset="line_id", stream=True, keep_raw=True)
+        rows = list(streamed)
+        assert rows == plain and streamed.bytes > 0
+        assert json.loads(rows[0].raw) == plain[0]
+        spans = [span for span in client.get_trace_stats(50)["slowest"] if span["endpoint"].endswith("v_sales_fact")]
+        assert spans and all(span["bytes"] > 0 for span in spans)
+        client.close()
+    print(f"✓ Lectura en streaming: {len(rows)} filas iguales a la lectura normal")
+    
+    return True
+
+def test_rls_load_generator():
+    """Probar el generador de carga multiusuario y su verificación de RLS"""
+    from benchmarks import loadgen
+    from benchmarks.datasets import Dataset
+    from benchmarks.mock_server import MockSupabase, DEFAULT_GRANTS
+    
+    with MockSupabase(Dataset(2000)) as mock:
+        # Los permisos leídos de user_allowed_* coinciden con los del servidor
+        profiles = loadgen.build_profiles(mock.base_url)
+        for profile, (countries, categories) in zip(profiles, DEFAULT_GRANTS):
+            assert profile["grants"].info() == {"countries": sorted(countries), "categories": sorted(categories)}
+        
+        result = loadgen.run(mock.base_url, profiles, users_per_profile=2, iterations=15)
+        data = result["data"]
+        assert result["success"] and data["violations"] == 0 and data["errors"] == 0
+        assert data["virtual_users"] == 2 * len(profiles) and data["calls"] == 15 * data["virtual_users"]
+        for entry in data["profiles"].values():
+            assert entry["calls"] == 30 and entry["calls_per_s"] > 0 and entry["p99_ms"] >= entry["p50_ms"]
+        print(f"✓ {data['calls']} llamadas de {data['virtual_users']} usuarios virtuales sin violaciones RLS")
+        
+        # Si el servidor deja ver más de lo permitido, la carga lo detecta
+        email = profiles[0]["email"]
+        mock.set_grants(email, countries=("CR", "US", "MX", "ES", "CO", "PA"), categories=range(1, 9))
+        leaked = loadgen.run(mock.base_url, profiles[:1], users_per_profile=1, iterations=30)
+        entry = leaked["data"]["profiles"][profiles[0]["name"]]
+        assert not leaked["success"] and entry["violations"] > 0 and entry["samples"]
+    print(f"✓ Permisos ampliados en el servidor: {entry['violations']} violaciones detectadas")
+    
+    return True
+
 def main():
     """Ejecutar todas las pruebas"""
     print("=== Pruebas de la Aplicación GUI de Supabase ===\n")
@@ -79,7 +1315,31 @@ def main():
     tests = [
         ("Importaciones", test_imports),
         ("Configuración", test_config),
-        ("Creación de Cliente", test_client_creation)
+        ("Creación de Cliente", test_client_creation),
+        ("Pool de Conexiones", test_connection_pool_reuse),
+        ("Paginación", test_paged_rows_max_rows_cap),
+        ("Ejecución en Segundo Plano", test_background_runner_supersedes),
+        ("Cliente Asyncio", test_async_client_fan_out),
+        ("Caché de Respuestas", test_response_cache),
+        ("Revalidación Condicional", test_conditional_revalidation),
+        ("Tabla Virtualizada", test_grid_model),
+        ("Resultado Columnar", test_columnar_result),
+        ("Réplica Local", test_local_replica_delta_sync),
+        ("RPC de Agregación", test_sales_summary_rpc),
+        ("Refresco de Reportes", test_reports_refreshed_at),
+        ("Importación Masiva", test_bulk_provisioning),
+        ("Carga de Facturas", test_invoice_ingestion_resume),
+        ("Servidor de Benchmarks", test_benchmark_mock_server),
+        ("Instrumentación", test_instrumentation_spans),
+        ("Constructor de Consultas", test_query_builder),
+        ("Coalescencia de Peticiones", test_request_coalescing),
+        ("Búsqueda Mientras se Escribe", test_customer_typeahead),
+        ("Pool de Sesiones", test_session_pool_refresh),
+        ("Exportación por Páginas", test_streaming_export_resume),
+        ("CLI por Lotes", test_cli_batch_runner),
+        ("Arranque de la GUI", test_gui_cold_start),
+        ("Decodificación JSON", test_json_decoding),
+        ("Generador de Carga RLS", test_rls_load_generator)
     ]
     
     passed = 0
@@ -87,7 +1347,12 @@ def main():
     
     for test_name, test_func in tests:
         print(f"Ejecutando prueba: {test_name}")
-        if test_func():
+        try:
+            ok = test_func()
+        except Exception as e:
+            print(f"❌ Excepción: {e}")
+            ok = False
+        if ok:
             passed += 1
             print(f"✅ {test_name} - PASÓ\n")
         else: